@@ -6,8 +6,13 @@ load_dotenv()
 db_url = os.getenv("DATABASE_URL")
 engine = create_engine(db_url)
 
+# Tablas de hechos que solo crea la ETL, particionadas por mes (etl_pipeline/database/tables.sql); create_all las
+# crearía sin particionar y la ETL las conservaría. Los resúmenes (ventas_por_mes, ...) no son modelos
+ETL_TABLES = {"ventas", "envios"}
+
 def create_db_and_tables():
-    SQLModel.metadata.create_all(engine)
+    SQLModel.metadata.create_all(engine, tables=[table for name, table in SQLModel.metadata.tables.items()
+                                                 if name not in ETL_TABLES])
 
 def get_session():
     with Session(engine) as session:
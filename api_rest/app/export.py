@@ -0,0 +1,91 @@
+import csv
+import io
+import json
+import pyarrow as pa
+from fastapi.responses import StreamingResponse
+from sqlalchemy import Date, Float, Integer, String, TypeDecorator
+from .db import engine
+
+# Filas que se leen por cada viaje al cursor del servidor; cada lote se envía como un fragmento de la respuesta
+EXPORT_BATCH_ROWS = 2_000
+
+# Formato -> (tipo de contenido, extensión del archivo)
+FORMATS = {
+    "ndjson": ("application/x-ndjson", "ndjson"),
+    "csv": ("text/csv", "csv"),
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+}
+FORMAT_PATTERN = "^(ndjson|csv|arrow)$"
+
+# Tipo de SQLAlchemy de cada columna de los modelos -> tipo de Arrow
+ARROW_TYPES = [(String, pa.string()), (Integer, pa.int64()), (Float, pa.float64()), (Date, pa.date32())]
+
+
+def _arrow_type(column_type):
+    if isinstance(column_type, TypeDecorator):  # AutoString de SQLModel
+        column_type = column_type.impl_instance
+    return next(arrow_type for sql_type, arrow_type in ARROW_TYPES if isinstance(column_type, sql_type))
+
+
+def _batches(query):
+    # yield_per usa un cursor con nombre en el servidor: solo hay un lote en memoria a la vez
+    with engine.connect() as connection:
+        result = connection.execution_options(yield_per=EXPORT_BATCH_ROWS).execute(query)
+        for rows in result.partitions():
+            yield rows
+
+
+def _ndjson(query):
+    names = [col.name for col in query.selected_columns]
+    for rows in _batches(query):
+        yield "".join(json.dumps(dict(zip(names, row)), default=str) + "\n" for row in rows).encode()
+
+
+def _csv(query):
+    buffer = io.StringIO()
+    writer = csv.writer(buffer)
+    writer.writerow([col.name for col in query.selected_columns])
+    for rows in _batches(query):
+        writer.writerows(rows)
+        yield buffer.getvalue().encode()
+        buffer.seek(0)
+        buffer.truncate()
+    if buffer.tell():
+        yield buffer.getvalue().encode()
+
+
+def _drain(sink: io.BytesIO) -> bytes:
+    data = sink.getvalue()
+    sink.seek(0)
+    sink.truncate()
+    return data
+
+
+def _arrow(query):
+    schema = pa.schema([(col.name, _arrow_type(col.type)) for col in query.selected_columns])
+    sink = io.BytesIO()
+    with pa.ipc.new_stream(sink, schema) as writer:
+        for rows in _batches(query):
+            columns = zip(*rows)
+            writer.write_batch(pa.record_batch([pa.array(values, type=field.type)
+                                                for values, field in zip(columns, schema)], schema=schema))
+            yield _drain(sink)
+    yield _drain(sink)
+
+
+def export_response(query, formato: str, nombre: str) -> StreamingResponse:
+    """
+    Exporta el resultado de una consulta como una respuesta en streaming, leyendo las filas por lotes de
+    un cursor del servidor, de modo que la memoria no depende del tamaño del resultado y el primer lote se
+    envía sin esperar a los demás.
+
+    :param query: Consulta de columnas (no de objetos ORM) con los filtros ya aplicados
+    :param formato: 'ndjson' (un objeto JSON por línea), 'csv' (con encabezado) o 'arrow' (stream IPC de Arrow,
+                    un record batch por lote)
+    :param nombre: Nombre del archivo descargado, sin extensión
+    :return: Respuesta en streaming
+    """
+    media_type, extension = FORMATS[formato]
+    content = {"ndjson": _ndjson, "csv": _csv, "arrow": _arrow}[formato](query)
+    return StreamingResponse(content, media_type=media_type,
+                             headers={"Content-Disposition": f'attachment; filename="{nombre}.{extension}"'})
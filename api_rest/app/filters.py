@@ -0,0 +1,27 @@
+from datetime import date, timedelta
+from typing import Optional, Tuple
+
+
+def periodo_range(anio: Optional[int], mes: Optional[int] = None,
+                  dia: Optional[int] = None) -> Optional[Tuple[date, date]]:
+    """
+    Traduce los filtros de año, mes y día de los endpoints /periodo a un rango de fechas [inicio, fin).
+    Ventas y envíos están particionados por mes en la columna fecha: filtrar también por este rango permite
+    que PostgreSQL lea solo las particiones del periodo.
+
+    :param anio: Año del filtro
+    :param mes: Mes del filtro (opcional)
+    :param dia: Día del filtro (opcional; solo acota el rango si también se indica el mes)
+    :return: Tupla (inicio, fin) o None si el filtro no define un rango (sin año o con una fecha inexistente)
+    """
+    if not anio:
+        return None
+    try:
+        if mes and dia:
+            start = date(anio, mes, dia)
+            return start, start + timedelta(days=1)
+        if mes:
+            return date(anio, mes, 1), date(anio + mes // 12, mes % 12 + 1, 1)
+        return date(anio, 1, 1), date(anio + 1, 1, 1)
+    except ValueError:
+        return None
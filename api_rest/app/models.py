@@ -1,5 +1,6 @@
 from sqlmodel import Field, SQLModel, Relationship
 from typing import Optional, List
+from datetime import date
 
 class Tiempo(SQLModel, table=True):
     tiempo_id: str = Field(primary_key=True, max_length=10)
@@ -39,6 +40,8 @@ class Proveedores(SQLModel, table=True):
 
     envios: List["Envios"] = Relationship(back_populates="proveedor")
 
+# ventas y envios están particionadas por mes en fecha (etl_pipeline/database/tables.sql): su llave primaria
+# incluye la fecha y envios.venta_id no tiene llave foránea hacia ventas
 class Ventas(SQLModel, table=True):
     venta_id: str = Field(primary_key=True, max_length=10)
     producto_id: str = Field(foreign_key="productos.producto_id")
@@ -48,6 +51,7 @@ class Ventas(SQLModel, table=True):
     sucursal_id: Optional[int] = None
     total: float
     tiempo_id: str = Field(foreign_key="tiempo.tiempo_id")
+    fecha: date = Field(primary_key=True)  # Clave de partición: filtrar por ella permite descartar meses enteros
 
     tiempo: Optional[Tiempo] = Relationship(back_populates="ventas")
     producto: Optional[Productos] = Relationship(back_populates="ventas")
@@ -55,10 +59,11 @@ class Ventas(SQLModel, table=True):
 
 class Envios(SQLModel, table=True):
     envio_id: str = Field(primary_key=True, max_length=10)
-    venta_id: str = Field(foreign_key="ventas.venta_id")
+    venta_id: str = Field(max_length=10)
     proveedor_id: str = Field(foreign_key="proveedores.proveedor_id")
     estado_envio: str
     tiempo_id: str = Field(foreign_key="tiempo.tiempo_id")
+    fecha: date = Field(primary_key=True)  # Clave de partición: filtrar por ella permite descartar meses enteros
 
     tiempo: Optional[Tiempo] = Relationship(back_populates="envios")
     proveedor: Optional[Proveedores] = Relationship(back_populates="envios")
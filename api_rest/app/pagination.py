@@ -0,0 +1,73 @@
+import base64
+import json
+from datetime import date
+from typing import List, Optional
+from fastapi import HTTPException, Response
+from sqlalchemy import tuple_
+
+# Encabezado con el cursor de la página siguiente; no se envía cuando la página es la última
+NEXT_CURSOR_HEADER = "X-Next-Cursor"
+
+CURSOR_DESCRIPTION = ("Cursor de la página siguiente (encabezado X-Next-Cursor de la respuesta anterior). "
+                      "Si se indica, se ignora offset.")
+
+
+def encode_cursor(values: list) -> str:
+    """Codifica los valores de la llave primaria de la última fila de una página en un cursor opaco."""
+    return base64.urlsafe_b64encode(json.dumps(values, default=str).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str, keys: List) -> list:
+    """
+    Decodifica un cursor de encode_cursor. Las fechas viajan como texto en el JSON: se convierten de nuevo al
+    tipo de su columna, ya que PostgreSQL no compara una columna date con un parámetro de texto.
+
+    :param cursor: Cursor recibido
+    :param keys: Columnas de la llave, en orden
+    :return: Valores de la llave
+    """
+    try:
+        values = json.loads(base64.urlsafe_b64decode(cursor + "=" * (-len(cursor) % 4)))
+        if not isinstance(values, list) or len(values) != len(keys):
+            raise ValueError(cursor)
+        return [date.fromisoformat(value) if key.type.python_type is date else value
+                for key, value in zip(keys, values)]
+    except (ValueError, TypeError):
+        raise HTTPException(status_code=400, detail="Cursor inválido.")
+
+
+def paginate(query, keys: List, limit: int, offset: int = 0, cursor: Optional[str] = None):
+    """
+    Ordena una consulta por su llave primaria y aplica la página pedida. Con cursor, la página empieza
+    después de la última fila de la anterior (WHERE llave > cursor), de modo que cualquier página cuesta
+    lo mismo que la primera; sin cursor se usa offset, como antes.
+
+    :param query: Consulta a paginar
+    :param keys: Columnas de la llave primaria, en orden
+    :param limit: Número máximo de filas
+    :param offset: Filas a omitir (solo sin cursor)
+    :param cursor: Cursor de la página anterior (ver set_next_cursor)
+    :return: Consulta ordenada y paginada
+    """
+    query = query.order_by(*keys)
+    if cursor:
+        values = decode_cursor(cursor, keys)
+        query = query.where(tuple_(*keys) > tuple_(*values)) if len(keys) > 1 else query.where(keys[0] > values[0])
+    else:
+        query = query.offset(offset)
+    return query.limit(limit)
+
+
+def set_next_cursor(response: Response, rows: list, keys: List, limit: int):
+    """
+    Envía en el encabezado X-Next-Cursor el cursor de la página siguiente, si la página está completa.
+
+    :param response: Respuesta del endpoint
+    :param rows: Filas de la página (objetos o diccionarios con las columnas de la llave)
+    :param keys: Columnas de la llave primaria, las mismas que en paginate
+    :param limit: Tamaño de página pedido
+    """
+    if rows and len(rows) == limit:
+        last = rows[-1]
+        values = [last[key.key] if isinstance(last, dict) else getattr(last, key.key) for key in keys]
+        response.headers[NEXT_CURSOR_HEADER] = encode_cursor(values)
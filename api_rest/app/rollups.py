@@ -0,0 +1,66 @@
+import time
+from typing import Dict, Optional
+from sqlalchemy import cast, column, func, inspect, select, table
+from sqlmodel import Session
+
+# Tablas de resumen que mantiene la ETL (etl_pipeline/load/rollups.py), de la más agregada a la más detallada,
+# con las columnas de periodo por las que se pueden agrupar y filtrar
+GRAINS = [("por_anio", {"anio"}), ("por_mes", {"anio", "mes"}), ("por_dia", {"anio", "mes", "dia"})]
+
+# Segundos durante los que se reutiliza la comprobación de si un resumen existe y tiene filas
+AVAILABILITY_TTL_SECONDS = 60
+
+# Resumen -> (disponible, momento de la comprobación)
+_available: Dict[str, tuple] = {}
+
+
+def _is_available(session: Session, name: str) -> bool:
+    # Mientras un resumen no existe (base sin reconstruir) o está vacío (antes de la primera carga) se consulta
+    # la tabla de hechos. La existencia se comprueba antes de consultarlo: en PostgreSQL una consulta fallida
+    # invalidaría la transacción de la sesión
+    cached = _available.get(name)
+    if cached is not None and time.monotonic() - cached[1] < AVAILABILITY_TTL_SECONDS:
+        return cached[0]
+    available = (inspect(session.connection()).has_table(name) and
+                 session.exec(select(column("desglose")).select_from(table(name)).limit(1)).first() is not None)
+    _available[name] = (available, time.monotonic())
+    return available
+
+
+def periodo_rollup(session: Session, fact: str, measure: str, periodo: str, filtros: Dict[str, Optional[int]],
+                   desgloses: Dict[str, Optional[str]], measure_type=None):
+    """
+    Construye la consulta de un endpoint /periodo sobre la tabla de resumen más agregada que la puede
+    responder, de modo que su costo no depende del tamaño de la tabla de hechos.
+
+    :param session: Sesión de la base de datos
+    :param fact: Tabla de hechos ('ventas' o 'envios')
+    :param measure: Medida a sumar ('total_ventas' o 'total_envios')
+    :param periodo: Nivel de agregación ('dia', 'mes' o 'anio')
+    :param filtros: Filtros de periodo (anio, mes, dia); se ignoran los vacíos
+    :param desgloses: Filtros por dimensión (desglose -> valor); se ignoran los vacíos
+    :param measure_type: Tipo de SQLAlchemy al que se convierte la suma, para responder con el mismo tipo que
+                         la consulta sobre la tabla de hechos (Float para los totales, BigInteger para los conteos)
+    :return: Consulta sin paginar, o None si ningún resumen la puede responder (más de un filtro por
+             dimensión, o resúmenes aún vacíos) y hay que usar la tabla de hechos
+    """
+    filtros = {name: value for name, value in filtros.items() if value}
+    desgloses = {name: value for name, value in desgloses.items() if value}
+    if len(desgloses) > 1:
+        return None
+
+    columns = {periodo, *filtros}
+    name = next(f"{fact}_{grain}" for grain, available in GRAINS if columns <= available)
+    if not _is_available(session, name):
+        return None
+
+    rollup = table(name, *(column(col) for col in columns), column("desglose"), column("valor"), column(measure))
+    desglose, valor = next(iter(desgloses.items())) if desgloses else ("total", "")
+    total = func.sum(rollup.c[measure])
+    if measure_type is not None:
+        total = cast(total, measure_type)
+    query = select(rollup.c[periodo].label(periodo), total.label(measure))
+    query = query.where(rollup.c.desglose == desglose, rollup.c.valor == str(valor))
+    for col, value in filtros.items():
+        query = query.where(rollup.c[col] == value)
+    return query.group_by(rollup.c[periodo]).order_by(rollup.c[periodo])
@@ -1,14 +1,19 @@
 from typing import Optional, List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlmodel import Session, select
 from ..db import get_session
 from ..models import Clientes
+from ..pagination import paginate, set_next_cursor, CURSOR_DESCRIPTION
 
 router = APIRouter()
 
+# Llave primaria de clientes: orden de las páginas y contenido de los cursores
+KEYS = [Clientes.cliente_id]
+
 @router.get("/", response_model=List[Clientes], summary="Obtener lista de clientes con filtros opcionales",
             description="Obtiene una lista de clientes con paginación y filtros opcionales por género, edad, y ubicación.")
 def get_clientes(
+        response: Response,
         genero: Optional[List[str]] = Query(None,
                                             description="Lista de géneros a filtrar (ej. Masculino, Femenino, Otro)."),
         edad: Optional[int] = Query(None, description="Edad exacta del cliente."),
@@ -17,6 +22,7 @@ def get_clientes(
         ubicacion: Optional[str] = Query(None, description="Ubicación del cliente."),
         limit: int = Query(1000, le=5000, description="Número máximo de clientes a devolver (máx. 5000)."),
         offset: int = Query(0, description="Número de registros a omitir para la paginación."),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         session: Session = Depends(get_session)
 ):
     query = select(Clientes)
@@ -34,17 +40,23 @@ def get_clientes(
     if ubicacion:
         query = query.where(Clientes.ubicacion == ubicacion)
 
-    query = query.offset(offset).limit(limit)
+    query = paginate(query, KEYS, limit, offset, cursor)
 
-    return session.exec(query).all()
+    rows = session.exec(query).all()
+    set_next_cursor(response, rows, KEYS, limit)
+    return rows
 
 @router.get("/nombre", response_model=List[Clientes], summary="Filtrar clientes por nombre",
             description="Obtiene una lista de clientes filtrados por nombre.")
 def get_clientes_por_nombre(
+        response: Response,
         nombre_cliente: str,
         limit: int = Query(1000, le=5000),
         offset: int = 0,
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         session: Session = Depends(get_session)
 ):
-    query = select(Clientes).where(Clientes.nombre.ilike(f"%{nombre_cliente}%")).offset(offset).limit(limit)
-    return session.exec(query).all()
+    query = paginate(select(Clientes).where(Clientes.nombre.ilike(f"%{nombre_cliente}%")), KEYS, limit, offset, cursor)
+    rows = session.exec(query).all()
+    set_next_cursor(response, rows, KEYS, limit)
+    return rows
@@ -1,25 +1,48 @@
+from datetime import date
 from typing import Optional, List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlmodel import Session, select, func
+from sqlalchemy import BigInteger
 from sqlalchemy.orm import selectinload
 from ..db import get_session
+from ..filters import periodo_range
+from ..rollups import periodo_rollup
+from ..pagination import paginate, set_next_cursor, CURSOR_DESCRIPTION
+from ..export import export_response, FORMAT_PATTERN
 from ..models import Envios, Tiempo
 
 router = APIRouter()
 
+# Llave primaria de envíos: orden de las páginas y contenido de los cursores
+KEYS = [Envios.envio_id, Envios.fecha]
+
+def _filtrar(query, proveedor_id, estado_envio, fecha_inicio, fecha_fin):
+    """Aplica los filtros de /envios, compartidos con /envios/export."""
+    if proveedor_id:
+        query = query.where(Envios.proveedor_id == proveedor_id)
+    if estado_envio:
+        query = query.where(Envios.estado_envio == estado_envio)
+    if fecha_inicio:
+        query = query.where(Envios.fecha >= fecha_inicio)
+    if fecha_fin:
+        query = query.where(Envios.fecha <= fecha_fin)
+    return query
+
 @router.get("/", summary="Obtener envíos",
             description="Recupera una lista de envíos con opciones de filtrado y paginación.")
 def get_envios(
+        response: Response,
         limit: int = Query(1000, le=5000, description="Número máximo de registros a devolver (máx. 5000)."),
         offset: int = Query(0, description="Número de registros a omitir en la paginación."),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         proveedor_id: Optional[str] = Query(None, description="ID del proveedor para filtrar."),
         estado_envio: Optional[str] = Query(None, description="Estado del envío para filtrar."),
-        fecha_inicio: Optional[str] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD."),
-        fecha_fin: Optional[str] = Query(None, description="Fecha de fin en formato YYYY-MM-DD."),
+        fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD."),
+        fecha_fin: Optional[date] = Query(None, description="Fecha de fin en formato YYYY-MM-DD."),
         include_proveedor: bool = Query(False, description="Incluir información del proveedor en la respuesta."),
         session: Session = Depends(get_session)
 ):
-    query = select(Envios).join(Tiempo, Envios.tiempo_id == Tiempo.tiempo_id).options(selectinload(Envios.tiempo))  # 🔹 Se carga `Tiempo`
+    query = select(Envios).options(selectinload(Envios.tiempo))  # 🔹 Se carga `Tiempo`
 
     load_options = []
     if include_proveedor:
@@ -28,17 +51,10 @@ def get_envios(
     if load_options:
         query = query.options(*load_options)
 
-    if proveedor_id:
-        query = query.where(Envios.proveedor_id == proveedor_id)
-    if estado_envio:
-        query = query.where(Envios.estado_envio == estado_envio)
-    if fecha_inicio:
-        query = query.where(Tiempo.fecha >= fecha_inicio)
-    if fecha_fin:
-        query = query.where(Tiempo.fecha <= fecha_fin)
-
-    query = query.offset(offset).limit(limit)
+    query = _filtrar(query, proveedor_id, estado_envio, fecha_inicio, fecha_fin)
+    query = paginate(query, KEYS, limit, offset, cursor)
     envios = session.exec(query).all()
+    set_next_cursor(response, envios, KEYS, limit)
 
     result = []
     for envio in envios:
@@ -50,30 +66,58 @@ def get_envios(
 
     return result
 
+@router.get("/export", summary="Exportar envíos",
+            description="Descarga todos los envíos que cumplen los filtros de /envios, sin paginar, como NDJSON, CSV "
+                        "o Arrow IPC. Las filas se envían por lotes a medida que se leen de la base de datos.")
+def export_envios(
+        formato: str = Query("ndjson", regex=FORMAT_PATTERN, description="Formato: ndjson, csv o arrow."),
+        proveedor_id: Optional[str] = Query(None, description="ID del proveedor para filtrar."),
+        estado_envio: Optional[str] = Query(None, description="Estado del envío para filtrar."),
+        fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD."),
+        fecha_fin: Optional[date] = Query(None, description="Fecha de fin en formato YYYY-MM-DD.")
+):
+    query = _filtrar(select(*Envios.__table__.columns), proveedor_id, estado_envio, fecha_inicio, fecha_fin)
+    return export_response(query, formato, "envios")
+
 @router.get("/periodo", summary="Obtener envíos por periodo",
-            description="Obtiene la cantidad de envíos agrupados por día, mes o año.")
+            description="Obtiene la cantidad de envíos agrupados por día, mes o año. Se responde desde las "
+                        "tablas de resumen que mantiene la ETL, salvo que se filtre por más de una dimensión.")
 def get_envios_periodo(
         periodo: str = Query("anio", regex="^(dia|mes|anio)$", description="Nivel de agregación de los datos."),
         anio: Optional[int] = Query(None, description="Filtrar por año."),
         mes: Optional[int] = Query(None, description="Filtrar por mes."),
         dia: Optional[int] = Query(None, description="Filtrar por día."),
+        proveedor_id: Optional[str] = Query(None, description="Filtrar por proveedor."),
+        estado_envio: Optional[str] = Query(None, description="Filtrar por estado del envío."),
         limit: int = Query(1000, le=5000, description="Número máximo de registros a devolver."),
         offset: int = Query(0, description="Número de registros a omitir en la paginación."),
         session: Session = Depends(get_session)
 ):
-    query = select(
-        getattr(Tiempo, periodo).label(periodo),
-        func.count(Envios.envio_id).label("total_envios")
-    ).join(Tiempo, Envios.tiempo_id == Tiempo.tiempo_id)
-
-    if anio:
-        query = query.where(Tiempo.anio == anio)
-    if mes:
-        query = query.where(Tiempo.mes == mes)
-    if dia:
-        query = query.where(Tiempo.dia == dia)
-
-    query = query.group_by(getattr(Tiempo, periodo))
+    query = periodo_rollup(session, "envios", "total_envios", periodo, {"anio": anio, "mes": mes, "dia": dia},
+                           {"proveedor": proveedor_id, "estado": estado_envio}, BigInteger)
+
+    if query is None:
+        query = select(
+            getattr(Tiempo, periodo).label(periodo),
+            func.count(Envios.envio_id).label("total_envios")
+        ).join(Tiempo, Envios.tiempo_id == Tiempo.tiempo_id)
+
+        if anio:
+            query = query.where(Tiempo.anio == anio)
+        if mes:
+            query = query.where(Tiempo.mes == mes)
+        if dia:
+            query = query.where(Tiempo.dia == dia)
+        rango = periodo_range(anio, mes, dia)
+        if rango:
+            query = query.where(Envios.fecha >= rango[0], Envios.fecha < rango[1])
+        if proveedor_id:
+            query = query.where(Envios.proveedor_id == proveedor_id)
+        if estado_envio:
+            query = query.where(Envios.estado_envio == estado_envio)
+
+        query = query.group_by(getattr(Tiempo, periodo))
+
     query = query.offset(offset).limit(limit)
 
     return session.exec(query).mappings().all()
\ No newline at end of file
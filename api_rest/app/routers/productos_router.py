@@ -1,20 +1,26 @@
 from typing import Optional, List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlmodel import Session, select
 from ..db import get_session
 from ..models import Productos
+from ..pagination import paginate, set_next_cursor, CURSOR_DESCRIPTION
 
 router = APIRouter()
 
+# Llave primaria de productos: orden de las páginas y contenido de los cursores
+KEYS = [Productos.producto_id]
+
 @router.get("/", response_model=List[Productos], summary="Obtener lista de productos",
             description="Obtiene una lista de productos con paginación y filtros opcionales (por categoría, precio, etc.).")
 def get_productos(
+        response: Response,
         categoria: Optional[str] = Query(None, description="Filtrar por categoría del producto."),
         precio: Optional[float] = Query(None, description="Filtrar por precio exacto del producto."),
         precio_min: Optional[float] = Query(None, description="Filtrar productos con precio mayor o igual a este valor."),
         precio_max: Optional[float] = Query(None, description="Filtrar productos con precio menor o igual a este valor."),
         limit: int = Query(1000, le=5000, description="Número máximo de productos a devolver (máx. 5000)."),
         offset: int = Query(0, description="Número de registros a omitir para la paginación."),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         session: Session = Depends(get_session)
 ):
     query = select(Productos)
@@ -30,17 +36,23 @@ def get_productos(
     elif precio_max is not None:
         query = query.where(Productos.precio_base <= precio_max)
 
-    query = query.offset(offset).limit(limit)
+    query = paginate(query, KEYS, limit, offset, cursor)
 
-    return session.exec(query).all()
+    rows = session.exec(query).all()
+    set_next_cursor(response, rows, KEYS, limit)
+    return rows
 
 @router.get("/nombre", response_model=List[Productos], summary="Filtrar productos por nombre",
             description="Obtiene una lista de productos filtrados por nombre.")
 def get_productos_por_nombre(
+        response: Response,
         nombre_producto: str,
         limit: int = Query(1000, le=5000),
         offset: int = 0,
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         session: Session = Depends(get_session)
 ):
-    query = select(Productos).where(Productos.nombre_producto.ilike(f"%{nombre_producto}%")).offset(offset).limit(limit)
-    return session.exec(query).all()
\ No newline at end of file
+    query = paginate(select(Productos).where(Productos.nombre_producto.ilike(f"%{nombre_producto}%")), KEYS, limit, offset, cursor)
+    rows = session.exec(query).all()
+    set_next_cursor(response, rows, KEYS, limit)
+    return rows
\ No newline at end of file
@@ -1,18 +1,24 @@
 from typing import Optional, List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlmodel import Session, select
 from ..db import get_session
 from ..models import Proveedores
+from ..pagination import paginate, set_next_cursor, CURSOR_DESCRIPTION
 
 router = APIRouter()
 
+# Llave primaria de proveedores: orden de las páginas y contenido de los cursores
+KEYS = [Proveedores.proveedor_id]
+
 @router.get("/", response_model=List[Proveedores], summary="Obtener lista de proveedores con filtros opcionales",
             description="Obtiene una lista de proveedores con paginación y filtros opcionales por ubicación y estado del envío.")
 def get_proveedores(
+        response: Response,
         ubicacion: Optional[str] = Query(None, description="Ubicación del proveedor para filtrar."),
         estado_envio: Optional[str] = Query(None, descaaaaaription="Estado del envío para filtrar."),
         limit: int = Query(1000, le=5000, description="Número máximo de proveedores a devolver (máx. 5000)."),
         offset: int = Query(0, description="Número de registros a omitir para la paginación."),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         session: Session = Depends(get_session)
 ):
     query = select(Proveedores)
@@ -22,28 +28,38 @@ def get_proveedores(
     if estado_envio:
         query = query.where(Proveedores.envios.any(estado_envio=estado_envio))
 
-    query = query.offset(offset).limit(limit)
+    query = paginate(query, KEYS, limit, offset, cursor)
 
-    return session.exec(query).all()
+    rows = session.exec(query).all()
+    set_next_cursor(response, rows, KEYS, limit)
+    return rows
 
 @router.get("/nombre", response_model=List[Proveedores], summary="Filtrar proveedores por nombre",
             description="Obtiene una lista de proveedores filtrados por nombre.")
 def get_proveedores_por_nombre(
+        response: Response,
         nombre_proveedor: str,
         limit: int = Query(1000, le=5000),
         offset: int = 0,
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         session: Session = Depends(get_session)
 ):
-    query = select(Proveedores).where(Proveedores.nombre_proveedor.ilike(f"%{nombre_proveedor}%")).offset(offset).limit(limit)
-    return session.exec(query).all()
+    query = paginate(select(Proveedores).where(Proveedores.nombre_proveedor.ilike(f"%{nombre_proveedor}%")), KEYS, limit, offset, cursor)
+    rows = session.exec(query).all()
+    set_next_cursor(response, rows, KEYS, limit)
+    return rows
 
 @router.get("/contacto", response_model=List[Proveedores], summary="Filtrar proveedores por contacto",
             description="Obtiene una lista de proveedores filtrados por contacto.")
 def get_proveedores_por_contacto(
+        response: Response,
         contacto: str,
         limit: int = Query(1000, le=5000),
         offset: int = 0,
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         session: Session = Depends(get_session)
 ):
-    query = select(Proveedores).where(Proveedores.contacto.ilike(f"%{contacto}%")).offset(offset).limit(limit)
-    return session.exec(query).all()
+    query = paginate(select(Proveedores).where(Proveedores.contacto.ilike(f"%{contacto}%")), KEYS, limit, offset, cursor)
+    rows = session.exec(query).all()
+    set_next_cursor(response, rows, KEYS, limit)
+    return rows
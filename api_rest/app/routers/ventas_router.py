@@ -1,19 +1,44 @@
+from datetime import date
 from typing import Optional, List
-from fastapi import APIRouter, Depends, Query
+from fastapi import APIRouter, Depends, Query, Response
 from sqlmodel import Session, select, func
+from sqlalchemy import Float
 from sqlalchemy.orm import selectinload
 from ..db import get_session
+from ..filters import periodo_range
+from ..rollups import periodo_rollup
+from ..pagination import paginate, set_next_cursor, CURSOR_DESCRIPTION
+from ..export import export_response, FORMAT_PATTERN
 from ..models import Ventas, Clientes, Productos, Tiempo
 
 router = APIRouter()
 
+# Llave primaria de ventas: orden de las páginas y contenido de los cursores
+KEYS = [Ventas.venta_id, Ventas.fecha]
+
+def _filtrar(query, fecha_inicio, fecha_fin, cliente_id, producto_id, sucursal_id):
+    """Aplica los filtros de /ventas, compartidos con /ventas/export."""
+    if cliente_id:
+        query = query.where(Ventas.cliente_id == cliente_id)
+    if producto_id:
+        query = query.where(Ventas.producto_id == producto_id)
+    if fecha_inicio:
+        query = query.where(Ventas.fecha >= fecha_inicio)
+    if fecha_fin:
+        query = query.where(Ventas.fecha <= fecha_fin)
+    if sucursal_id:
+        query = query.where(Ventas.sucursal_id == sucursal_id)
+    return query
+
 @router.get("/", summary="Obtener ventas",
             description="Recupera una lista de ventas con opciones de filtrado y paginación.")
 def get_ventas(
+        response: Response,
         limit: int = Query(1000, le=5000, description="Número máximo de registros a devolver (máx. 5000)."),
         offset: int = Query(0, description="Número de registros a omitir en la paginación."),
-        fecha_inicio: Optional[str] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD."),
-        fecha_fin: Optional[str] = Query(None, description="Fecha de fin en formato YYYY-MM-DD."),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
+        fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD."),
+        fecha_fin: Optional[date] = Query(None, description="Fecha de fin en formato YYYY-MM-DD."),
         cliente_id: Optional[str] = Query(None, description="ID del cliente para filtrar."),
         producto_id: Optional[str] = Query(None, description="ID del producto para filtrar."),
         sucursal_id: Optional[int] = Query(None, description="ID de la sucursal para filtrar."),
@@ -22,7 +47,7 @@ def get_ventas(
         include_proveedor: bool = Query(False, description="Incluir información del proveedor en la respuesta."),
         session: Session = Depends(get_session)
 ):
-    query = select(Ventas).join(Tiempo, Ventas.tiempo_id == Tiempo.tiempo_id).options(selectinload(Ventas.tiempo))
+    query = select(Ventas).options(selectinload(Ventas.tiempo))
     load_options = []
     if include_cliente:
         load_options.append(selectinload(Ventas.cliente))
@@ -34,19 +59,10 @@ def get_ventas(
     if load_options:
         query = query.options(*load_options)
 
-    if cliente_id:
-        query = query.where(Ventas.cliente_id == cliente_id)
-    if producto_id:
-        query = query.where(Ventas.producto_id == producto_id)
-    if fecha_inicio:
-        query = query.where(Tiempo.fecha >= fecha_inicio)
-    if fecha_fin:
-        query = query.where(Tiempo.fecha <= fecha_fin)
-    if sucursal_id:
-        query = query.where(Ventas.sucursal_id == sucursal_id)
-
-    query = query.offset(offset).limit(limit)
+    query = _filtrar(query, fecha_inicio, fecha_fin, cliente_id, producto_id, sucursal_id)
+    query = paginate(query, KEYS, limit, offset, cursor)
     ventas = session.exec(query).all()
+    set_next_cursor(response, ventas, KEYS, limit)
 
     result = []
     for venta in ventas:
@@ -62,18 +78,35 @@ def get_ventas(
 
     return result
 
+@router.get("/export", summary="Exportar ventas",
+            description="Descarga todas las ventas que cumplen los filtros de /ventas, sin paginar, como NDJSON, CSV "
+                        "o Arrow IPC. Las filas se envían por lotes a medida que se leen de la base de datos.")
+def export_ventas(
+        formato: str = Query("ndjson", regex=FORMAT_PATTERN, description="Formato: ndjson, csv o arrow."),
+        fecha_inicio: Optional[date] = Query(None, description="Fecha de inicio en formato YYYY-MM-DD."),
+        fecha_fin: Optional[date] = Query(None, description="Fecha de fin en formato YYYY-MM-DD."),
+        cliente_id: Optional[str] = Query(None, description="ID del cliente para filtrar."),
+        producto_id: Optional[str] = Query(None, description="ID del producto para filtrar."),
+        sucursal_id: Optional[int] = Query(None, description="ID de la sucursal para filtrar.")
+):
+    query = _filtrar(select(*Ventas.__table__.columns), fecha_inicio, fecha_fin, cliente_id, producto_id, sucursal_id)
+    return export_response(query, formato, "ventas")
+
 @router.get("/categoria/{categoria}", summary="Obtener ventas por categoría",
             description="Recupera las ventas filtradas por categoría del producto.")
 def get_ventas_por_categoria(
+        response: Response,
         categoria: str,
         limit: int = Query(1000, le=5000, description="Número máximo de registros a devolver (máx. 5000)."),
         offset: int = Query(0, description="Número de registros a omitir en la paginación."),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         session: Session = Depends(get_session)
 ):
     query = select(Ventas).join(Productos).join(Tiempo, Ventas.tiempo_id == Tiempo.tiempo_id).options(selectinload(Ventas.tiempo))
     query = query.where(Productos.categoria == categoria)
-    query = query.offset(offset).limit(limit)
+    query = paginate(query, KEYS, limit, offset, cursor)
     ventas = session.exec(query).all()
+    set_next_cursor(response, ventas, KEYS, limit)
 
     result = []
     for venta in ventas:
@@ -84,29 +117,47 @@ def get_ventas_por_categoria(
     return result
 
 @router.get("/periodo", summary="Obtener ventas por periodo",
-            description="Obtiene la suma de ventas agrupadas por día, mes o año.")
+            description="Obtiene la suma de ventas agrupadas por día, mes o año. Se responde desde las tablas "
+                        "de resumen que mantiene la ETL, salvo que se filtre por más de una dimensión.")
 def get_ventas_periodo(
         periodo: str = Query("anio", regex="^(dia|mes|anio)$", description="Nivel de agregación de los datos."),
         anio: Optional[int] = Query(None, description="Filtrar por año."),
         mes: Optional[int] = Query(None, description="Filtrar por mes."),
         dia: Optional[int] = Query(None, description="Filtrar por día."),
+        sucursal_id: Optional[int] = Query(None, description="Filtrar por sucursal."),
+        producto_id: Optional[str] = Query(None, description="Filtrar por producto."),
+        categoria: Optional[str] = Query(None, description="Filtrar por categoría del producto."),
         limit: int = Query(1000, le=5000, description="Número máximo de registros a devolver."),
         offset: int = Query(0, description="Número de registros a omitir en la paginación."),
         session: Session = Depends(get_session)
 ):
-    query = select(
-        getattr(Tiempo, periodo).label(periodo),
-        func.sum(Ventas.total).label("total_ventas")
-    ).join(Tiempo, Ventas.tiempo_id == Tiempo.tiempo_id)
-
-    if anio:
-        query = query.where(Tiempo.anio == anio)
-    if mes:
-        query = query.where(Tiempo.mes == mes)
-    if dia:
-        query = query.where(Tiempo.dia == dia)
-
-    query = query.group_by(getattr(Tiempo, periodo))
+    query = periodo_rollup(session, "ventas", "total_ventas", periodo, {"anio": anio, "mes": mes, "dia": dia},
+                           {"sucursal": sucursal_id, "producto": producto_id, "categoria": categoria}, Float)
+
+    if query is None:
+        query = select(
+            getattr(Tiempo, periodo).label(periodo),
+            func.sum(Ventas.total).label("total_ventas")
+        ).join(Tiempo, Ventas.tiempo_id == Tiempo.tiempo_id)
+
+        if anio:
+            query = query.where(Tiempo.anio == anio)
+        if mes:
+            query = query.where(Tiempo.mes == mes)
+        if dia:
+            query = query.where(Tiempo.dia == dia)
+        rango = periodo_range(anio, mes, dia)
+        if rango:
+            query = query.where(Ventas.fecha >= rango[0], Ventas.fecha < rango[1])
+        if sucursal_id:
+            query = query.where(Ventas.sucursal_id == sucursal_id)
+        if producto_id:
+            query = query.where(Ventas.producto_id == producto_id)
+        if categoria:
+            query = query.join(Productos).where(Productos.categoria == categoria)
+
+        query = query.group_by(getattr(Tiempo, periodo))
+
     query = query.offset(offset).limit(limit)
 
     return session.exec(query).mappings().all()
@@ -114,12 +165,14 @@ def get_ventas_periodo(
 @router.get("/genero", summary="Obtener ventas por género",
             description="Filtra las ventas por género y rango de edad de los clientes.")
 def get_ventas_por_genero(
+        response: Response,
         genero: List[str] = Query(["Masculino", "Femenino", "Otro"], description="Lista de géneros a filtrar."),
         edad: Optional[int] = Query(None, description="Edad exacta del cliente."),
         edad_min: Optional[int] = Query(None, description="Edad mínima del cliente."),
         edad_max: Optional[int] = Query(None, description="Edad máxima del cliente."),
         limit: int = Query(1000, le=5000, description="Número máximo de registros a devolver."),
         offset: int = Query(0, description="Número de registros a omitir en la paginación."),
+        cursor: Optional[str] = Query(None, description=CURSOR_DESCRIPTION),
         session: Session = Depends(get_session)
 ):
     query = select(Ventas).join(Clientes).join(Tiempo, Ventas.tiempo_id == Tiempo.tiempo_id).options(selectinload(Ventas.tiempo))
@@ -132,8 +185,9 @@ def get_ventas_por_genero(
         query = query.where(Clientes.edad >= edad_min)
     elif edad_max is not None:
         query = query.where(Clientes.edad <= edad_max)
-    query = query.offset(offset).limit(limit)
+    query = paginate(query, KEYS, limit, offset, cursor)
     ventas = session.exec(query).all()
+    set_next_cursor(response, ventas, KEYS, limit)
 
     result = []
     for venta in ventas:
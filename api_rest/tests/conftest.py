@@ -0,0 +1,8 @@
+import os
+import sys
+import tempfile
+
+# La API se importa como la ejecuta uvicorn, desde la carpeta api_rest, sobre una base SQLite temporal. La variable
+# se define antes de importar app.db, que crea el motor al importarse
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(tempfile.mkdtemp(), 'api.db')}"
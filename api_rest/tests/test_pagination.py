@@ -0,0 +1,65 @@
+from datetime import date, timedelta
+import pytest
+from fastapi.testclient import TestClient
+from sqlmodel import Session, SQLModel
+from app.db import engine
+from app.models import Tiempo, Ventas
+from app.pagination import encode_cursor, decode_cursor, NEXT_CURSOR_HEADER
+from app.routers.ventas_router import KEYS
+from main import app
+
+
+@pytest.fixture(scope="module")
+def client():
+    # En PostgreSQL la ETL crea ventas particionada; aquí basta con la tabla del modelo
+    SQLModel.metadata.create_all(engine)
+    with Session(engine) as session:
+        # Varias ventas comparten venta_id en fechas distintas: la página debe cortar por la llave completa
+        session.add(Tiempo(tiempo_id="0000000001", fecha="2024-01-01", hora="00:00:00"))
+        session.add_all(Ventas(venta_id=f"{i // 3:010d}", fecha=date(2024, 1, 1) + timedelta(days=(i * 7) % 40),
+                               producto_id="0000000001", cantidad=1, precio_unitario=1.0, cliente_id="0000000001",
+                               total=1.0, tiempo_id="0000000001")
+                        for i in range(25))
+        session.commit()
+    with TestClient(app) as client:
+        yield client
+
+
+def _key(row):
+    return row["venta_id"], row["fecha"]
+
+
+def test_cursor_pages_do_not_skip_or_repeat_rows(client):
+    expected = sorted(_key(row) for row in client.get("/ventas/", params={"limit": 100}).json())
+    seen, cursor = [], None
+
+    while True:
+        response = client.get("/ventas/", params={"limit": 4, "cursor": cursor} if cursor else {"limit": 4})
+        assert response.status_code == 200
+        seen += [_key(row) for row in response.json()]
+        cursor = response.headers.get(NEXT_CURSOR_HEADER)
+        if cursor is None:
+            break
+
+    assert len(expected) == 25
+    assert seen == expected
+
+
+def test_cursor_round_trips_dates():
+    values = ["0000000007", date(2024, 2, 29)]
+
+    assert decode_cursor(encode_cursor(values), KEYS) == values
+
+
+@pytest.mark.parametrize("cursor", [
+    "no es un cursor",
+    encode_cursor(["0000000001"]),
+    encode_cursor({"venta_id": "0000000001"}),
+    encode_cursor(["0000000001", "2024-13-01"]),
+    encode_cursor(["0000000001", 20240101]),
+])
+def test_invalid_cursor_returns_400(client, cursor):
+    response = client.get("/ventas/", params={"cursor": cursor})
+
+    assert response.status_code == 400
+    assert response.json() == {"detail": "Cursor inválido."}
@@ -5,17 +5,17 @@ def obtener_datos_paginados(url, params, obtener_todo, limit, offset):
     datos_totales = []
 
     if obtener_todo:
-        temp_offset = 0
+        # Se recorren las páginas con el cursor de la respuesta anterior (X-Next-Cursor), que no se envía en la última
+        params.update({"limit": limit})
         while True:
-            params.update({"limit": limit, "offset": temp_offset})
             response = requests.get(url, params=params)
 
             if response.status_code == 200:
-                datos = response.json()
-                if not datos:
+                datos_totales.extend(response.json())
+                cursor = response.headers.get("X-Next-Cursor")
+                if not cursor:
                     break
-                datos_totales.extend(datos)
-                temp_offset += limit
+                params["cursor"] = cursor
             else:
                 st.error(f"Error al obtener datos de la API: {response.status_code}")
                 return []
@@ -0,0 +1,158 @@
+import json
+import os
+import shutil
+from datetime import datetime
+from config import (ETL_BENCH_SCALES, ETL_BENCH_DIR, ETL_BENCH_REPEAT, ETL_BENCH_TOLERANCE, ETL_BENCH_SAVE_BASELINE,
+                    ETL_BENCH_LOAD, ETL_CHUNKSIZE, ETL_INTERMEDIATE_FORMAT, ETL_CSV_ENGINE, ETL_MAX_WORKERS,
+                    ETL_LOW_MEMORY, ETL_MEMORY_BUDGET_MB)
+from extract.generate_data import generate_all_csv
+from main import build_stages
+from dag import DagRunner
+from run_report import measure
+
+# Las mediciones más cortas que esto no se comparan con la línea base: su ruido supera cualquier tolerancia
+MIN_COMPARABLE_SECONDS = 0.5
+
+# Módulo de las etapas que escriben en PostgreSQL; solo se incluyen en el pipeline con ETL_BENCH_LOAD=1
+LOAD_MODULE = "load.load_to_postgresql"
+
+
+def pipeline_stages(load=ETL_BENCH_LOAD):
+    """Etapas de la ETL sin la descarga ni los watermarks (los datos son sintéticos) y, si no se pide, sin la
+    carga a la base."""
+    stages = [stage for stage in build_stages() if stage.name not in ("download", "record_watermarks")
+              and (load or stage.func.__module__ != LOAD_MODULE)]
+    names = {stage.name for stage in stages}
+    for stage in stages:
+        stage.depends_on = [dep for dep in stage.depends_on if dep in names]
+    return stages
+
+
+def _reset_output():
+    # Cada repetición parte de output/ vacío: sin tablas de la corrida anterior ni caché de texto
+    shutil.rmtree("output", ignore_errors=True)
+    os.makedirs("output/stages", exist_ok=True)
+
+
+def _result(runs, rows):
+    # De las repeticiones se conserva la más rápida, la menos afectada por el ruido de la máquina
+    metrics = min(runs, key=lambda run: run["wall_seconds"])
+    return {
+        "rows": rows,
+        "wall_seconds": metrics["wall_seconds"],
+        "cpu_seconds": metrics["cpu_seconds"],
+        "peak_rss_mb": metrics["peak_rss_mb"],
+        "rows_per_second": rows / metrics["wall_seconds"] if metrics["wall_seconds"] > 0 else 0.0,
+    }
+
+
+def benchmark_scale(sales_rows):
+    """
+    Genera (o reutiliza) los datos sintéticos de una escala y mide cada función de limpieza por separado,
+    en orden y en este proceso, y luego el pipeline completo con DagRunner (el pico de memoria del
+    pipeline es el del proceso principal; las etapas corren en el pool).
+
+    :param sales_rows: Filas de ventas y de logística de la escala
+    :return: Diccionario benchmark -> filas, segundos, CPU, pico de memoria y filas por segundo
+    """
+    scale_dir = os.path.join(ETL_BENCH_DIR, f"scale_{sales_rows}")
+    rows = generate_all_csv(os.path.join(scale_dir, "data"), sales_rows)
+
+    # Las etapas con archivos de origen son las de limpieza; se ejecutan en el orden del grafo, de modo
+    # que cada una encuentra en output/stages las tablas que producen las anteriores
+    stages = [stage for stage in pipeline_stages() if stage.inputs]
+    runs = {stage.name: [] for stage in stages}
+    runs["pipeline"] = []
+
+    cwd = os.getcwd()
+    os.chdir(scale_dir)
+    try:
+        for _ in range(ETL_BENCH_REPEAT):
+            _reset_output()
+            for stage in stages:
+                runs[stage.name].append(measure(stage.func, stage.args, stage.kwargs))
+
+        for _ in range(ETL_BENCH_REPEAT):
+            _reset_output()
+            runs["pipeline"].append(measure(DagRunner(pipeline_stages(), max_workers=ETL_MAX_WORKERS).run))
+    finally:
+        os.chdir(cwd)
+
+    results = {}
+    for stage in stages:
+        results[stage.name] = _result(runs[stage.name], sum(rows[os.path.basename(path)] for path in stage.inputs))
+    results["pipeline"] = _result(runs["pipeline"], sum(rows.values()))
+
+    for name, result in results.items():
+        print(f"   {name}: {result['wall_seconds']:.2f}s, {result['rows_per_second']:,.0f} filas/s")
+    return results
+
+
+def compare_with_baseline(results, baseline, tolerance=ETL_BENCH_TOLERANCE):
+    """
+    Compara el rendimiento con el de la línea base guardada.
+
+    :param results: Resultados de run_benchmarks (escala -> benchmark -> métricas)
+    :param baseline: Resultados de referencia con el mismo formato
+    :param tolerance: Caída relativa de filas por segundo a partir de la cual se marca una regresión
+    :return: Lista de regresiones (escala, benchmark, filas/s de referencia y actuales)
+    """
+    regressions = []
+    for scale, benchmarks in results.items():
+        for name, current in benchmarks.items():
+            reference = baseline.get(scale, {}).get(name)
+            if not reference or reference["wall_seconds"] < MIN_COMPARABLE_SECONDS:
+                continue
+            if current["rows_per_second"] < reference["rows_per_second"] * (1 - tolerance):
+                regressions.append({"scale": scale, "benchmark": name,
+                                    "baseline": reference["rows_per_second"], "current": current["rows_per_second"]})
+    return regressions
+
+
+def run_benchmarks(scales=ETL_BENCH_SCALES):
+    """
+    Ejecuta los benchmarks en cada escala, guarda los resultados en ETL_BENCH_DIR y los compara con
+    baseline.json. Si no hay línea base (o con ETL_BENCH_SAVE_BASELINE=1) los resultados pasan a serlo.
+
+    :param scales: Filas de ventas de cada escala
+    :return: Lista de regresiones respecto a la línea base
+    """
+    os.makedirs(ETL_BENCH_DIR, exist_ok=True)
+    config = {"chunksize": ETL_CHUNKSIZE, "intermediate_format": ETL_INTERMEDIATE_FORMAT,
+              "csv_engine": ETL_CSV_ENGINE, "max_workers": ETL_MAX_WORKERS, "repeat": ETL_BENCH_REPEAT,
+              "load": ETL_BENCH_LOAD, "low_memory": ETL_LOW_MEMORY,
+              "memory_budget_mb": ETL_MEMORY_BUDGET_MB if ETL_LOW_MEMORY else None}
+
+    results = {}
+    for sales_rows in scales:
+        print(f"⏱️ Benchmark con {sales_rows:,} ventas...")
+        results[str(sales_rows)] = benchmark_scale(sales_rows)
+
+    report = {"started_at": datetime.now().isoformat(timespec="seconds"), "config": config, "results": results}
+    path = os.path.join(ETL_BENCH_DIR, f"bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"📊 Resultados guardados en {path}")
+
+    regressions = []
+    baseline_path = os.path.join(ETL_BENCH_DIR, "baseline.json")
+    if os.path.exists(baseline_path) and not ETL_BENCH_SAVE_BASELINE:
+        with open(baseline_path, "r") as file:
+            baseline = json.load(file)
+        if baseline["config"] != config:
+            print(f"⚠️ La línea base se midió con otra configuración: {baseline['config']}")
+        regressions = compare_with_baseline(results, baseline["results"])
+        for regression in regressions:
+            print(f"   ⚠️ Regresión en {regression['benchmark']} ({regression['scale']} ventas): "
+                  f"{regression['baseline']:,.0f} → {regression['current']:,.0f} filas/s")
+        if not regressions:
+            print("✅ Sin regresiones respecto a la línea base")
+    else:
+        shutil.copyfile(path, baseline_path)
+        print(f"📌 Línea base guardada en {baseline_path}")
+
+    return regressions
+
+
+if __name__ == "__main__":
+    raise SystemExit(1 if run_benchmarks() else 0)
@@ -6,3 +6,77 @@ load_dotenv()
 AZURE_STORAGE_ACCOUNT = os.getenv("AZURE_STORAGE_ACCOUNT")
 AZURE_STORAGE_KEY = os.getenv("AZURE_STORAGE_KEY")
 AZURE_CONTAINER_NAME = os.getenv("AZURE_CONTAINER_NAME")
+
+# Filas por bloque al limpiar ventas y logística; 0 o vacío procesa cada archivo completo en memoria
+ETL_CHUNKSIZE = int(os.getenv("ETL_CHUNKSIZE") or 0) or None
+
+# Con ETL_CACHE=0 se ejecutan todas las etapas aunque sus entradas no hayan cambiado
+ETL_CACHE_ENABLED = os.getenv("ETL_CACHE", "1") != "0"
+
+# Formato de las tablas intermedias entre etapas ("parquet" o "csv")
+ETL_INTERMEDIATE_FORMAT = os.getenv("ETL_INTERMEDIATE_FORMAT", "parquet")
+
+# Con ETL_CSV_EXPORT=1 las tablas finales también se exportan a CSV en output/
+ETL_CSV_EXPORT = os.getenv("ETL_CSV_EXPORT", "0") == "1"
+
+# Número de procesos para ejecutar etapas independientes en paralelo (por defecto, el número de CPUs)
+ETL_MAX_WORKERS = int(os.getenv("ETL_MAX_WORKERS") or 0) or None
+
+# Con ETL_IN_MEMORY=1 la ETL corre en un solo proceso pasando DataFrames entre etapas, sin escribir tablas intermedias
+ETL_IN_MEMORY = os.getenv("ETL_IN_MEMORY", "0") == "1"
+
+# En modo en memoria, con ETL_WRITE_OUTPUTS=1 también se guardan las tablas finales en output/
+ETL_WRITE_OUTPUTS = os.getenv("ETL_WRITE_OUTPUTS", "0") == "1"
+
+# Parser para los CSV de origen: vacío usa el de pandas (C); "pyarrow" usa el de Arrow, multihilo
+ETL_CSV_ENGINE = os.getenv("ETL_CSV_ENGINE") or None
+
+# Carpeta de la caché persistente de normalización de texto; vacía desactiva la caché
+ETL_TEXT_CACHE_DIR = os.getenv("ETL_TEXT_CACHE_DIR", "output/.text_cache")
+
+# Con ETL_LOW_MEMORY=1 los enteros de origen se leen con el tipo más chico posible y las tablas de hechos se
+# procesan por bloques si su limpieza no cabe en ETL_MEMORY_BUDGET_MB (estimado a partir de una muestra)
+ETL_LOW_MEMORY = os.getenv("ETL_LOW_MEMORY", "0") == "1"
+ETL_MEMORY_BUDGET_MB = int(os.getenv("ETL_MEMORY_BUDGET_MB") or 1024)
+
+# Cómo se publican las tablas en una carga completa: "swap" las reconstruye en staging y reemplaza las publicadas;
+# "merge" inserta o actualiza sus filas por llave primaria en las tablas publicadas (que deben existir), sin
+# dejarlas fuera de línea. Las filas que desaparecen del origen no se borran en el modo "merge". "partitions" es
+# como "merge", pero en ventas y envíos (particionadas por mes) reemplaza completos solo los meses que cambiaron
+ETL_LOAD_MODE = os.getenv("ETL_LOAD_MODE", "swap")
+
+# Con ETL_INCREMENTAL=1 solo se descargan y procesan las filas agregadas a ventas.csv y logistica.csv desde la
+# última carga (según los watermarks de ETL_WATERMARKS_PATH) y se integran en las tablas publicadas. Si no hay
+# watermarks o un archivo se reescribió se hace una carga completa; ETL_FULL_REBUILD=1 la fuerza. Sin
+# ETL_INCREMENTAL=1 las cargas completas no registran watermarks (y borran los de cargas anteriores)
+ETL_INCREMENTAL = os.getenv("ETL_INCREMENTAL", "0") == "1"
+ETL_FULL_REBUILD = os.getenv("ETL_FULL_REBUILD", "0") == "1"
+ETL_WATERMARKS_PATH = os.getenv("ETL_WATERMARKS_PATH", "output/.watermarks.json")
+# Envíos cuya venta todavía no se publicó al terminar una carga; la siguiente carga incremental los vuelve a procesar
+ETL_PENDING_LOGISTICS_PATH = os.getenv("ETL_PENDING_LOGISTICS_PATH", "output/.envios_pendientes.csv")
+
+# Carpeta de los reportes de ejecución (tiempo, CPU, memoria y filas por etapa)
+ETL_REPORT_DIR = os.getenv("ETL_REPORT_DIR", "output/reports")
+
+# Con ETL_TRACEMALLOC=1 el reporte también mide el pico de memoria de Python con tracemalloc (más lento)
+ETL_TRACEMALLOC = os.getenv("ETL_TRACEMALLOC", "0") == "1"
+
+# Benchmarks (benchmark.py): filas de ventas de cada escala, carpeta de datos y resultados, repeticiones por
+# medición (se conserva la más rápida) y caída de filas/s respecto a la línea base que se marca como regresión
+ETL_BENCH_SCALES = [int(rows) for rows in os.getenv("ETL_BENCH_SCALES", "10000,100000,1000000").split(",")]
+ETL_BENCH_DIR = os.path.abspath(os.getenv("ETL_BENCH_DIR", "output/benchmarks"))
+ETL_BENCH_REPEAT = int(os.getenv("ETL_BENCH_REPEAT") or 1)
+ETL_BENCH_TOLERANCE = float(os.getenv("ETL_BENCH_TOLERANCE") or 0.15)
+
+# Con ETL_BENCH_SAVE_BASELINE=1 los resultados reemplazan la línea base en lugar de compararse con ella
+ETL_BENCH_SAVE_BASELINE = os.getenv("ETL_BENCH_SAVE_BASELINE", "0") == "1"
+
+# Con ETL_BENCH_LOAD=1 el benchmark del pipeline incluye la carga a PostgreSQL (requiere DATABASE_URL)
+ETL_BENCH_LOAD = os.getenv("ETL_BENCH_LOAD", "0") == "1"
+
+# Benchmark de formatos (format_benchmark.py): ventas de los datos sintéticos con los que se comparan CSV y Parquet
+ETL_FORMAT_BENCH_ROWS = int(os.getenv("ETL_FORMAT_BENCH_ROWS") or 200_000)
+
+# Benchmark de consultas (query_benchmark.py): ventas y años de los datos sintéticos que se cargan en la base
+ETL_QUERY_BENCH_ROWS = int(os.getenv("ETL_QUERY_BENCH_ROWS") or 1_000_000)
+ETL_QUERY_BENCH_YEARS = int(os.getenv("ETL_QUERY_BENCH_YEARS") or 5)
@@ -0,0 +1,189 @@
+import os
+import time
+from concurrent.futures import ProcessPoolExecutor, wait, FIRST_COMPLETED
+from dataclasses import dataclass, field
+from run_report import measure
+
+
+@dataclass
+class Stage:
+    """
+    Etapa declarativa de la ETL.
+
+    :param name: Nombre único de la etapa
+    :param func: Función (a nivel de módulo, para poder enviarla a otro proceso) que implementa la etapa
+    :param args: Argumentos posicionales de la función
+    :param kwargs: Argumentos con nombre de la función
+    :param inputs: Archivos externos que lee la etapa (forman parte de su clave de caché)
+    :param outputs: Archivos que la etapa debe dejar en disco al terminar
+    :param depends_on: Nombres de las etapas que deben terminar antes de empezar esta
+    :param message: Mensaje que se imprime al iniciar la etapa
+    :param cacheable: Si es False la etapa se ejecuta siempre (por ejemplo, las cargas a la base de datos)
+    """
+    name: str
+    func: object
+    args: tuple = ()
+    kwargs: dict = field(default_factory=dict)
+    inputs: list = field(default_factory=list)
+    outputs: list = field(default_factory=list)
+    depends_on: list = field(default_factory=list)
+    message: str = ""
+    cacheable: bool = True
+
+
+class DagRunner:
+    """
+    Ejecuta un grafo de etapas en un pool de procesos. Cada etapa se lanza en cuanto terminan todas sus
+    dependencias, de modo que las etapas independientes corren en paralelo. Al terminar se pueden
+    consultar los tiempos por etapa y el camino crítico del grafo.
+    """
+
+    def __init__(self, stages, cache=None, max_workers=None, run_report=None):
+        """
+        :param stages: Lista de Stage
+        :param cache: StageCache opcional para omitir las etapas que no cambiaron
+        :param max_workers: Número máximo de procesos (por defecto, el número de CPUs)
+        :param run_report: RunReport opcional; cada etapa se mide dentro de su proceso y se registra en él
+        """
+        self.stages = {stage.name: stage for stage in stages}
+        self.cache = cache
+        self.max_workers = max_workers
+        self.run_report = run_report
+        self.timings = {}
+        self._validate()
+
+    def _validate(self):
+        for stage in self.stages.values():
+            for dep in stage.depends_on:
+                if dep not in self.stages:
+                    raise ValueError(f"⛔ La etapa '{stage.name}' depende de '{dep}', que no existe.")
+
+        visiting, visited = set(), set()
+
+        def visit(name):
+            if name in visited:
+                return
+            if name in visiting:
+                raise ValueError(f"⛔ Ciclo en el grafo de etapas en '{name}'.")
+            visiting.add(name)
+            for dep in self.stages[name].depends_on:
+                visit(dep)
+            visiting.discard(name)
+            visited.add(name)
+
+        for name in self.stages:
+            visit(name)
+
+    def _ready(self, pending, done):
+        return [name for name in pending if all(dep in done for dep in self.stages[name].depends_on)]
+
+    def _check_outputs(self, stage):
+        missing = [path for path in stage.outputs if not os.path.exists(path)]
+        if missing:
+            raise FileNotFoundError(f"⛔ La etapa '{stage.name}' no generó: {', '.join(missing)}")
+
+    def run(self):
+        """
+        Ejecuta todas las etapas respetando sus dependencias. Si una etapa falla, no se lanzan etapas
+        nuevas, se espera a las que ya estaban en curso y se relanza el error.
+        """
+        pending = set(self.stages)
+        done = set()
+        running = {}
+        keys = {}
+        error = None
+        run_start = time.perf_counter()
+
+        with ProcessPoolExecutor(max_workers=self.max_workers) as executor:
+            while pending or running:
+                ready = self._ready(pending, done) if error is None else []
+
+                for name in ready:
+                    stage = self.stages[name]
+                    pending.discard(name)
+
+                    if self.cache is not None and stage.cacheable:
+                        keys[name], hit = self.cache.lookup(name, stage.func, stage.args, stage.kwargs,
+                                                            stage.inputs, stage.outputs, stage.depends_on)
+                        if hit:
+                            now = time.perf_counter() - run_start
+                            self.timings[name] = {"start": now, "end": now, "seconds": 0.0, "cached": True}
+                            if self.run_report is not None:
+                                self.run_report.add_stage(name, {}, cached=True)
+                            done.add(name)
+                            continue
+
+                    if stage.message:
+                        print(stage.message)
+                    self.timings[name] = {"start": time.perf_counter() - run_start, "cached": False}
+                    if self.run_report is not None:
+                        future = executor.submit(measure, stage.func, stage.args, stage.kwargs,
+                                                 self.run_report.trace_memory)
+                    else:
+                        future = executor.submit(stage.func, *stage.args, **stage.kwargs)
+                    running[future] = name
+
+                if not running:
+                    if error is not None or not self._ready(pending, done):
+                        break
+                    continue
+
+                finished, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in finished:
+                    name = running.pop(future)
+                    stage = self.stages[name]
+                    end = time.perf_counter() - run_start
+                    self.timings[name].update(end=end, seconds=end - self.timings[name]["start"])
+
+                    try:
+                        metrics = future.result()
+                        self._check_outputs(stage)
+                    except Exception as e:
+                        print(f"❌ Error en la etapa '{name}': {e}")
+                        if self.cache is not None:
+                            self.cache.mark_error(name)
+                        if self.run_report is not None:
+                            self.run_report.add_stage(name, {"error": str(e)}, cached=False)
+                        error = error or e
+                        continue
+
+                    if self.run_report is not None:
+                        self.run_report.add_stage(name, metrics, cached=False,
+                                              start_seconds=self.timings[name]["start"])
+
+                    if name in keys:
+                        self.cache.record(name, keys[name], stage.outputs)
+                    done.add(name)
+
+        if error is not None:
+            raise error
+
+    def critical_path(self):
+        """
+        Calcula el camino crítico: la cadena de dependencias con mayor tiempo acumulado.
+
+        :return: Tupla (lista de nombres de etapa en orden, segundos totales)
+        """
+        best = {}
+
+        def longest(name):
+            if name not in best:
+                seconds = self.timings.get(name, {}).get("seconds", 0.0)
+                previous = max((longest(dep) for dep in self.stages[name].depends_on),
+                               key=lambda path: path[1], default=([], 0.0))
+                best[name] = (previous[0] + [name], previous[1] + seconds)
+            return best[name]
+
+        return max((longest(name) for name in self.stages), key=lambda path: path[1], default=([], 0.0))
+
+    def report(self):
+        """
+        Imprime los tiempos de cada etapa y el camino crítico.
+        """
+        print("⏱️ Tiempos por etapa:")
+        for name, timing in sorted(self.timings.items(), key=lambda item: item[1]["start"]):
+            status = "caché" if timing.get("cached") else f"{timing.get('seconds', 0.0):.2f}s"
+            print(f"   {name}: inicio {timing['start']:.2f}s, {status}")
+
+        path, seconds = self.critical_path()
+        print(f"🧭 Camino crítico ({seconds:.2f}s): {' → '.join(path)}")
@@ -10,15 +10,17 @@ CREATE TABLE "tiempo" (
 );
 
 CREATE TABLE "ventas" (
-    "venta_id" VARCHAR(10) PRIMARY KEY,
+    "venta_id" VARCHAR(10),
     "producto_id" VARCHAR(10),
     "cantidad" INT,
     "precio_unitario" DECIMAL(10,2),
     "cliente_id" VARCHAR(10),
     "sucursal_id" INT,
     "total" DECIMAL(10,2),
-    "tiempo_id" VARCHAR(10)
-);
+    "tiempo_id" VARCHAR(10),
+    "fecha" DATE,
+    PRIMARY KEY ("venta_id", "fecha")
+) PARTITION BY RANGE ("fecha");
 
 CREATE TABLE "clientes" (
     "cliente_id" VARCHAR(10) PRIMARY KEY,
@@ -43,12 +45,14 @@ CREATE TABLE "proveedores" (
 );
 
 CREATE TABLE "envios" (
-    "envio_id" VARCHAR(10) PRIMARY KEY,
+    "envio_id" VARCHAR(10),
     "venta_id" VARCHAR(10),
     "proveedor_id" VARCHAR(10),
     "estado_envio" VARCHAR(50) CHECK ("estado_envio" IN ('Retrasado', 'Entregado', 'En tránsito', 'Cancelado')),
-    "tiempo_id" VARCHAR(10)
-);
+    "tiempo_id" VARCHAR(10),
+    "fecha" DATE,
+    PRIMARY KEY ("envio_id", "fecha")
+) PARTITION BY RANGE ("fecha");
 
 
 ALTER TABLE "ventas" ADD FOREIGN KEY ("tiempo_id") REFERENCES "tiempo" ("tiempo_id");
@@ -57,8 +61,6 @@ ALTER TABLE "ventas" ADD FOREIGN KEY ("producto_id") REFERENCES "productos" ("pr
 
 ALTER TABLE "ventas" ADD FOREIGN KEY ("cliente_id") REFERENCES "clientes" ("cliente_id");
 
-ALTER TABLE "envios" ADD FOREIGN KEY ("venta_id") REFERENCES "ventas" ("venta_id");
-
 ALTER TABLE "envios" ADD FOREIGN KEY ("tiempo_id") REFERENCES "tiempo" ("tiempo_id");
 
 ALTER TABLE "envios" ADD FOREIGN KEY ("proveedor_id") REFERENCES "proveedores" ("proveedor_id");
@@ -2,6 +2,9 @@ ALTER TABLE "ventas" ADD CONSTRAINT "fk_ventas_tiempo" FOREIGN KEY ("tiempo_id")
 ALTER TABLE "ventas" ADD CONSTRAINT "fk_ventas_producto" FOREIGN KEY ("producto_id") REFERENCES "productos" ("producto_id");
 ALTER TABLE "ventas" ADD CONSTRAINT "fk_ventas_cliente" FOREIGN KEY ("cliente_id") REFERENCES "clientes" ("cliente_id");
 
-ALTER TABLE "envios" ADD CONSTRAINT "fk_envios_venta" FOREIGN KEY ("venta_id") REFERENCES "ventas" ("venta_id");
+-- envios.venta_id no tiene llave foranea: la llave primaria de ventas (particionada por mes) incluye la fecha.
+-- La ETL descarta los envios de ventas inexistentes (ver clean_logistic.validate_references) y, como tampoco hay
+-- restriccion UNIQUE sobre venta_id ni envio_id, comprueba ambas cosas tras cada carga (ver
+-- load_to_postgresql.check_partitioned_keys).
 ALTER TABLE "envios" ADD CONSTRAINT "fk_envios_tiempo" FOREIGN KEY ("tiempo_id") REFERENCES "tiempo" ("tiempo_id");
 ALTER TABLE "envios" ADD CONSTRAINT "fk_envios_proveedor" FOREIGN KEY ("proveedor_id") REFERENCES "proveedores" ("proveedor_id");
@@ -0,0 +1,72 @@
+CREATE TABLE IF NOT EXISTS "ventas_por_dia" (
+    "fecha" DATE,
+    "anio" INT,
+    "mes" INT,
+    "dia" INT,
+    "desglose" VARCHAR(10),
+    "valor" VARCHAR(50),
+    "total_ventas" DECIMAL(14,2),
+    "cantidad" BIGINT,
+    "num_ventas" BIGINT,
+    PRIMARY KEY ("fecha", "desglose", "valor")
+);
+
+CREATE TABLE IF NOT EXISTS "ventas_por_mes" (
+    "anio" INT,
+    "mes" INT,
+    "desglose" VARCHAR(10),
+    "valor" VARCHAR(50),
+    "total_ventas" DECIMAL(14,2),
+    "cantidad" BIGINT,
+    "num_ventas" BIGINT,
+    PRIMARY KEY ("anio", "mes", "desglose", "valor")
+);
+
+CREATE TABLE IF NOT EXISTS "ventas_por_anio" (
+    "anio" INT,
+    "desglose" VARCHAR(10),
+    "valor" VARCHAR(50),
+    "total_ventas" DECIMAL(14,2),
+    "cantidad" BIGINT,
+    "num_ventas" BIGINT,
+    PRIMARY KEY ("anio", "desglose", "valor")
+);
+
+CREATE TABLE IF NOT EXISTS "envios_por_dia" (
+    "fecha" DATE,
+    "anio" INT,
+    "mes" INT,
+    "dia" INT,
+    "desglose" VARCHAR(10),
+    "valor" VARCHAR(50),
+    "total_envios" BIGINT,
+    PRIMARY KEY ("fecha", "desglose", "valor")
+);
+
+CREATE TABLE IF NOT EXISTS "envios_por_mes" (
+    "anio" INT,
+    "mes" INT,
+    "desglose" VARCHAR(10),
+    "valor" VARCHAR(50),
+    "total_envios" BIGINT,
+    PRIMARY KEY ("anio", "mes", "desglose", "valor")
+);
+
+CREATE TABLE IF NOT EXISTS "envios_por_anio" (
+    "anio" INT,
+    "desglose" VARCHAR(10),
+    "valor" VARCHAR(50),
+    "total_envios" BIGINT,
+    PRIMARY KEY ("anio", "desglose", "valor")
+);
+
+CREATE TABLE IF NOT EXISTS "resumenes_pendientes" (
+    "tabla" VARCHAR(20),
+    "mes" DATE,
+    PRIMARY KEY ("tabla", "mes")
+);
+
+CREATE INDEX IF NOT EXISTS idx_ventas_por_dia_desglose ON ventas_por_dia (desglose, valor, anio, mes);
+CREATE INDEX IF NOT EXISTS idx_ventas_por_mes_desglose ON ventas_por_mes (desglose, valor, anio);
+CREATE INDEX IF NOT EXISTS idx_envios_por_dia_desglose ON envios_por_dia (desglose, valor, anio, mes);
+CREATE INDEX IF NOT EXISTS idx_envios_por_mes_desglose ON envios_por_mes (desglose, valor, anio);
@@ -0,0 +1,53 @@
+CREATE TABLE IF NOT EXISTS "tiempo" (
+    "tiempo_id" VARCHAR(10),
+    "fecha" DATE,
+    "hora" TIME,
+    "anio" INT,
+    "mes" INT,
+    "mes_nombre" VARCHAR(15),
+    "dia" INT,
+    "dia_nombre" VARCHAR(15)
+);
+
+CREATE TABLE IF NOT EXISTS "ventas" (
+    "venta_id" VARCHAR(10),
+    "producto_id" VARCHAR(10),
+    "cantidad" INT,
+    "precio_unitario" DECIMAL(10,2),
+    "cliente_id" VARCHAR(10),
+    "sucursal_id" INT,
+    "total" DECIMAL(10,2),
+    "tiempo_id" VARCHAR(10),
+    "fecha" DATE
+) PARTITION BY RANGE ("fecha");
+
+CREATE TABLE IF NOT EXISTS "clientes" (
+    "cliente_id" VARCHAR(10),
+    "nombre" VARCHAR(255),
+    "edad" INT,
+    "genero" VARCHAR(50),
+    "ubicacion" VARCHAR(255)
+);
+
+CREATE TABLE IF NOT EXISTS "productos" (
+    "producto_id" VARCHAR(10),
+    "nombre_producto" VARCHAR(255),
+    "categoria" VARCHAR(100),
+    "precio_base" DECIMAL(10,2)
+);
+
+CREATE TABLE IF NOT EXISTS "proveedores" (
+    "proveedor_id" VARCHAR(10),
+    "nombre_proveedor" VARCHAR(255),
+    "contacto" VARCHAR(255),
+    "ubicacion" VARCHAR(255)
+);
+
+CREATE TABLE IF NOT EXISTS "envios" (
+    "envio_id" VARCHAR(10),
+    "venta_id" VARCHAR(10),
+    "proveedor_id" VARCHAR(10),
+    "estado_envio" VARCHAR(50),
+    "tiempo_id" VARCHAR(10),
+    "fecha" DATE
+) PARTITION BY RANGE ("fecha");
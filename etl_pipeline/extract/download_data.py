@@ -1,38 +1,105 @@
 from azure.storage.blob import BlobServiceClient
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import lru_cache
 from config import AZURE_STORAGE_ACCOUNT, AZURE_STORAGE_KEY, AZURE_CONTAINER_NAME
 import os
 
+# Tamaño de la primera petición y de cada rango posterior al descargar un blob
+MAX_SINGLE_GET_SIZE = 8 * 1024 * 1024
+MAX_CHUNK_GET_SIZE = 4 * 1024 * 1024
 
-def download_csv(blob_name, local_path):
+
+@lru_cache(maxsize=1)
+def get_blob_service_client():
+    """
+    Crea (una sola vez por proceso) el cliente de Azure Blob Storage compartido por todas las descargas.
+
+    :return: Instancia de BlobServiceClient
+    """
+    connection_string = f"DefaultEndpointsProtocol=https;AccountName={AZURE_STORAGE_ACCOUNT};AccountKey={AZURE_STORAGE_KEY};EndpointSuffix=core.windows.net"
+
+    return BlobServiceClient.from_connection_string(
+        connection_string,
+        max_single_get_size=MAX_SINGLE_GET_SIZE,
+        max_chunk_get_size=MAX_CHUNK_GET_SIZE
+    )
+
+
+def download_csv(blob_name, local_path, blob_service_client=None, max_concurrency=4):
     """
     Descarga un archivo CSV desde Azure Blob Storage.
+    El blob se descarga por rangos y cada rango se escribe directamente en disco, sin cargar el archivo
+    completo en memoria. Se escribe primero en un archivo temporal para no dejar descargas a medias.
 
     :param blob_name: Nombre del archivo en el contenedor de Azure Blob Storage
     :param local_path: Ruta local donde se guardará el archivo descargado
+    :param blob_service_client: Cliente compartido; si no se indica se usa get_blob_service_client()
+    :param max_concurrency: Número de rangos del mismo blob que se descargan en paralelo
     """
-    connection_string = f"DefaultEndpointsProtocol=https;AccountName={AZURE_STORAGE_ACCOUNT};AccountKey={AZURE_STORAGE_KEY};EndpointSuffix=core.windows.net"
-
-    blob_service_client = BlobServiceClient.from_connection_string(connection_string)
+    blob_service_client = blob_service_client or get_blob_service_client()
 
     blob_client = blob_service_client.get_blob_client(container=AZURE_CONTAINER_NAME, blob=blob_name)
 
     os.makedirs(os.path.dirname(local_path), exist_ok=True)
 
-    with open(local_path, "wb") as file:
-        file.write(blob_client.download_blob().readall())
+    tmp_path = f"{local_path}.part"
+    with open(tmp_path, "wb") as file:
+        blob_client.download_blob(max_concurrency=max_concurrency).readinto(file)
+    os.replace(tmp_path, local_path)
 
     print(f"✅ Descargado: {blob_name} → {local_path}")
 
 
-def download_all_csv():
+def get_blob_properties(blob_name, blob_service_client=None):
+    """
+    Consulta el ETag y el tamaño actual de un blob, sin descargarlo.
+
+    :param blob_name: Nombre del archivo en el contenedor de Azure Blob Storage
+    :param blob_service_client: Cliente compartido; si no se indica se usa get_blob_service_client()
+    :return: Tupla (etag, tamaño en bytes)
+    """
+    blob_service_client = blob_service_client or get_blob_service_client()
+    properties = blob_service_client.get_blob_client(container=AZURE_CONTAINER_NAME, blob=blob_name).get_blob_properties()
+    return properties.etag, properties.size
+
+
+def download_range(blob_name, file, offset, length, blob_service_client=None, max_concurrency=4):
+    """
+    Descarga solo un rango de bytes de un blob y lo escribe en un archivo ya abierto (por ejemplo, lo que se
+    agregó al final de un CSV desde la última descarga).
+
+    :param blob_name: Nombre del archivo en el contenedor de Azure Blob Storage
+    :param file: Archivo abierto en modo binario donde se escribe el rango
+    :param offset: Primer byte del rango
+    :param length: Número de bytes del rango
+    :param blob_service_client: Cliente compartido; si no se indica se usa get_blob_service_client()
+    :param max_concurrency: Número de partes del rango que se descargan en paralelo
+    """
+    blob_service_client = blob_service_client or get_blob_service_client()
+
+    blob_client = blob_service_client.get_blob_client(container=AZURE_CONTAINER_NAME, blob=blob_name)
+    blob_client.download_blob(offset=offset, length=length, max_concurrency=max_concurrency).readinto(file)
+
+
+def download_all_csv(max_workers=5):
     """
     Descarga todos los archivos necesarios para la ETL.
 
-    Llama a la función download_csv para cada archivo necesario en el proceso de ETL.
+    Llama a la función download_csv para cada archivo necesario en el proceso de ETL, descargando
+    los archivos en paralelo con un único cliente compartido.
+
+    :param max_workers: Número de archivos que se descargan al mismo tiempo
     """
     files = ["clientes.csv", "productos.csv", "proveedores.csv", "ventas.csv", "logistica.csv"]
 
-    for file in files:
-        download_csv(file, f"data/{file}")
+    blob_service_client = get_blob_service_client()
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        futures = {
+            executor.submit(download_csv, file, f"data/{file}", blob_service_client): file
+            for file in files
+        }
+        for future in as_completed(futures):
+            future.result()
 
     print("✅ Descarga de archivos completada.")
@@ -0,0 +1,213 @@
+import json
+import os
+import numpy as np
+import pandas as pd
+
+# Filas de ventas y logística que se generan y escriben por bloque (acota la memoria con 50M de filas)
+GENERATION_CHUNK_ROWS = 1_000_000
+
+NAMES = ["ana perez", "luis garcia", "maria lopez", "jose martinez", "carmen sanchez", "juan ramirez",
+         "sofia torres", "miguel flores", "lucia rivera", "carlos gomez"]
+LOCATIONS = ["ciudad de mexico", "monterrey", "guadalajara", "puebla", "queretaro", "merida", "tijuana",
+             "leon"]
+CATEGORIES = ["electronica", "ropa", "hogar", "alimentos", "deportes", "juguetes", "libros", "belleza"]
+STATES = ["Retrasado", "Entregado", "En tránsito", "Cancelado"]
+# Las fechas terminan antes de DATE_END (anteriores a hoy, que check_dates conserva); con más años el rango
+# se extiende hacia atrás, de modo que con los dos años por defecto los datos no cambian
+DATE_END = np.datetime64("2024-12-31T00:00")
+YEAR_MINUTES = 365 * 24 * 60
+
+
+def _rng(seed, table, chunk=0):
+    # Una semilla por tabla y bloque: el resultado no depende del orden en que se generan las tablas
+    return np.random.default_rng([seed, table, chunk])
+
+
+def _dirty(rng, size, ratio):
+    """Máscara con las filas que reciben un valor sucio."""
+    return rng.random(size) < ratio
+
+
+def _with_dirty(values, rng, ratio, choices):
+    """
+    Convierte una columna a texto y reemplaza una fracción de sus valores por valores sucios.
+
+    :param values: Arreglo con los valores limpios
+    :param rng: Generador de números aleatorios
+    :param ratio: Fracción de valores sucios
+    :param choices: Valores sucios posibles (se elige uno al azar por fila)
+    :return: Arreglo de objetos listo para escribir en el CSV
+    """
+    values = np.asarray(values).astype(object)
+    mask = _dirty(rng, len(values), ratio)
+    values[mask] = rng.choice(np.array(choices, dtype=object), mask.sum())
+    return values
+
+
+def _timestamps(rng, size, years):
+    start = DATE_END - np.timedelta64(years * YEAR_MINUTES, "m")
+    minutes = rng.integers(0, years * YEAR_MINUTES, size)
+    return np.char.replace(np.datetime_as_string(start + minutes.astype("timedelta64[m]"), unit="s"), "T", " ")
+
+
+def _write(df, path, append=False):
+    df.to_csv(path, index=False, mode="a" if append else "w", header=not append)
+
+
+def generate_customers(path, rows, seed, dirty_ratio):
+    """
+    Genera clientes con los problemas que corrige clean_customers: IDs no enteros o repetidos, nombres con
+    espacios y minúsculas, edades fuera de rango o no numéricas, géneros en minúsculas o desconocidos y filas vacías.
+    """
+    rng = _rng(seed, 0)
+    ids = _with_dirty(np.arange(1, rows + 1), rng, dirty_ratio, ["abc", "12.5", "", "1"])
+    names = _with_dirty(rng.choice(NAMES, rows), rng, dirty_ratio, [" ana  perez ", "LUIS GARCIA", ""])
+    ages = _with_dirty(rng.integers(18, 90, rows), rng, dirty_ratio, [204, 350, 5, -3, "abc", ""])
+    genders = _with_dirty(rng.choice(["M", "F"], rows), rng, dirty_ratio, ["m", "f", "x", "otro", ""])
+    locations = _with_dirty(rng.choice(LOCATIONS, rows), rng, dirty_ratio, ["MONTERREY", "  puebla", ""])
+
+    df = pd.DataFrame({"cliente_id": ids, "nombre": names, "edad": ages, "genero": genders, "ubicacion": locations})
+    df.loc[_dirty(rng, rows, dirty_ratio / 10)] = ""
+    _write(df, path)
+
+
+def generate_products(path, rows, seed, dirty_ratio):
+    """
+    Genera productos con IDs sucios, nombres y categorías sin normalizar y precios no numéricos.
+    Los precios base enteros son distintos entre sí para que clean_sales pueda recuperar el producto por precio.
+    """
+    rng = _rng(seed, 1)
+    prices = (rng.permutation(rows) + 10 + rng.integers(1, 99, rows) / 100).round(2)
+    df = pd.DataFrame({
+        "producto_id": _with_dirty(np.arange(1, rows + 1), rng, dirty_ratio, ["x1", "3.7", ""]),
+        "nombre_producto": _with_dirty(np.char.add("producto ", np.arange(1, rows + 1).astype(str)), rng,
+                                       dirty_ratio, ["  PRODUCTO  ", ""]),
+        "categoria": _with_dirty(rng.choice(CATEGORIES, rows), rng, dirty_ratio, ["ELECTRONICA", " ropa ", ""]),
+        "precio_base": _with_dirty(prices, rng, dirty_ratio, ["n/a", ""]),
+    })
+    _write(df, path)
+    return prices
+
+
+def generate_suppliers(path, rows, seed, dirty_ratio):
+    """
+    Genera proveedores con IDs sucios, correos electrónicos inválidos o vacíos y ubicaciones sin normalizar.
+    """
+    rng = _rng(seed, 2)
+    ids = np.arange(1, rows + 1)
+    df = pd.DataFrame({
+        "proveedor_id": _with_dirty(ids, rng, dirty_ratio, ["p-1", "2.5", ""]),
+        "nombre_proveedor": _with_dirty(np.char.add("proveedor ", ids.astype(str)), rng, dirty_ratio, [" PROV ", ""]),
+        "contacto": _with_dirty(np.char.add(np.char.add("ventas", ids.astype(str)), "@proveedor.com"), rng,
+                                dirty_ratio, ["bad", "a@b", "@proveedor.com", ""]),
+        "ubicacion": _with_dirty(rng.choice(LOCATIONS, rows), rng, dirty_ratio, ["GUADALAJARA", ""]),
+    })
+    _write(df, path)
+
+
+def generate_sales(path, rows, seed, dirty_ratio, customers, prices, years=2):
+    """
+    Genera ventas por bloques. IDs de venta con decimales (como en el origen) o no numéricos, productos
+    inexistentes (se recuperan por precio), clientes inexistentes, cantidades y fechas inválidas.
+    """
+    for chunk, start in enumerate(range(0, rows, GENERATION_CHUNK_ROWS)):
+        size = min(GENERATION_CHUNK_ROWS, rows - start)
+        rng = _rng(seed, 3, chunk)
+
+        products = rng.integers(0, len(prices), size)
+        df = pd.DataFrame({
+            "venta_id": _with_dirty(np.arange(start + 1, start + size + 1).astype(float), rng, dirty_ratio,
+                                    ["abc", "7.5", ""]),
+            "producto_id": _with_dirty(products + 1, rng, dirty_ratio, [len(prices) + 1000, "xyz", ""]),
+            "cantidad": _with_dirty(rng.integers(1, 10, size), rng, dirty_ratio, ["dos", ""]),
+            "precio_unitario": prices[products],
+            "cliente_id": _with_dirty(rng.integers(1, customers + 1, size), rng, dirty_ratio, [customers + 500, ""]),
+            "sucursal_id": rng.integers(1, 6, size),
+            "fecha": _with_dirty(_timestamps(rng, size, years), rng, dirty_ratio, ["fecha invalida", "2023-13-45", ""]),
+        })
+        _write(df, path, append=chunk > 0)
+
+
+def generate_logistics(path, rows, seed, dirty_ratio, sales, suppliers, years=2):
+    """
+    Genera envíos por bloques con IDs de envío sucios o en cero, ventas y proveedores inexistentes,
+    estados de envío inválidos y fechas inválidas.
+    """
+    for chunk, start in enumerate(range(0, rows, GENERATION_CHUNK_ROWS)):
+        size = min(GENERATION_CHUNK_ROWS, rows - start)
+        rng = _rng(seed, 4, chunk)
+
+        df = pd.DataFrame({
+            "envio_id": _with_dirty(np.arange(start + 1, start + size + 1), rng, dirty_ratio, ["0", "e-1", ""]),
+            "venta_id": _with_dirty(rng.integers(1, sales + 1, size), rng, dirty_ratio, [sales + 1000, ""]),
+            "proveedor_id": _with_dirty(rng.integers(1, suppliers + 1, size), rng, dirty_ratio, [suppliers + 50, ""]),
+            "estado_envio": _with_dirty(rng.choice(STATES, size), rng, dirty_ratio, ["x", "entregado", ""]),
+            "fecha_envio": _with_dirty(_timestamps(rng, size, years), rng, dirty_ratio, ["sin fecha", ""]),
+        })
+        _write(df, path, append=chunk > 0)
+
+
+def table_rows(sales_rows):
+    """
+    Número de filas de cada archivo para una cantidad de ventas. Las dimensiones crecen con las ventas,
+    con un mínimo parecido al de los datos reales.
+
+    :param sales_rows: Filas de ventas (y de logística)
+    :return: Diccionario archivo -> filas
+    """
+    return {
+        "clientes.csv": max(1000, sales_rows // 200),
+        "productos.csv": max(200, sales_rows // 1000),
+        "proveedores.csv": max(20, sales_rows // 10000),
+        "ventas.csv": sales_rows,
+        "logistica.csv": sales_rows,
+    }
+
+
+def generate_all_csv(output_dir="data", sales_rows=200_000, seed=42, dirty_ratio=0.05, years=2):
+    """
+    Genera los cinco CSV de origen de la ETL con datos sintéticos deterministas (misma semilla, mismos
+    archivos), como alternativa a download_all_csv para pruebas y benchmarks sin acceso a Azure.
+    Junto a los archivos se guarda generation.json con los parámetros; si ya existe con los mismos
+    parámetros, los archivos no se vuelven a generar.
+
+    :param output_dir: Carpeta donde se escriben los CSV
+    :param sales_rows: Filas de ventas y de logística (de 10 mil a 50 millones)
+    :param seed: Semilla de los datos
+    :param dirty_ratio: Fracción de valores sucios por columna
+    :param years: Años que abarcan las fechas de ventas y envíos
+    :return: Diccionario archivo -> filas generadas
+    """
+    rows = table_rows(sales_rows)
+    params = {"sales_rows": sales_rows, "seed": seed, "dirty_ratio": dirty_ratio, "years": years, "rows": rows}
+
+    manifest_path = os.path.join(output_dir, "generation.json")
+    if os.path.exists(manifest_path):
+        with open(manifest_path, "r") as file:
+            if json.load(file) == params:
+                print(f"✅ Datos sintéticos ya generados en {output_dir}")
+                return rows
+
+    os.makedirs(output_dir, exist_ok=True)
+    if os.path.exists(manifest_path):
+        os.remove(manifest_path)
+
+    def path(name):
+        return os.path.join(output_dir, name)
+
+    generate_customers(path("clientes.csv"), rows["clientes.csv"], seed, dirty_ratio)
+    prices = generate_products(path("productos.csv"), rows["productos.csv"], seed, dirty_ratio)
+    generate_suppliers(path("proveedores.csv"), rows["proveedores.csv"], seed, dirty_ratio)
+    generate_sales(path("ventas.csv"), sales_rows, seed, dirty_ratio, rows["clientes.csv"], prices, years)
+    generate_logistics(path("logistica.csv"), sales_rows, seed, dirty_ratio, sales_rows, rows["proveedores.csv"],
+                       years)
+
+    with open(manifest_path, "w") as file:
+        json.dump(params, file, indent=2)
+
+    print(f"✅ Datos sintéticos generados en {output_dir}: {rows}")
+    return rows
+
+
+if __name__ == "__main__":
+    generate_all_csv()
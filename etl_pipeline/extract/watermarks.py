@@ -0,0 +1,232 @@
+import hashlib
+import json
+import os
+from concurrent.futures import ThreadPoolExecutor
+import pandas as pd
+from config import ETL_WATERMARKS_PATH, ETL_PENDING_LOGISTICS_PATH, ETL_CHUNKSIZE
+from extract.download_data import get_blob_service_client, get_blob_properties, download_range, download_csv
+from load.load_to_postgresql import max_id
+from transform.schemas import SOURCE_SCHEMAS
+from transform.utils import load_data, integer_id_mask
+
+# Archivos de origen a los que solo se agregan filas al final (se descargan por diferencia) y dimensiones
+# (pequeñas, se descargan completas en cada carga incremental)
+APPEND_ONLY_FILES = ["ventas.csv", "logistica.csv"]
+DIMENSION_FILES = ["clientes.csv", "productos.csv", "proveedores.csv"]
+
+# Bytes anteriores al watermark que se vuelven a descargar para comprobar que el archivo solo creció por el final
+TAIL_CHECK_BYTES = 4096
+
+# Filas de logistica.csv que se revisan a la vez al buscar, tras una carga completa, los envíos sin venta publicada
+PENDING_SCAN_ROWS = 200_000
+
+# Estado de un archivo respecto a su watermark
+UNCHANGED = "unchanged"
+APPENDED = "appended"
+REWRITTEN = "rewritten"
+
+
+def delta_path(file_name):
+    """Ruta del CSV con las filas nuevas de un archivo de origen."""
+    return f"data/{os.path.splitext(file_name)[0]}_delta.csv"
+
+
+def _line_end(file, end, block_size=64 * 1024):
+    # Posición siguiente al último salto de línea antes de `end`: una línea a medio escribir no se procesa
+    position = end
+    while position > 0:
+        start = max(0, position - block_size)
+        file.seek(start)
+        newline = file.read(position - start).rfind(b"\n")
+        if newline != -1:
+            return start + newline + 1
+        position = start
+    return 0
+
+
+def _watermark(file, base, end, etag, length, header):
+    # El hash de los últimos bytes procesados permite detectar en la siguiente carga si el origen se reescribió
+    tail_start = max(base, end - TAIL_CHECK_BYTES)
+    file.seek(tail_start - base)
+    tail = file.read(end - tail_start)
+    return {"etag": etag, "length": length, "offset": end, "header": header, "tail_start": tail_start,
+            "tail_sha256": hashlib.sha256(tail).hexdigest()}
+
+
+def file_watermark(path, etag=None):
+    """
+    Calcula el watermark de un CSV descargado completo: hasta dónde se procesó (el último salto de línea),
+    su encabezado y el hash de los últimos bytes procesados.
+
+    :param path: Ruta del CSV local
+    :param etag: ETag del blob descargado, si se conoce
+    :return: Diccionario con etag, length, offset, header, tail_start y tail_sha256
+    """
+    with open(path, "rb") as file:
+        header = file.readline().decode("utf-8")
+        length = file.seek(0, os.SEEK_END)
+        return _watermark(file, 0, _line_end(file, length), etag, length, header)
+
+
+def load_watermarks(path=ETL_WATERMARKS_PATH):
+    """Lee los watermarks guardados por la última carga (diccionario vacío si no hay)."""
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r") as file:
+        return json.load(file)
+
+
+def save_watermarks(watermarks, path=ETL_WATERMARKS_PATH):
+    """Guarda los watermarks de forma atómica; se llama solo cuando la carga terminó con éxito."""
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    with open(tmp_path, "w") as file:
+        json.dump(watermarks, file, indent=2)
+    os.replace(tmp_path, path)
+
+
+def record_watermarks(files=APPEND_ONLY_FILES, path=ETL_WATERMARKS_PATH):
+    """
+    Registra como procesados los archivos de data/ tras una carga completa, para que la siguiente carga
+    incremental empiece donde termina cada uno. Los envíos de data/logistica.csv cuya venta todavía no llegó
+    (ver waiting_for_sale) se guardan como pendientes para esa carga incremental.
+    """
+    last_sale_id = max_id("ventas", "venta_id")
+    pending = [chunk[waiting_for_sale(chunk, last_sale_id)]
+               for chunk in load_data("data/logistica.csv", chunksize=ETL_CHUNKSIZE or PENDING_SCAN_ROWS,
+                                      schema=SOURCE_SCHEMAS["logistica"])]
+    save_pending_logistics(pd.concat(pending, ignore_index=True))
+
+    save_watermarks({file: file_watermark(f"data/{file}") for file in files}, path)
+    print(f"✅ Watermarks guardados en {path}")
+
+
+def waiting_for_sale(logistics_raw, last_sale_id):
+    """
+    Identifica los envíos cuya venta todavía no llegó al origen: los que tienen un venta_id válido mayor que el
+    de la última venta publicada. Los que apuntan a una venta anterior que no existe (por ejemplo, una venta
+    descartada en la limpieza) no se publicarán nunca y se descartan como siempre.
+
+    :param logistics_raw: DataFrame de logística sin limpiar
+    :param last_sale_id: Mayor venta_id publicado (o por publicar en la misma carga)
+    :return: Máscara booleana (arreglo de numpy) de los envíos que esperan a su venta
+    """
+    valid, sale_ids = integer_id_mask(logistics_raw["venta_id"])
+    return (valid & (sale_ids > last_sale_id)).to_numpy()
+
+
+def save_pending_logistics(df, path=ETL_PENDING_LOGISTICS_PATH):
+    """
+    Guarda de forma atómica los envíos (sin limpiar) que una carga incremental no pudo publicar porque su venta
+    todavía no existe, para que la siguiente carga incremental los vuelva a procesar.
+
+    :param df: DataFrame con las filas de logistica.csv pendientes (si está vacío se borra el archivo)
+    :param path: Ruta del CSV de envíos pendientes
+    """
+    if df.empty:
+        clear_pending_logistics(path)
+        return
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp_path = f"{path}.tmp"
+    df.to_csv(tmp_path, index=False)
+    os.replace(tmp_path, path)
+    print(f"⏳ {len(df)} envíos pendientes de su venta guardados en {path}")
+
+
+def clear_pending_logistics(path=ETL_PENDING_LOGISTICS_PATH):
+    """Borra los envíos pendientes, si los hay."""
+    if os.path.exists(path):
+        os.remove(path)
+
+
+def clear_watermarks(path=ETL_WATERMARKS_PATH):
+    """
+    Borra los watermarks y los envíos pendientes. Una carga completa sin ETL_INCREMENTAL no los registra, así
+    que los de una carga anterior quedarían desfasados: sin ellos, la siguiente carga incremental será completa.
+    """
+    if os.path.exists(path):
+        os.remove(path)
+    clear_pending_logistics()
+
+
+def download_appended(blob_name, watermark, output_path, blob_service_client=None):
+    """
+    Descarga solo lo que se agregó a un blob desde su watermark. Se pide con una lectura por rango desde un
+    poco antes del watermark: si esos bytes ya procesados no coinciden con su hash, el archivo no solo creció
+    y hace falta una carga completa. Las filas completas nuevas se escriben en output_path con el encabezado
+    del archivo (un CSV con solo el encabezado si no hay filas nuevas).
+
+    :param blob_name: Nombre del archivo en el contenedor de Azure Blob Storage
+    :param watermark: Watermark de la última carga (ver file_watermark)
+    :param output_path: Ruta del CSV donde se escriben las filas nuevas
+    :param blob_service_client: Cliente compartido; si no se indica se usa get_blob_service_client()
+    :return: Tupla (estado, watermark nuevo, filas nuevas): UNCHANGED, APPENDED o REWRITTEN
+    """
+    etag, length = get_blob_properties(blob_name, blob_service_client)
+    offset = watermark["offset"]
+
+    def write_rows(source=None, start=0, end=0):
+        with open(output_path, "wb") as out:
+            out.write(watermark["header"].encode("utf-8"))
+            if source is not None:
+                source.seek(start)
+                remaining = end - start
+                while remaining:
+                    block = source.read(min(remaining, 1024 * 1024))
+                    out.write(block)
+                    remaining -= len(block)
+
+    if (watermark.get("etag") and etag == watermark["etag"]) or length == offset:
+        write_rows()
+        return UNCHANGED, {**watermark, "etag": etag}, 0
+    if length < offset:
+        return REWRITTEN, None, 0
+
+    base = watermark["tail_start"]
+    tmp_path = f"{output_path}.part"
+    try:
+        with open(tmp_path, "w+b") as file:
+            download_range(blob_name, file, base, length - base, blob_service_client)
+
+            file.seek(0)
+            if hashlib.sha256(file.read(offset - base)).hexdigest() != watermark["tail_sha256"]:
+                return REWRITTEN, None, 0
+
+            end = base + _line_end(file, length - base)
+            if end <= offset:
+                write_rows()
+                return UNCHANGED, {**watermark, "etag": etag}, 0
+
+            write_rows(file, offset - base, end - base)
+            file.seek(offset - base)
+            rows = file.read(end - offset).count(b"\n")
+            return APPENDED, _watermark(file, base, end, etag, length, watermark["header"]), rows
+    finally:
+        if os.path.exists(tmp_path):
+            os.remove(tmp_path)
+
+
+def download_increment(watermarks, max_workers=5):
+    """
+    Descarga completas las dimensiones y, de las tablas de hechos, solo las filas nuevas (en data/*_delta.csv).
+
+    :param watermarks: Watermarks de la última carga (ver load_watermarks)
+    :param max_workers: Número de archivos que se descargan al mismo tiempo
+    :return: Diccionario archivo -> (estado, watermark nuevo, filas nuevas) de las tablas de hechos
+    """
+    blob_service_client = get_blob_service_client()
+    os.makedirs("data", exist_ok=True)
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        dimensions = [executor.submit(download_csv, file, f"data/{file}", blob_service_client)
+                      for file in DIMENSION_FILES]
+        facts = {file: executor.submit(download_appended, file, watermarks[file], delta_path(file),
+                                       blob_service_client)
+                 for file in APPEND_ONLY_FILES}
+        for future in dimensions:
+            future.result()
+        results = {file: future.result() for file, future in facts.items()}
+
+    for file, (status, _, rows) in results.items():
+        print(f"✅ {file}: {status}, {rows} filas nuevas")
+    return results
@@ -0,0 +1,130 @@
+import json
+import os
+import shutil
+import time
+from datetime import datetime
+import main
+from config import ETL_BENCH_DIR, ETL_BENCH_REPEAT, ETL_FORMAT_BENCH_ROWS
+from extract.generate_data import generate_all_csv
+from benchmark import pipeline_stages
+from transform.utils import load_data
+
+FORMATS = ["csv", "parquet"]
+
+# Lectura parcial: la columna de ventas que necesita la validación de llaves foráneas de logística
+PROJECTED_TABLE = "ventas_cleaned"
+PROJECTED_COLUMNS = ["venta_id"]
+
+
+def io_counters():
+    """
+    Bytes leídos y escritos por el proceso hasta ahora (rchar y wchar de /proc/self/io: cuentan todo lo que
+    pasa por read/write, también lo servido desde la caché de páginas del sistema).
+
+    :return: Tupla (leídos, escritos), o (None, None) fuera de Linux
+    """
+    try:
+        with open("/proc/self/io") as file:
+            counters = dict(line.split(": ") for line in file.read().splitlines())
+        return int(counters["rchar"]), int(counters["wchar"])
+    except OSError:
+        return None, None
+
+
+def _delta(before, after):
+    return None if before is None or after is None else after - before
+
+
+def _measure(func):
+    read_before, written_before = io_counters()
+    start = time.perf_counter()
+    result = func()
+    wall_seconds = time.perf_counter() - start
+    read_after, written_after = io_counters()
+    return result, {"wall_seconds": wall_seconds, "bytes_read": _delta(read_before, read_after),
+                    "bytes_written": _delta(written_before, written_after)}
+
+
+def _tables_size(formato):
+    # Tablas intermedias (output/stages) y finales (output) que intercambian las etapas
+    paths = [os.path.join(folder, name) for folder in ("output/stages", "output")
+             for name in os.listdir(folder) if name.endswith(f".{formato}")]
+    return sum(os.path.getsize(path) for path in paths)
+
+
+def _run_pipeline():
+    # Las etapas de limpieza y formateo en el orden del grafo, en este proceso, para que los contadores
+    # de E/S incluyan todas las lecturas y escrituras
+    for stage in pipeline_stages(load=False):
+        stage.func(*stage.args, **stage.kwargs)
+
+
+def benchmark_format(formato):
+    """
+    Ejecuta la limpieza y el formateo de IDs intercambiando las tablas en un formato, y mide una lectura
+    parcial (solo PROJECTED_COLUMNS) de una tabla intermedia.
+
+    :param formato: 'csv' o 'parquet'
+    :return: Métricas de la corrida más rápida y tablas finales (para comprobar que no dependen del formato)
+    """
+    main.ETL_INTERMEDIATE_FORMAT = formato
+    runs = []
+    for _ in range(ETL_BENCH_REPEAT):
+        shutil.rmtree("output", ignore_errors=True)
+        os.makedirs("output/stages", exist_ok=True)
+        _, pipeline = _measure(_run_pipeline)
+        _, projected = _measure(lambda: load_data(main.stage_path(PROJECTED_TABLE), usecols=PROJECTED_COLUMNS))
+        runs.append({"pipeline": pipeline, "projected_read": projected, "tables_bytes": _tables_size(formato)})
+
+    # Las tablas finales se leen como las lee la carga a PostgreSQL (IDs como texto)
+    tables = {name: load_data(main.final_path(name), dtype={col: str for col in id_columns})
+              for name, _, _, id_columns in main.TABLES}
+    return min(runs, key=lambda run: run["pipeline"]["wall_seconds"]), tables
+
+
+def _same_tables(tables, other):
+    # Se compara el texto que se copiaría a PostgreSQL, que no depende de los tipos de cada formato
+    return all(df.to_csv(index=False) == other[name].to_csv(index=False) for name, df in tables.items())
+
+
+def run_format_benchmark(sales_rows=ETL_FORMAT_BENCH_ROWS):
+    """
+    Compara el tiempo y los bytes leídos y escritos por la ETL con tablas intermedias en CSV y en Parquet,
+    sobre los mismos datos sintéticos, y guarda los resultados en ETL_BENCH_DIR.
+
+    :param sales_rows: Filas de ventas y de logística de los datos sintéticos
+    :return: Diccionario formato -> métricas
+    """
+    bench_dir = os.path.join(ETL_BENCH_DIR, f"formats_{sales_rows}")
+    generate_all_csv(os.path.join(bench_dir, "data"), sales_rows)
+
+    results, tables = {}, {}
+    cwd = os.getcwd()
+    os.chdir(bench_dir)
+    try:
+        for formato in FORMATS:
+            print(f"⏱️ Tablas intermedias en {formato} ({sales_rows:,} ventas)...")
+            results[formato], tables[formato] = benchmark_format(formato)
+    finally:
+        os.chdir(cwd)
+
+    same = all(_same_tables(tables[FORMATS[0]], tables[formato]) for formato in FORMATS[1:])
+    for formato, result in results.items():
+        pipeline, projected = result["pipeline"], result["projected_read"]
+        print(f"   {formato}: {pipeline['wall_seconds']:.2f}s, {(pipeline['bytes_read'] or 0) / 1e6:.1f} MB leídos, "
+              f"{(pipeline['bytes_written'] or 0) / 1e6:.1f} MB escritos, tablas {result['tables_bytes'] / 1e6:.1f} MB; "
+              f"lectura de {', '.join(PROJECTED_COLUMNS)}: {projected['wall_seconds'] * 1000:.0f} ms, "
+              f"{(projected['bytes_read'] or 0) / 1e6:.1f} MB leídos")
+    print("✅ Tablas finales idénticas en todos los formatos" if same else "⚠️ Las tablas finales difieren entre formatos")
+
+    report = {"started_at": datetime.now().isoformat(timespec="seconds"), "sales_rows": sales_rows,
+              "repeat": ETL_BENCH_REPEAT, "identical_tables": same, "results": results}
+    path = os.path.join(ETL_BENCH_DIR, f"format_bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"📊 Resultados guardados en {path}")
+    return results
+
+
+if __name__ == "__main__":
+    run_format_benchmark()
@@ -1,46 +1,652 @@
-import pandas as pd
-from sqlalchemy import create_engine
+from transform.utils import is_parquet, save_data, load_data
+from run_report import count
+from load.rollups import ROLLUPS, ROLLUP_TABLES, mark_pending, mark_dimension_changed, refresh_rollups_in
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from functools import lru_cache
+import io
 import os
+import time
+import numpy as np
+import pandas as pd
 from dotenv import load_dotenv
-import psycopg2
+from psycopg2 import sql
+from psycopg2.pool import ThreadedConnectionPool
 
 load_dotenv()
 
 db_url = os.getenv("DATABASE_URL")
 
-def load_csv_to_postgresql(csv_file_path, table_name, if_exists='append', id_columns=None):
+# Relativa al paquete y no a la carpeta de trabajo: los benchmarks ejecutan la ETL desde su carpeta de datos
+TABLES_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database", "tables.sql")
+
+# Esquema donde se cargan y se indexan las tablas antes de publicarlas en public
+STAGING_SCHEMA = "staging"
+TABLES = ["tiempo", "clientes", "productos", "proveedores", "ventas", "envios"]
+
+# Tablas particionadas por mes (ver tables.sql) y su columna de partición
+PARTITION_COLUMNS = {"ventas": "fecha", "envios": "fecha"}
+
+# Columna de ID de las tablas particionadas. Su llave primaria incluye la columna de partición, de modo que
+# PostgreSQL no garantiza que cada ID aparezca una sola vez ni puede crear llaves foráneas hacia ellas: lo
+# comprueba la ETL (ver _check_keys)
+ID_COLUMNS = {"ventas": "venta_id", "envios": "envio_id"}
+
+# Llaves foráneas hacia tablas particionadas: tabla -> (columna, tabla referenciada)
+PARTITIONED_REFERENCES = {"envios": ("venta_id", "ventas")}
+
+# Conexiones simultáneas por proceso (también es el paralelismo al crear llaves e índices)
+DB_POOL_SIZE = 4
+
+# Filas por lote al convertir un Parquet en CSV para COPY
+COPY_BATCH_SIZE = 100_000
+
+# Filas de la tabla temporal que integra cada sentencia INSERT ... ON CONFLICT en el modo 'merge'
+MERGE_BATCH_SIZE = 500_000
+
+@lru_cache(maxsize=1)
+def get_connection_pool(maxconn=DB_POOL_SIZE):
+    """
+    Crea (una sola vez por proceso) el pool de conexiones a PostgreSQL.
+
+    :param maxconn: Número máximo de conexiones abiertas por el pool
+    :return: Instancia de ThreadedConnectionPool
+    """
+    return ThreadedConnectionPool(1, maxconn, db_url)
+
+@contextmanager
+def get_connection(schema=None):
+    """
+    Toma una conexión del pool y la devuelve al terminar. Hace commit si el bloque termina sin errores
+    y rollback en caso contrario.
+
+    :param schema: Si se indica, los nombres sin esquema se resuelven en él durante la transacción
+    """
+    pool = get_connection_pool()
+    connection = pool.getconn()
+    try:
+        if schema:
+            with connection.cursor() as cursor:
+                cursor.execute(sql.SQL("SET LOCAL search_path TO {}").format(sql.Identifier(schema)))
+        yield connection
+        connection.commit()
+    except Exception:
+        connection.rollback()
+        raise
+    finally:
+        pool.putconn(connection)
+
+def _file_columns(file_path):
+    if is_parquet(file_path):
+        import pyarrow.parquet as pq
+        return pq.ParquetFile(file_path).schema_arrow.names
+
+    with open(file_path, "r", encoding="utf-8") as file:
+        return file.readline().rstrip("\r\n").split(",")
+
+def _copy_file(cursor, file_path, table_name, schema):
+    """Envía el archivo a la tabla con COPY FROM STDIN y devuelve el número de filas copiadas."""
+    copy_sql = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER true)").format(
+        sql.Identifier(schema, table_name),
+        sql.SQL(", ").join(sql.Identifier(col) for col in _file_columns(file_path))
+    )
+
+    if not is_parquet(file_path):
+        with open(file_path, "r", encoding="utf-8") as file:
+            cursor.copy_expert(copy_sql, file)
+        return cursor.rowcount
+
+    import pyarrow.csv as pacsv
+    import pyarrow.parquet as pq
+
+    rows = 0
+    for batch in pq.ParquetFile(file_path).iter_batches(batch_size=COPY_BATCH_SIZE):
+        buffer = io.BytesIO()
+        pacsv.write_csv(batch, buffer)
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+        rows += cursor.rowcount
+    return rows
+
+def _copy_frame(cursor, df, table_name, schema):
+    """Envía un DataFrame a la tabla con COPY FROM STDIN por lotes y devuelve el número de filas copiadas."""
+    copy_sql = sql.SQL("COPY {} ({}) FROM STDIN WITH (FORMAT csv, HEADER true)").format(
+        sql.Identifier(schema, table_name),
+        sql.SQL(", ").join(sql.Identifier(col) for col in df.columns)
+    )
+
+    rows = 0
+    for start in range(0, len(df), COPY_BATCH_SIZE):
+        buffer = io.StringIO()
+        df.iloc[start:start + COPY_BATCH_SIZE].to_csv(buffer, index=False)
+        buffer.seek(0)
+        cursor.copy_expert(copy_sql, buffer)
+        rows += cursor.rowcount
+    return rows
+
+def _prepare_table(cursor, table_name, if_exists, schema):
+    """Crea la tabla si no existe, o la vacía o falla según if_exists."""
+    cursor.execute("SELECT to_regclass(%s)", (f'"{schema}"."{table_name}"',))
+    exists = cursor.fetchone()[0] is not None
+
+    if exists and if_exists == 'fail':
+        raise ValueError(f"⛔ La tabla '{table_name}' ya existe.")
+    if not exists:
+        with open(TABLES_SQL, "r") as sql_file:
+            cursor.execute(sql_file.read())
+    elif if_exists == 'replace':
+        cursor.execute(sql.SQL("TRUNCATE {}").format(sql.Identifier(schema, table_name)))
+
+def _month_starts(dates):
+    """Meses (datetime64[M], ordenados y sin repetir) de una serie de fechas."""
+    return np.unique(pd.to_datetime(dates.dropna()).to_numpy().astype("datetime64[M]"))
+
+def _partition_name(table_name, month):
+    return f"{table_name}_{str(month).replace('-', '_')}"
+
+def _partition_bounds(month):
+    return str(month.astype("datetime64[D]")), str((month + 1).astype("datetime64[D]"))
+
+def _partitions(cursor, table_name, schema):
+    """Particiones de una tabla: nombre -> comentario (la huella de su contenido, ver _replace_partitions)."""
+    cursor.execute("""
+        SELECT c.relname, obj_description(c.oid, 'pg_class') FROM pg_inherits i
+        JOIN pg_class c ON c.oid = i.inhrelid
+        WHERE i.inhparent = to_regclass(%s)
+    """, (f'"{schema}"."{table_name}"',))
+    return dict(cursor.fetchall())
+
+def _source_dates(source, column):
+    return source[column] if isinstance(source, pd.DataFrame) else load_data(source, usecols=[column])[column]
+
+def _create_partitions(cursor, table_name, schema, dates):
+    """Crea las particiones mensuales que falten para las fechas indicadas."""
+    existing = _partitions(cursor, table_name, schema)
+    for month in _month_starts(dates):
+        name = _partition_name(table_name, month)
+        if name not in existing:
+            cursor.execute(sql.SQL("CREATE TABLE {} PARTITION OF {} FOR VALUES FROM (%s) TO (%s)").format(
+                sql.Identifier(schema, name), sql.Identifier(schema, table_name)), _partition_bounds(month))
+
+def _check_keys(cursor, table_name, schema, delta=None):
+    """
+    Comprueba en una tabla particionada lo que sus llaves no garantizan: que cada ID aparezca una sola vez y que
+    sus llaves hacia otras tablas particionadas existan. Si encuentra un problema lanza ValueError, de modo que
+    la transacción se revierte.
+
+    :param delta: Si se indica, tabla temporal con las filas recién integradas: solo se revisan sus IDs
+    """
+    table = sql.Identifier(schema, table_name)
+    id_column = sql.Identifier(ID_COLUMNS[table_name])
+    scope = sql.SQL("")
+    if delta is not None:
+        scope = sql.SQL("WHERE {id} IN (SELECT {id} FROM {delta})").format(
+            id=id_column, delta=sql.Identifier("pg_temp", delta))
+    cursor.execute(sql.SQL("SELECT {id} FROM {table} {scope} GROUP BY {id} HAVING COUNT(*) > 1 LIMIT 5").format(
+        id=id_column, table=table, scope=scope))
+    repeated = [row[0] for row in cursor.fetchall()]
+    if repeated:
+        raise ValueError(f"⛔ IDs repetidos en '{schema}.{table_name}' ({ID_COLUMNS[table_name]}): {repeated}")
+
+    if table_name in PARTITIONED_REFERENCES:
+        column, referenced = PARTITIONED_REFERENCES[table_name]
+        rows = sql.Identifier("pg_temp", delta) if delta is not None else table
+        cursor.execute(sql.SQL("SELECT {id} FROM {rows} r WHERE NOT EXISTS "
+                               "(SELECT 1 FROM {referenced} x WHERE x.{key} = r.{column}) LIMIT 5").format(
+            id=id_column, rows=rows, referenced=sql.Identifier(schema, referenced),
+            key=sql.Identifier(ID_COLUMNS[referenced]), column=sql.Identifier(column)))
+        orphans = [row[0] for row in cursor.fetchall()]
+        if orphans:
+            raise ValueError(f"⛔ Filas de '{schema}.{table_name}' cuyo {column} no existe en {referenced}: {orphans}")
+
+def check_partitioned_keys(schema='public'):
+    """
+    Comprueba, después de una carga, que los IDs de las tablas particionadas no se repiten y que sus llaves
+    hacia otras tablas particionadas existen (ver _check_keys); hace fallar la etapa si no es así.
+
+    :param schema: Esquema de las tablas (STAGING_SCHEMA antes de publicarlas)
+    """
+    with get_connection(schema) as connection, connection.cursor() as cursor:
+        for table_name in ID_COLUMNS:
+            _check_keys(cursor, table_name, schema)
+    print(f"✅ IDs únicos y llaves hacia tablas particionadas verificados en '{schema}'")
+
+def _fingerprint(df):
+    # Huella del contenido que no depende del orden de las filas: número de filas y suma de sus hashes
+    return f"{len(df)}:{int(pd.util.hash_pandas_object(df, index=False).sum())}"
+
+def _replace_partitions(cursor, df, table_name, schema):
+    """
+    Reemplaza solo las particiones mensuales cuyo contenido cambió. Cada partición guarda en su comentario
+    la huella de los datos con que se cargó; las que coinciden no se tocan. Las nuevas se cargan en tablas
+    aparte, con sus índices, llaves foráneas y la restricción de rango ya creadas (así ATTACH no vuelve a
+    recorrerlas) y se publican al final: solo ese último paso bloquea las lecturas de la tabla, hasta el commit.
+    Los meses que ya no tienen filas se eliminan. Un ID repetido en df (aunque sea con otra fecha) hace fallar
+    la carga antes de tocar las particiones.
+
+    :return: Diccionario con las filas y las particiones reemplazadas, sin cambios y eliminadas
+    """
+    repeated = df.loc[df[ID_COLUMNS[table_name]].duplicated(), ID_COLUMNS[table_name]]
+    if len(repeated):
+        raise ValueError(f"⛔ IDs repetidos en los datos de '{table_name}' ({ID_COLUMNS[table_name]}): "
+                         f"{repeated.unique()[:5].tolist()}")
+
+    column = PARTITION_COLUMNS[table_name]
+    parent = sql.Identifier(schema, table_name)
+    existing = _partitions(cursor, table_name, schema)
+    cursor.execute("SELECT conname, pg_get_constraintdef(oid) FROM pg_constraint WHERE conrelid = to_regclass(%s) "
+                   "AND contype = 'f'", (f'"{schema}"."{table_name}"',))
+    foreign_keys = cursor.fetchall()
+
+    months = pd.to_datetime(df[column]).to_numpy().astype("datetime64[M]")
+    current, replaced = set(), []
+    for month in np.unique(months):
+        name = _partition_name(table_name, month)
+        current.add(name)
+        part = df[months == month]
+        fingerprint = _fingerprint(part)
+        if existing.get(name) == fingerprint:
+            continue
+
+        new = sql.Identifier(schema, f"{name}_new")
+        start, end = _partition_bounds(month)
+        cursor.execute(sql.SQL("CREATE TABLE {} (LIKE {} INCLUDING DEFAULTS INCLUDING INDEXES)").format(new, parent))
+        _copy_frame(cursor, part, f"{name}_new", schema)
+        cursor.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} CHECK ({col} >= %s AND {col} < %s)").format(
+            new, sql.Identifier(f"{name}_rango"), col=sql.Identifier(column)), (start, end))
+        for constraint, definition in foreign_keys:
+            cursor.execute(sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(
+                new, sql.Identifier(constraint), sql.SQL(definition)))
+        replaced.append((name, start, end, fingerprint))
+
+    obsolete = set(existing) - current
+    for name in obsolete | {name for name, _, _, _ in replaced if name in existing}:
+        cursor.execute(sql.SQL("ALTER TABLE {} DETACH PARTITION {}").format(parent, sql.Identifier(schema, name)))
+        cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier(schema, name)))
+    for name, start, end, fingerprint in replaced:
+        cursor.execute(sql.SQL("ALTER TABLE {} RENAME TO {}").format(sql.Identifier(schema, f"{name}_new"),
+                                                                     sql.Identifier(name)))
+        # Los índices creados con LIKE llevan el nombre de la tabla nueva; se renombran como los de la anterior
+        cursor.execute("SELECT indexname FROM pg_indexes WHERE schemaname = %s AND tablename = %s", (schema, name))
+        for (index,) in cursor.fetchall():
+            cursor.execute(sql.SQL("ALTER INDEX {} RENAME TO {}").format(
+                sql.Identifier(schema, index), sql.Identifier(index.replace(f"{name}_new", name, 1))))
+        cursor.execute(sql.SQL("ALTER TABLE {} ATTACH PARTITION {} FOR VALUES FROM (%s) TO (%s)").format(
+            parent, sql.Identifier(schema, name)), (start, end))
+        cursor.execute(sql.SQL("COMMENT ON TABLE {} IS %s").format(sql.Identifier(schema, name)), (fingerprint,))
+
+    mark_pending(cursor, table_name, schema, [start for _, start, _, _ in replaced] +
+                 [f"{name[-7:].replace('_', '-')}-01" for name in obsolete])
+    _check_keys(cursor, table_name, schema)
+
+    stats = {"rows": len(df), "partitions_replaced": len(replaced),
+             "partitions_unchanged": len(current) - len(replaced), "partitions_dropped": len(obsolete)}
+    for metric in ("partitions_replaced", "partitions_unchanged", "partitions_dropped"):
+        count(metric, stats[metric])
+    return stats
+
+def _primary_key(cursor, table_name, schema):
+    cursor.execute("""
+        SELECT a.attname FROM pg_index i
+        JOIN pg_attribute a ON a.attrelid = i.indrelid AND a.attnum = ANY(i.indkey)
+        WHERE i.indrelid = to_regclass(%s) AND i.indisprimary
+        ORDER BY a.attnum
+    """, (f'"{schema}"."{table_name}"',))
+    return [row[0] for row in cursor.fetchall()]
+
+def _delete_moved_rows(cursor, table_name, schema, delta):
+    """
+    Prepara la integración de una tabla particionada. Su llave primaria incluye la fecha, así que una fila cuya
+    fecha cambió no choca con la anterior en ON CONFLICT y el ID quedaría repetido: de las filas de delta con
+    el mismo ID se conserva la última, y se borran de la tabla las filas de esos IDs que tienen otra fecha.
+
+    :return: Tupla con el número de filas borradas de la tabla y el conjunto de sus meses
+    """
+    id_column = sql.Identifier(ID_COLUMNS[table_name])
+    column = sql.Identifier(PARTITION_COLUMNS[table_name])
+    cursor.execute(sql.SQL("CREATE INDEX ON {} ({})").format(sql.Identifier(delta), id_column))
+    cursor.execute(sql.SQL("DELETE FROM {delta} d USING {delta} newer "
+                           "WHERE newer.{id} = d.{id} AND newer.merge_row > d.merge_row").format(
+        delta=sql.Identifier("pg_temp", delta), id=id_column))
+    cursor.execute(sql.SQL("DELETE FROM {table} target USING {delta} d "
+                           "WHERE target.{id} = d.{id} AND target.{col} IS DISTINCT FROM d.{col} "
+                           "RETURNING date_trunc('month', target.{col})::DATE").format(
+        table=sql.Identifier(schema, table_name), delta=sql.Identifier("pg_temp", delta), id=id_column, col=column))
+    months = [row[0] for row in cursor.fetchall()]
+    return len(months), set(months)
+
+def _merge(cursor, copy, source, columns, table_name, schema):
+    """
+    Copia source a una tabla temporal y la integra en la tabla por lotes de MERGE_BATCH_SIZE filas con
+    INSERT ... ON CONFLICT DO UPDATE sobre su llave primaria. Las filas iguales a las existentes no se
+    reescriben; si una llave se repite en un lote gana la última fila. En las tablas particionadas, cuya llave
+    primaria incluye la fecha, se integra la última fila de cada ID y antes se borran las filas de esos IDs que
+    tienen otra fecha (ver _delete_moved_rows); al final se comprueban sus IDs (ver _check_keys).
+
+    :return: Diccionario con las filas copiadas, insertadas, actualizadas y sin cambios
+    """
+    keys = _primary_key(cursor, table_name, schema)
+    if not keys:
+        raise ValueError(f"⛔ La tabla '{schema}.{table_name}' no existe o no tiene llave primaria; el modo "
+                         f"'merge' necesita las tablas publicadas por una carga completa.")
+
+    delta = f"{table_name}_merge"
+    cursor.execute(sql.SQL("CREATE TEMP TABLE {} (LIKE {}) ON COMMIT DROP").format(
+        sql.Identifier(delta), sql.Identifier(schema, table_name)))
+    cursor.execute(sql.SQL("ALTER TABLE {} ADD COLUMN merge_row BIGINT GENERATED ALWAYS AS IDENTITY").format(
+        sql.Identifier(delta)))
+    rows = copy(cursor, source, delta, "pg_temp")
+    if table_name in PARTITION_COLUMNS:
+        _create_partitions(cursor, table_name, schema, _source_dates(source, PARTITION_COLUMNS[table_name]))
+    cursor.execute(sql.SQL("CREATE INDEX ON {} (merge_row)").format(sql.Identifier(delta)))
+    cursor.execute(sql.SQL("ANALYZE {}").format(sql.Identifier(delta)))
+    moved, months = _delete_moved_rows(cursor, table_name, schema, delta) if table_name in ID_COLUMNS else (0, set())
+
+    values = [col for col in columns if col not in keys]
+    cols = sql.SQL(", ").join(sql.Identifier(col) for col in columns)
+    key_cols = sql.SQL(", ").join(sql.Identifier(col) for col in keys)
+    if values:
+        action = sql.SQL("DO UPDATE SET {} WHERE ({}) IS DISTINCT FROM ({})").format(
+            sql.SQL(", ").join(sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(col)) for col in values),
+            sql.SQL(", ").join(sql.Identifier("target", col) for col in values),
+            sql.SQL(", ").join(sql.Identifier("excluded", col) for col in values))
+    else:
+        action = sql.SQL("DO NOTHING")
+
+    # Meses de las filas que cambiaron, para actualizar los resúmenes de las tablas de hechos
+    month = sql.SQL("NULL::DATE")
+    if table_name in ROLLUPS:
+        month = sql.SQL("date_trunc('month', {})::DATE").format(sql.Identifier(PARTITION_COLUMNS[table_name]))
+
+    # Las llaves que no existían se cuentan con la tabla antes de la sentencia (todas las partes de la sentencia
+    # ven la misma instantánea): xmax, que distingue insertadas de actualizadas, no existe en tablas particionadas.
+    # Las filas que no cambiaron no se devuelven
+    upsert = sql.SQL("""
+        WITH batch AS (
+            SELECT DISTINCT ON ({keys}) {cols} FROM {delta}
+            WHERE merge_row > %s AND merge_row <= %s
+            ORDER BY {keys}, merge_row DESC
+        ), upserted AS (
+            INSERT INTO {table} AS target ({cols})
+            SELECT {cols} FROM batch
+            ON CONFLICT ({keys}) {action}
+            RETURNING {month} AS mes
+        )
+        SELECT (SELECT COUNT(*) FROM batch WHERE NOT EXISTS (
+                    SELECT 1 FROM {table} existing WHERE ({existing_keys}) = ({batch_keys}))),
+               COUNT(*), array_agg(DISTINCT mes) FILTER (WHERE mes IS NOT NULL)
+        FROM upserted
+    """).format(table=sql.Identifier(schema, table_name), cols=cols, keys=key_cols,
+                delta=sql.Identifier("pg_temp", delta), action=action, month=month,
+                existing_keys=sql.SQL(", ").join(sql.Identifier("existing", col) for col in keys),
+                batch_keys=sql.SQL(", ").join(sql.Identifier("batch", col) for col in keys))
+
+    inserted = updated = 0
+    for start in range(0, rows, MERGE_BATCH_SIZE):
+        cursor.execute(upsert, (start, start + MERGE_BATCH_SIZE))
+        batch_inserted, batch_changed, batch_months = cursor.fetchone()
+        inserted += batch_inserted
+        updated += batch_changed - batch_inserted
+        months.update(batch_months or [])
+    # Las filas que cambiaron de fecha se borraron y se volvieron a insertar: cuentan como actualizadas
+    inserted, updated = inserted - moved, updated + moved
+
+    if table_name in ID_COLUMNS:
+        _check_keys(cursor, table_name, schema, delta)
+    cursor.execute(sql.SQL("DROP TABLE {}").format(sql.Identifier("pg_temp", delta)))
+    mark_pending(cursor, table_name, schema, months)
+    if updated:
+        mark_dimension_changed(cursor, table_name, schema)
+
+    stats = {"rows": rows, "inserted": inserted, "updated": updated, "unchanged": rows - inserted - updated}
+    for metric in ("inserted", "updated", "unchanged"):
+        count(f"rows_{metric}", stats[metric])
+    return stats
+
+def _source_columns(source):
+    return _file_columns(source) if isinstance(source, str) else list(source.columns)
+
+def _load(copy, source, table_name, if_exists, schema):
+    start = time.perf_counter()
+
+    with get_connection(schema) as connection, connection.cursor() as cursor:
+        if if_exists == 'merge':
+            stats = _merge(cursor, copy, source, _source_columns(source), table_name, schema)
+        elif if_exists == 'replace_partitions':
+            df = source if isinstance(source, pd.DataFrame) else load_data(source)
+            stats = _replace_partitions(cursor, df, table_name, schema)
+        else:
+            _prepare_table(cursor, table_name, if_exists, schema)
+            if table_name in PARTITION_COLUMNS:
+                _create_partitions(cursor, table_name, schema, _source_dates(source, PARTITION_COLUMNS[table_name]))
+            stats = {"rows": copy(cursor, source, table_name, schema)}
+    rows = stats["rows"]
+    count('rows_loaded', rows)
+
+    seconds = time.perf_counter() - start
+    rows_per_second = rows / seconds if seconds > 0 else 0.0
+    origin = source if isinstance(source, str) else "memoria"
+    print(f"✅ {rows} filas cargadas en la tabla '{schema}.{table_name}' desde {origin} "
+          f"({seconds:.2f}s, {rows_per_second:,.0f} filas/s)")
+    if if_exists == 'merge':
+        print(f"   {stats['inserted']} insertadas, {stats['updated']} actualizadas, {stats['unchanged']} sin cambios")
+    elif if_exists == 'replace_partitions':
+        print(f"   {stats['partitions_replaced']} particiones reemplazadas, {stats['partitions_unchanged']} sin "
+              f"cambios, {stats['partitions_dropped']} eliminadas")
+
+    return {"table": table_name, **stats, "seconds": seconds, "rows_per_second": rows_per_second}
+
+def load_csv_to_postgresql(csv_file_path, table_name, if_exists='append', schema='public'):
     """
-    Carga un archivo CSV en una tabla de PostgreSQL.
+    Carga un archivo CSV o Parquet en una tabla de PostgreSQL con COPY FROM STDIN.
+    El archivo se envía en streaming (por lotes en el caso de Parquet), sin cargarlo completo en memoria.
 
-    :param csv_file_path: Ruta del archivo CSV a cargar.
+    :param csv_file_path: Ruta del archivo CSV o Parquet a cargar.
     :param table_name: Nombre de la tabla de destino en la base de datos.
-    :param if_exists: Comportamiento si la tabla ya existe. Puede ser 'append', 'replace', o 'fail'.
-    :param id_columns: Lista de columnas de IDs que deben ser tratadas como cadenas.
+    :param if_exists: Comportamiento si la tabla ya existe. Puede ser 'append', 'replace' (vacía la tabla antes
+                      de cargar), 'fail', 'merge' (inserta o actualiza por llave primaria, ver _merge; la tabla
+                      debe existir con su llave primaria) o 'replace_partitions' (solo tablas particionadas:
+                      reemplaza los meses cuyo contenido cambió, ver _replace_partitions).
+    :param schema: Esquema de la tabla de destino (STAGING_SCHEMA para cargar sin afectar a las tablas publicadas).
+    :return: Diccionario con la tabla, las filas cargadas, los segundos y las filas por segundo (y, en el modo
+             'merge', las filas insertadas, actualizadas y sin cambios; en 'replace_partitions', las particiones
+             reemplazadas, sin cambios y eliminadas).
+    """
+    return _load(_copy_file, csv_file_path, table_name, if_exists, schema)
+
+def load_dataframe_to_postgresql(df, table_name, if_exists='append', schema='public'):
+    """
+    Carga un DataFrame en memoria en una tabla de PostgreSQL con COPY FROM STDIN, sin pasar por disco.
+
+    :param df: DataFrame a cargar; sus columnas deben existir en la tabla de destino.
+    :param table_name: Nombre de la tabla de destino en la base de datos.
+    :param if_exists: Igual que en load_csv_to_postgresql.
+    :param schema: Esquema de la tabla de destino.
+    :return: Igual que en load_csv_to_postgresql.
+    """
+    return _load(_copy_frame, df, table_name, if_exists, schema)
+
+def read_table(table_name, columns, schema='public'):
+    """
+    Lee columnas de una tabla publicada con COPY TO STDOUT (por ejemplo, la dimensión de tiempo vigente).
+
+    :param table_name: Nombre de la tabla.
+    :param columns: Columnas a leer.
+    :param schema: Esquema de la tabla.
+    :return: DataFrame con las columnas pedidas.
+    """
+    copy_sql = sql.SQL("COPY (SELECT {} FROM {}) TO STDOUT WITH (FORMAT csv, HEADER true)").format(
+        sql.SQL(", ").join(sql.Identifier(col) for col in columns), sql.Identifier(schema, table_name))
+
+    buffer = io.StringIO()
+    with get_connection() as connection, connection.cursor() as cursor:
+        cursor.copy_expert(copy_sql, buffer)
+    buffer.seek(0)
+    return pd.read_csv(buffer)
+
+def export_table(table_name, output_path, table_schema, schema='public'):
+    """
+    Guarda una tabla publicada en un archivo CSV o Parquet, con los tipos de su esquema de TABLE_SCHEMAS.
+
+    :param table_name: Nombre de la tabla.
+    :param output_path: Ruta del archivo de salida.
+    :param table_schema: Diccionario columna -> dtype (por ejemplo TABLE_SCHEMAS['tiempo']).
+    :param schema: Esquema de la tabla.
+    """
+    save_data(read_table(table_name, list(table_schema), schema), output_path, table_schema)
+
+def max_id(table_name, id_column, schema='public'):
+    """Devuelve el mayor ID numérico de una tabla (0 si está vacía); los IDs se guardan como texto con ceros."""
+    query = sql.SQL("SELECT COALESCE(MAX({}::BIGINT), 0) FROM {}").format(
+        sql.Identifier(id_column), sql.Identifier(schema, table_name))
+    with get_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(query)
+        return cursor.fetchone()[0]
+
+def existing_ids(table_name, id_column, ids, length=10, schema='public'):
+    """
+    Devuelve, de una lista de IDs enteros, los que ya existen en una tabla. La consulta usa la llave
+    primaria, de modo que su costo depende de la cantidad de IDs y no del tamaño de la tabla.
+
+    :param table_name: Nombre de la tabla.
+    :param id_column: Columna de IDs (con el formato de format_ids).
+    :param ids: IDs enteros a buscar.
+    :param length: Largo de los IDs formateados.
+    :param schema: Esquema de la tabla.
+    :return: Lista de IDs enteros encontrados.
+    """
+    query = sql.SQL("SELECT {col}::BIGINT FROM {table} WHERE {col} = ANY(%s)").format(
+        col=sql.Identifier(id_column), table=sql.Identifier(schema, table_name))
+    with get_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(query, ([str(int(value)).zfill(length) for value in ids],))
+        return [row[0] for row in cursor.fetchall()]
+
+def merge_dataframes_to_postgresql(frames):
     """
-    dtype = {col: str for col in id_columns} if id_columns else {}
+    Integra DataFrames en las tablas publicadas en una sola transacción y en el orden de TABLES (las
+    dimensiones antes que los hechos), insertando o actualizando cada fila según su llave primaria (ver _merge).
 
-    df = pd.read_csv(csv_file_path, dtype=dtype)
+    :param frames: Diccionario tabla -> DataFrame con IDs formateados.
+    :return: Diccionario tabla -> filas copiadas, insertadas, actualizadas y sin cambios.
+    """
+    start = time.perf_counter()
+    stats = {}
 
-    engine = create_engine(db_url)
+    with get_connection() as connection, connection.cursor() as cursor:
+        for table_name in TABLES:
+            if table_name in frames:
+                stats[table_name] = _merge(cursor, _copy_frame, frames[table_name], list(frames[table_name].columns),
+                                           table_name, "public")
 
-    df.to_sql(table_name, engine, if_exists=if_exists, index=False)
+    print(f"✅ Cambios integrados en public ({time.perf_counter() - start:.2f}s):")
+    for table_name, table_stats in stats.items():
+        print(f"   {table_name}: {table_stats['inserted']} insertadas, {table_stats['updated']} actualizadas, "
+              f"{table_stats['unchanged']} sin cambios")
+    return stats
 
-    print(f"✅ Datos cargados en la tabla '{table_name}' desde {csv_file_path}")
+def execute_sql_from_file(sql_file_path, schema=None):
+    """
+    Ejecuta un archivo SQL en una sola transacción. Si falla, se revierte y el error se propaga, para que
+    la etapa falle y no se actualicen los resúmenes ni se publiquen las tablas.
 
-def execute_sql_from_file(sql_file_path):
+    :param sql_file_path: Ruta del archivo SQL
+    :param schema: Esquema en el que se ejecuta (por defecto, el search_path de la conexión)
+    """
     with open(sql_file_path, 'r') as sql_file:
         sql_commands = sql_file.read()
 
-    connection = psycopg2.connect(db_url)
-    cursor = connection.cursor()
-
     try:
-        cursor.execute(sql_commands)
-        connection.commit()
+        with get_connection(schema) as connection, connection.cursor() as cursor:
+            cursor.execute(sql_commands)
         print(f"✅ Ejecutado {sql_file_path} con éxito")
     except Exception as e:
         print(f"❌ Error al ejecutar el archivo SQL '{sql_file_path}': {e}")
-        connection.rollback()
-    finally:
-        cursor.close()
-        connection.close()
+        raise
+
+def _split_statements(sql_file_path):
+    with open(sql_file_path, 'r') as sql_file:
+        return [statement.strip() for statement in sql_file.read().split(';') if statement.strip()]
+
+def _execute_in_parallel(statements, schema):
+    """Ejecuta cada sentencia en su propia conexión y transacción, hasta DB_POOL_SIZE a la vez."""
+    def execute(statement):
+        with get_connection(schema) as connection, connection.cursor() as cursor:
+            cursor.execute(statement)
+
+    with ThreadPoolExecutor(max_workers=DB_POOL_SIZE) as executor:
+        list(executor.map(execute, statements))
+
+def prepare_staging_tables():
+    """
+    Crea de cero el esquema de staging con las tablas vacías, sin llaves ni índices, listas para COPY.
+    Las tablas publicadas en public no se tocan.
+    """
+    with get_connection() as connection, connection.cursor() as cursor:
+        cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(STAGING_SCHEMA)))
+        cursor.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(STAGING_SCHEMA)))
+
+    with get_connection(STAGING_SCHEMA) as connection, connection.cursor() as cursor:
+        with open(TABLES_SQL, "r") as sql_file:
+            cursor.execute(sql_file.read())
+
+    print(f"✅ Tablas de staging creadas en el esquema '{STAGING_SCHEMA}'")
+
+def build_staging_tables(p_keys_path, f_keys_path, indexes_path, check_dates_path):
+    """
+    Construye llaves e índices sobre las tablas de staging ya cargadas, usando los mismos archivos SQL
+    que las tablas publicadas. Las llaves primarias y los índices se crean en paralelo, y las llaves
+    foráneas al final, cuando ya existen todas las primarias; después se comprueba lo que las llaves no
+    garantizan en las tablas particionadas (ver check_partitioned_keys). Cualquier error detiene el proceso,
+    de modo que nunca se publican tablas sin llaves o sin índices.
+    """
+    start = time.perf_counter()
+
+    _execute_in_parallel(_split_statements(p_keys_path), STAGING_SCHEMA)
+    _execute_in_parallel(_split_statements(indexes_path), STAGING_SCHEMA)
+
+    with get_connection(STAGING_SCHEMA) as connection, connection.cursor() as cursor:
+        with open(f_keys_path, "r") as sql_file:
+            cursor.execute(sql_file.read())
+
+    execute_sql_from_file(check_dates_path, STAGING_SCHEMA)
+    check_partitioned_keys(STAGING_SCHEMA)
+
+    print(f"✅ Llaves e índices de staging construidos ({time.perf_counter() - start:.2f}s)")
+
+def refresh_rollups(schema='public', full=False):
+    """
+    Actualiza las tablas de resumen de ventas y envíos (ver load/rollups.py) en una sola transacción. Las
+    cargas registran los meses que cambiaron y aquí solo se recalculan esos meses, de modo que el costo
+    depende de lo que cambió y no del tamaño de las tablas de hechos.
+
+    :param schema: Esquema de las tablas (STAGING_SCHEMA para construirlas antes de publicarlas)
+    :param full: Si es True se recalculan completas (después de una carga completa)
+    :return: Diccionario tabla -> meses recalculados (None si se recalculó completa)
+    """
+    start = time.perf_counter()
+    with get_connection(schema) as connection, connection.cursor() as cursor:
+        refreshed = refresh_rollups_in(cursor, schema, full)
+
+    summary = ", ".join(f"{table}: {'completa' if months is None else f'{months} meses'}"
+                        for table, months in refreshed.items())
+    print(f"✅ Resúmenes actualizados en '{schema}' ({summary}; {time.perf_counter() - start:.2f}s)")
+    return refreshed
+
+def swap_staging_tables():
+    """
+    Publica las tablas de staging en una sola transacción: elimina las tablas de public y mueve las de
+    staging (con sus llaves, índices, particiones y resúmenes) a public. Las consultas de la API ven las tablas
+    anteriores o las nuevas completas, nunca un estado intermedio.
+    """
+    with get_connection() as connection, connection.cursor() as cursor:
+        for table in TABLES + ROLLUP_TABLES:
+            cursor.execute(sql.SQL("DROP TABLE IF EXISTS {} CASCADE").format(sql.Identifier("public", table)))
+        for table in TABLES + ROLLUP_TABLES:
+            # Las particiones son tablas aparte: SET SCHEMA sobre la tabla padre no las mueve
+            for partition in _partitions(cursor, table, STAGING_SCHEMA):
+                cursor.execute(sql.SQL("ALTER TABLE {} SET SCHEMA public").format(
+                    sql.Identifier(STAGING_SCHEMA, partition)))
+            cursor.execute(sql.SQL("ALTER TABLE {} SET SCHEMA public").format(sql.Identifier(STAGING_SCHEMA, table)))
+        cursor.execute(sql.SQL("DROP SCHEMA {}").format(sql.Identifier(STAGING_SCHEMA)))
+
+    print("✅ Tablas de staging publicadas en 'public'")
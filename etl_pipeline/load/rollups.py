@@ -0,0 +1,149 @@
+import os
+from psycopg2 import sql
+
+# Tablas de resumen (database/rollups.sql) de cada tabla de hechos, a nivel de día, mes y año. Cada fila
+# agrega un periodo para un desglose: 'total' (valor vacío) o una dimensión y su valor; las medidas de los
+# niveles mes y año se obtienen sumando las del nivel anterior
+ROLLUPS = {
+    "ventas": {
+        "desgloses": {"sucursal": "f.sucursal_id::TEXT", "producto": "f.producto_id", "categoria": "d.categoria"},
+        "dimension": ("productos", "producto_id"),
+        "medidas": {"total_ventas": "SUM(f.total)", "cantidad": "SUM(f.cantidad)", "num_ventas": "COUNT(*)"},
+    },
+    "envios": {
+        "desgloses": {"proveedor": "f.proveedor_id", "estado": "f.estado_envio"},
+        "dimension": None,
+        "medidas": {"total_envios": "COUNT(f.envio_id)"},
+    },
+}
+
+GRAINS = ["dia", "mes", "anio"]
+
+# Meses de cada tabla de hechos que cambiaron desde la última actualización de sus resúmenes
+PENDING_TABLE = "resumenes_pendientes"
+
+ROLLUP_TABLES = [f"{table}_por_{grain}" for table in ROLLUPS for grain in GRAINS] + [PENDING_TABLE]
+
+ROLLUPS_SQL = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "database", "rollups.sql")
+
+
+def create_rollup_tables(cursor):
+    """Crea las tablas de resumen y la de meses pendientes si no existen (en el esquema del search_path)."""
+    with open(ROLLUPS_SQL, "r") as sql_file:
+        cursor.execute(sql_file.read())
+
+
+def mark_pending(cursor, table_name, schema, months):
+    """
+    Registra meses de una tabla de hechos cuyos resúmenes hay que recalcular.
+
+    :param cursor: Cursor de la transacción de la carga
+    :param table_name: Tabla de hechos
+    :param schema: Esquema de la tabla
+    :param months: Primer día de cada mes que cambió
+    """
+    months = sorted(set(months))
+    if table_name not in ROLLUPS or not months:
+        return
+    create_rollup_tables(cursor)
+    cursor.execute(sql.SQL("INSERT INTO {} (tabla, mes) SELECT %s, UNNEST(%s::DATE[]) ON CONFLICT DO NOTHING").format(
+        sql.Identifier(schema, PENDING_TABLE)), (table_name, months))
+
+
+def mark_dimension_changed(cursor, dimension, schema):
+    """Marca como pendientes todos los meses de las tablas de hechos cuyos desgloses usan una dimensión
+    (por ejemplo, la categoría de los productos)."""
+    for table_name, rollup in ROLLUPS.items():
+        if rollup["dimension"] and rollup["dimension"][0] == dimension:
+            create_rollup_tables(cursor)
+            cursor.execute(sql.SQL("""
+                INSERT INTO {pending} (tabla, mes)
+                SELECT DISTINCT %s, date_trunc('month', fecha)::DATE FROM {table}
+                ON CONFLICT DO NOTHING
+            """).format(pending=sql.Identifier(schema, PENDING_TABLE), table=sql.Identifier(schema, table_name)),
+                (table_name,))
+
+
+def _rollup(table_name, grain, schema):
+    return sql.Identifier(schema, f"{table_name}_por_{grain}")
+
+
+def _rebuild(cursor, table_name, schema, month=None):
+    # Recalcula los tres niveles de un mes (y de su año), o completos si no se indica el mes
+    rollup = ROLLUPS[table_name]
+    medidas = list(rollup["medidas"])
+    day, by_month, by_year = (_rollup(table_name, grain, schema) for grain in GRAINS)
+    params = {}
+    day_filter = month_filter = year_filter = sql.SQL("")
+    if month is not None:
+        end = month.replace(year=month.year + month.month // 12, month=month.month % 12 + 1)
+        params = {"start": month, "end": end, "anio": month.year, "mes": month.month}
+        day_filter = sql.SQL("WHERE {col} >= %(start)s AND {col} < %(end)s")
+        month_filter = sql.SQL("WHERE anio = %(anio)s AND mes = %(mes)s")
+        year_filter = sql.SQL("WHERE anio = %(anio)s")
+
+    join = sql.SQL("")
+    if rollup["dimension"]:
+        dimension, key = rollup["dimension"]
+        join = sql.SQL("LEFT JOIN {} d ON d.{key} = f.{key}").format(sql.Identifier(schema, dimension),
+                                                                      key=sql.Identifier(key))
+    desgloses = sql.SQL(", ").join(
+        [sql.SQL("('total', '')")] +
+        [sql.SQL("({}, COALESCE({}, ''))").format(sql.Literal(name), sql.SQL(expression))
+         for name, expression in rollup["desgloses"].items()])
+    medida_cols = sql.SQL(", ").join(map(sql.Identifier, medidas))
+    sums = sql.SQL(", ").join(sql.SQL("SUM({})").format(sql.Identifier(medida)) for medida in medidas)
+
+    cursor.execute(sql.SQL("DELETE FROM {} {}").format(day, day_filter.format(col=sql.Identifier("fecha"))), params)
+    cursor.execute(sql.SQL("""
+        INSERT INTO {day} (fecha, anio, mes, dia, desglose, valor, {medida_cols})
+        SELECT f.fecha, EXTRACT(YEAR FROM f.fecha)::INT, EXTRACT(MONTH FROM f.fecha)::INT,
+               EXTRACT(DAY FROM f.fecha)::INT, g.desglose, g.valor, {medidas}
+        FROM {table} f {join}
+        CROSS JOIN LATERAL (VALUES {desgloses}) AS g (desglose, valor)
+        {where}
+        GROUP BY f.fecha, g.desglose, g.valor
+    """).format(day=day, medida_cols=medida_cols, table=sql.Identifier(schema, table_name), join=join,
+                medidas=sql.SQL(", ").join(sql.SQL(expression) for expression in rollup["medidas"].values()),
+                desgloses=desgloses, where=day_filter.format(col=sql.Identifier("f", "fecha"))), params)
+
+    # Los niveles mes y año se obtienen del anterior, ya actualizado
+    for target, source, keys, where in ((by_month, day, "anio, mes", month_filter),
+                                        (by_year, by_month, "anio", year_filter)):
+        cursor.execute(sql.SQL("DELETE FROM {} {}").format(target, where), params)
+        cursor.execute(sql.SQL("""
+            INSERT INTO {target} ({keys}, desglose, valor, {medida_cols})
+            SELECT {keys}, desglose, valor, {sums} FROM {source} {where}
+            GROUP BY {keys}, desglose, valor
+        """).format(target=target, source=source, keys=sql.SQL(keys), medida_cols=medida_cols, sums=sums,
+                    where=where), params)
+
+
+def refresh_rollups_in(cursor, schema, full=False):
+    """
+    Actualiza las tablas de resumen: recalcula los meses pendientes de cada tabla de hechos (o todo, con
+    full=True o si los resúmenes están vacíos) y vacía la lista de pendientes.
+
+    :param cursor: Cursor de la transacción
+    :param schema: Esquema de las tablas de hechos y de resumen
+    :param full: Si es True se recalculan todos los resúmenes
+    :return: Diccionario tabla -> meses recalculados (None si se recalculó completa)
+    """
+    create_rollup_tables(cursor)
+    refreshed = {}
+    for table_name in ROLLUPS:
+        cursor.execute(sql.SQL("SELECT EXISTS (SELECT 1 FROM {})").format(_rollup(table_name, "anio", schema)))
+        if full or not cursor.fetchone()[0]:
+            _rebuild(cursor, table_name, schema)
+            refreshed[table_name] = None
+            continue
+
+        cursor.execute(sql.SQL("SELECT mes FROM {} WHERE tabla = %s ORDER BY mes").format(
+            sql.Identifier(schema, PENDING_TABLE)), (table_name,))
+        months = [row[0] for row in cursor.fetchall()]
+        for month in months:
+            _rebuild(cursor, table_name, schema, month)
+        refreshed[table_name] = len(months)
+
+    cursor.execute(sql.SQL("TRUNCATE {}").format(sql.Identifier(schema, PENDING_TABLE)))
+    return refreshed
@@ -1,76 +1,390 @@
-import time
 import os
+import pandas as pd
+from config import (ETL_CHUNKSIZE, ETL_CACHE_ENABLED, ETL_INTERMEDIATE_FORMAT, ETL_CSV_EXPORT, ETL_MAX_WORKERS,
+                    ETL_IN_MEMORY, ETL_WRITE_OUTPUTS, ETL_CSV_ENGINE, ETL_REPORT_DIR, ETL_TRACEMALLOC,
+                    ETL_LOW_MEMORY, ETL_MEMORY_BUDGET_MB, ETL_INCREMENTAL, ETL_FULL_REBUILD, ETL_LOAD_MODE,
+                    ETL_PENDING_LOGISTICS_PATH)
 from extract.download_data import download_all_csv
-from transform.clean_customers import clean_customers_data
-from transform.clean_products import clean_products_data
-from transform.clean_suppliers import clean_suppliers_data
-from transform.clean_sales import clean_sales_data
-from transform.clean_logistic import clean_logistics_data
-from transform.utils import format_ids_in_csv
-from transform.clean_time import generate_time_dimension
-from load.load_to_postgresql import load_csv_to_postgresql, execute_sql_from_file
-
-def wait_for_file(file_path, timeout=30):
-    """Espera hasta que un archivo esté disponible antes de continuar."""
-    start_time = time.time()
-    while not os.path.exists(file_path):
-        if time.time() - start_time > timeout:
-            raise TimeoutError(f"⛔ Error: El archivo {file_path} no se generó en el tiempo esperado.")
-        time.sleep(1)
-
-print("🚀 Descargando datos...")
-download_all_csv()
-
-print("🧹 Limpiando clientes...")
-clean_customers_data("data/clientes.csv", "output/clientes_cleaned.csv")
-wait_for_file("output/clientes_cleaned.csv")
-
-print("🧹 Limpiando productos...")
-clean_products_data("data/productos.csv", "output/productos_cleaned.csv")
-wait_for_file("output/productos_cleaned.csv")
-
-print("🧹 Limpiando proveedores...")
-clean_suppliers_data("data/proveedores.csv", "output/proveedores_cleaned.csv")
-wait_for_file("output/proveedores_cleaned.csv")
-
-print("📆 Generando dimensión de tiempo...")
-generate_time_dimension("data/ventas.csv", "data/logistica.csv", "output/dim_tiempo.csv")
-wait_for_file("output/dim_tiempo.csv")
-
-print("🧹 Limpiando ventas...")
-clean_sales_data("data/ventas.csv", "output/productos_cleaned.csv", "output/clientes_cleaned.csv", "output/dim_tiempo.csv", "output/ventas_cleaned.csv")
-wait_for_file("output/ventas_cleaned.csv")
-
-print("🧹 Limpiando logística...")
-clean_logistics_data("data/logistica.csv", "output/ventas_cleaned.csv", "output/proveedores_cleaned.csv", "output/dim_tiempo.csv", "output/logistica_cleaned.csv")
-wait_for_file("output/logistica_cleaned.csv")
-
-files_to_format = [
-    ("output/clientes_cleaned.csv", ["cliente_id"]),
-    ("output/productos_cleaned.csv", ["producto_id"]),
-    ("output/proveedores_cleaned.csv", ["proveedor_id"]),
-    ("output/dim_tiempo.csv", ["tiempo_id"]),
-    ("output/ventas_cleaned.csv", ["venta_id", "producto_id", "cliente_id", "tiempo_id"]),
-    ("output/logistica_cleaned.csv", ["envio_id", "venta_id", "proveedor_id", "tiempo_id"])
+from extract.watermarks import (load_watermarks, save_watermarks, record_watermarks, download_increment, delta_path,
+                                save_pending_logistics, waiting_for_sale, clear_watermarks, APPEND_ONLY_FILES,
+                                REWRITTEN)
+from transform.clean_customers import clean_customers_data, clean_customers
+from transform.clean_products import clean_products_data, clean_products
+from transform.clean_suppliers import clean_suppliers_data, clean_suppliers
+from transform.clean_sales import clean_sales_data, clean_sales
+from transform.clean_logistic import clean_logistics_data, clean_logistics
+from transform.utils import (format_ids_in_csv, export_csv, format_ids, load_data, save_data, integer_id_mask,
+                             IdAllocator, KeyIndex, build_time_lookup)
+from transform.clean_sales import clean_sales_frame, build_sales_lookups
+from transform.clean_logistic import clean_logistics_frame
+from transform.clean_time import generate_time_dimension, build_time_dimension
+from transform.schemas import SOURCE_SCHEMAS, TABLE_SCHEMAS, apply_schema
+from load.load_to_postgresql import (load_csv_to_postgresql, load_dataframe_to_postgresql, prepare_staging_tables,
+                                     build_staging_tables, swap_staging_tables, STAGING_SCHEMA, read_table, max_id,
+                                     existing_ids, merge_dataframes_to_postgresql, execute_sql_from_file,
+                                     export_table, refresh_rollups, check_partitioned_keys, PARTITION_COLUMNS)
+from stage_cache import StageCache
+from dag import Stage, DagRunner
+from run_report import RunReport
+
+# (tabla intermedia, tabla en PostgreSQL, etapa que la produce, columnas de IDs)
+TABLES = [
+    ("clientes_cleaned", "clientes", "clean_customers", ["cliente_id"]),
+    ("productos_cleaned", "productos", "clean_products", ["producto_id"]),
+    ("proveedores_cleaned", "proveedores", "clean_suppliers", ["proveedor_id"]),
+    ("dim_tiempo", "tiempo", "generate_time_dimension", ["tiempo_id"]),
+    ("ventas_cleaned", "ventas", "clean_sales", ["venta_id", "producto_id", "cliente_id", "tiempo_id"]),
+    ("logistica_cleaned", "envios", "clean_logistics", ["envio_id", "venta_id", "proveedor_id", "tiempo_id"])
 ]
 
-print("🔍 Formateando IDs...")
-for file_path, id_columns in files_to_format:
-    format_ids_in_csv(file_path, file_path, id_columns)
-    wait_for_file(file_path)
+ETL_DIR = os.path.dirname(os.path.abspath(__file__))
+DATABASE_DIR = os.path.join(ETL_DIR, "database")
+SQL_FILES = {name: os.path.join(DATABASE_DIR, file) for name, file in
+             [("p_keys_path", "p_keys.sql"), ("f_keys_path", "f_keys.sql"), ("indexes_path", "indexes.sql"),
+              ("check_dates_path", "check_dates.sql")]}
+
+# Código que comparten todas las etapas: si cambia, ninguna etapa cacheada se reutiliza
+SHARED_CODE_PATHS = [os.path.join(ETL_DIR, path) for path in
+                     ["transform/utils.py", "transform/schemas.py", "run_report.py", "config.py"]]
+
+# Tablas a las que apuntan las llaves foráneas de cada tabla (f_keys.sql); en los modos merge y partitions se
+# cargan antes
+REFERENCES = {"ventas": ["tiempo", "productos", "clientes"], "envios": ["ventas", "tiempo", "proveedores"]}
+
+# En los modos merge y partitions, copia de la dimensión de tiempo publicada: sus timestamps se conservan al regenerarla
+PUBLISHED_TIME_PATH = f"output/stages/tiempo_publicado.{ETL_INTERMEDIATE_FORMAT}"
+
+def stage_path(name):
+    """Ruta de la tabla intermedia que produce una etapa de limpieza."""
+    return f"output/stages/{name}.{ETL_INTERMEDIATE_FORMAT}"
+
+def final_path(name):
+    """Ruta de la tabla final (con IDs formateados) que se carga en PostgreSQL."""
+    return f"output/{name}.{ETL_INTERMEDIATE_FORMAT}"
+
+def published_load_mode(table):
+    """
+    Modo de carga (if_exists) de una tabla cuando la ETL escribe directamente en las tablas publicadas: con
+    ETL_LOAD_MODE=partitions las tablas particionadas reemplazan los meses que cambiaron y el resto se integra
+    por llave primaria; con ETL_LOAD_MODE=merge todas se integran por llave primaria.
+    """
+    return "replace_partitions" if ETL_LOAD_MODE == "partitions" and table in PARTITION_COLUMNS else "merge"
+
+def build_stages():
+    """Declara las etapas de la ETL y sus dependencias."""
+    merge = ETL_LOAD_MODE in ("merge", "partitions")
+    time_path = PUBLISHED_TIME_PATH if merge else final_path("dim_tiempo")
+
+    stages = [
+        Stage("download", download_all_csv, message="🚀 Descargando datos...", cacheable=False,
+              outputs=["data/clientes.csv", "data/productos.csv", "data/proveedores.csv", "data/ventas.csv",
+                       "data/logistica.csv"]),
+        Stage("clean_customers", clean_customers_data,
+              args=("data/clientes.csv", stage_path("clientes_cleaned")),
+              inputs=["data/clientes.csv"], outputs=[stage_path("clientes_cleaned")],
+              depends_on=["download"], message="🧹 Limpiando clientes..."),
+        Stage("clean_products", clean_products_data,
+              args=("data/productos.csv", stage_path("productos_cleaned")),
+              inputs=["data/productos.csv"], outputs=[stage_path("productos_cleaned")],
+              depends_on=["download"], message="🧹 Limpiando productos..."),
+        Stage("clean_suppliers", clean_suppliers_data,
+              args=("data/proveedores.csv", stage_path("proveedores_cleaned")),
+              inputs=["data/proveedores.csv"], outputs=[stage_path("proveedores_cleaned")],
+              depends_on=["download"], message="🧹 Limpiando proveedores..."),
+        Stage("generate_time_dimension", generate_time_dimension,
+              args=("data/ventas.csv", "data/logistica.csv", stage_path("dim_tiempo")),
+              kwargs={"existing_path": time_path},
+              inputs=["data/ventas.csv", "data/logistica.csv"] + ([time_path] if merge else []),
+              outputs=[stage_path("dim_tiempo")],
+              depends_on=["download"] + (["save_published_time"] if merge else []),
+              message="📆 Generando dimensión de tiempo..."),
+        Stage("clean_sales", clean_sales_data,
+              args=("data/ventas.csv", stage_path("productos_cleaned"), stage_path("clientes_cleaned"), stage_path("dim_tiempo"), stage_path("ventas_cleaned")),
+              kwargs={"chunksize": ETL_CHUNKSIZE},
+              inputs=["data/ventas.csv"], outputs=[stage_path("ventas_cleaned")],
+              depends_on=["clean_products", "clean_customers", "generate_time_dimension"],
+              message="🧹 Limpiando ventas..."),
+        Stage("clean_logistics", clean_logistics_data,
+              args=("data/logistica.csv", stage_path("ventas_cleaned"), stage_path("proveedores_cleaned"), stage_path("dim_tiempo"), stage_path("logistica_cleaned")),
+              kwargs={"chunksize": ETL_CHUNKSIZE},
+              inputs=["data/logistica.csv"], outputs=[stage_path("logistica_cleaned")],
+              depends_on=["clean_sales", "clean_suppliers", "generate_time_dimension"],
+              message="🧹 Limpiando logística..."),
+    ]
+
+    if merge:
+        stages.append(Stage("save_published_time", export_table,
+                            args=("tiempo", PUBLISHED_TIME_PATH, TABLE_SCHEMAS["tiempo"]),
+                            outputs=[PUBLISHED_TIME_PATH], cacheable=False))
+    else:
+        stages.append(Stage("prepare_staging", prepare_staging_tables, cacheable=False,
+                            message="🗄️ Preparando tablas de staging..."))
+
+    load_stages = []
+    for name, table, producer, id_columns in TABLES:
+        stages.append(Stage(f"format_ids_{table}", format_ids_in_csv,
+                            args=(stage_path(name), final_path(name), id_columns),
+                            outputs=[final_path(name)], depends_on=[producer],
+                            message=f"🔍 Formateando IDs de {table}..."))
+
+        if ETL_CSV_EXPORT and ETL_INTERMEDIATE_FORMAT != "csv":
+            stages.append(Stage(f"export_csv_{table}", export_csv,
+                                args=(final_path(name), f"output/{name}.csv"),
+                                outputs=[f"output/{name}.csv"], depends_on=[f"format_ids_{table}"],
+                                message=f"📄 Exportando {table} a CSV..."))
+
+        if merge:
+            stages.append(Stage(f"load_{table}", load_csv_to_postgresql,
+                                args=(final_path(name), table), kwargs={"if_exists": published_load_mode(table)},
+                                depends_on=[f"format_ids_{table}"] + [f"load_{ref}" for ref in REFERENCES.get(table, [])],
+                                cacheable=False, message=f"🔀 Integrando {table}..."))
+        else:
+            stages.append(Stage(f"load_{table}", load_csv_to_postgresql,
+                                args=(final_path(name), table), kwargs={"schema": STAGING_SCHEMA},
+                                depends_on=[f"format_ids_{table}", "prepare_staging"], cacheable=False))
+        load_stages.append(f"load_{table}")
+
+    if merge:
+        stages.append(Stage("check_dates", execute_sql_from_file, args=(SQL_FILES["check_dates_path"],),
+                            depends_on=load_stages, cacheable=False))
+        stages.append(Stage("check_keys", check_partitioned_keys, depends_on=["check_dates"], cacheable=False))
+        # Solo se recalculan los meses que cambiaron en las cargas (y en check_dates, que borra de esos meses)
+        stages.append(Stage("refresh_rollups", refresh_rollups, depends_on=["check_keys"], cacheable=False,
+                            message="📊 Actualizando resúmenes..."))
+        published = "refresh_rollups"
+    else:
+        stages.append(Stage("build_staging", build_staging_tables, kwargs=SQL_FILES, depends_on=load_stages,
+                            cacheable=False, message="🔑 Creando llaves e índices en staging..."))
+        stages.append(Stage("refresh_rollups", refresh_rollups, kwargs={"schema": STAGING_SCHEMA, "full": True},
+                            depends_on=["build_staging"], cacheable=False, message="📊 Construyendo resúmenes..."))
+        stages.append(Stage("swap_staging", swap_staging_tables, depends_on=["refresh_rollups"], cacheable=False,
+                            message="🔀 Publicando tablas..."))
+        published = "swap_staging"
+    if ETL_INCREMENTAL:
+        stages.append(Stage("record_watermarks", record_watermarks, depends_on=[published], cacheable=False))
+
+    return stages
+
+def _load_final_table(df, name, table, id_columns, write_outputs, merge=False):
+    df = format_ids(df, id_columns)
+    if write_outputs:
+        save_data(df, final_path(name))
+    if merge:
+        load_dataframe_to_postgresql(df, table, if_exists=published_load_mode(table))
+    else:
+        load_dataframe_to_postgresql(df, table, schema=STAGING_SCHEMA)
+
+
+def _clean_dimensions(step):
+    """
+    Limpia en memoria clientes, productos y proveedores desde data/ (son pequeñas: se limpian completas también
+    en la carga incremental).
+
+    :param step: Función que ejecuta y mide cada paso (RunReport.run o una llamada directa)
+    :return: Diccionario tabla -> DataFrame limpio
+    """
+    print("🧹 Limpiando clientes, productos y proveedores...")
+    return {
+        "clientes": step("clean_customers", lambda: clean_customers(
+            load_data("data/clientes.csv", schema=SOURCE_SCHEMAS["clientes"]))),
+        "productos": step("clean_products", lambda: clean_products(
+            load_data("data/productos.csv", schema=SOURCE_SCHEMAS["productos"]))),
+        "proveedores": step("clean_suppliers", lambda: clean_suppliers(
+            load_data("data/proveedores.csv", schema=SOURCE_SCHEMAS["proveedores"]))),
+    }
+
+
+def run_in_memory(write_outputs=False, report=None):
+    """
+    Ejecuta la ETL completa en un solo proceso, pasando DataFrames entre etapas sin escribir ni releer
+    tablas intermedias. Las tablas finales se cargan desde memoria en staging y se publican igual que
+    en el modo por etapas (o, con ETL_LOAD_MODE merge o partitions, se integran directamente en las tablas
+    publicadas).
+    Los datos crudos de cada tabla de hechos se liberan en cuanto se limpian.
+
+    :param write_outputs: Si es True, también guarda las tablas finales en output/
+    :param report: RunReport opcional en el que se mide cada paso
+    """
+    step = report.run if report is not None else lambda name, func, *args, **kwargs: func(*args, **kwargs)
+    merge = ETL_LOAD_MODE in ("merge", "partitions")
+
+    print("🚀 Descargando datos...")
+    step("download", download_all_csv)
+
+    sales_raw = step("read_sales", load_data, "data/ventas.csv", schema=SOURCE_SCHEMAS["ventas"])
+    logistics_raw = step("read_logistics", load_data, "data/logistica.csv", schema=SOURCE_SCHEMAS["logistica"])
+    tables = _clean_dimensions(step)
+
+    print("📆 Generando dimensión de tiempo...")
+    if merge:
+        existing_time = read_table("tiempo", list(TABLE_SCHEMAS["tiempo"]))
+    else:
+        existing_time = load_data(final_path("dim_tiempo")) if os.path.exists(final_path("dim_tiempo")) else None
+    tables["tiempo"] = step("generate_time_dimension", build_time_dimension, sales_raw[["fecha"]],
+                            logistics_raw[["fecha_envio"]], existing_time)
+
+    print("🧹 Limpiando ventas...")
+    tables["ventas"] = step("clean_sales", clean_sales, sales_raw, tables["productos"], tables["clientes"],
+                            tables["tiempo"])
+    del sales_raw
+
+    print("🧹 Limpiando logística...")
+    tables["envios"] = step("clean_logistics", clean_logistics, logistics_raw, tables["ventas"][["venta_id"]],
+                            tables["proveedores"], tables["tiempo"])
+    del logistics_raw
+
+    if not merge:
+        step("prepare_staging", prepare_staging_tables)
+    for name, table, _, id_columns in TABLES:
+        step(f"load_{table}", _load_final_table, tables.pop(table), name, table, id_columns, write_outputs, merge)
+
+    if merge:
+        step("check_dates", execute_sql_from_file, SQL_FILES["check_dates_path"])
+        step("check_keys", check_partitioned_keys)
+        step("refresh_rollups", refresh_rollups)
+    else:
+        step("build_staging", build_staging_tables, **SQL_FILES)
+        step("refresh_rollups", refresh_rollups, STAGING_SCHEMA, full=True)
+        step("swap_staging", swap_staging_tables)
+    if ETL_INCREMENTAL:
+        step("record_watermarks", record_watermarks)
+
+
+def _clean_increment(sales_raw, logistics_raw, tables):
+    """
+    Limpia las filas nuevas de ventas y logística contra las dimensiones recién limpiadas y lo ya publicado:
+    la dimensión de tiempo vigente se lee de la base y se extiende con los timestamps nuevos, los IDs
+    nuevos se asignan por encima del máximo publicado y los envíos pueden referirse a ventas anteriores.
+    Los envíos cuya venta todavía no llegó no se descartan: se devuelven aparte, sin limpiar, para que la
+    siguiente carga incremental los vuelva a procesar.
+
+    :return: Tupla (tablas, envíos pendientes)
+    """
+    existing_time = read_table("tiempo", list(TABLE_SCHEMAS["tiempo"]))
+    time_df = build_time_dimension(sales_raw[["fecha"]], logistics_raw[["fecha_envio"]], existing_time)
+
+    last_sale_id = max_id("ventas", "venta_id")
+    valid, ids = integer_id_mask(sales_raw["venta_id"])
+    sales_allocator = IdAllocator(ids[valid], start_id=last_sale_id + 1)
+    sales = clean_sales_frame(sales_raw, *build_sales_lookups(tables["productos"], tables["clientes"], time_df),
+                              allocator=sales_allocator)
+    sales = apply_schema(sales, TABLE_SCHEMAS["ventas"])
+
+    referenced = logistics_raw["venta_id"].dropna().astype("int64")
+    previous_sales = existing_ids("ventas", "venta_id", referenced[~referenced.isin(sales["venta_id"])].unique())
+    known_sales = KeyIndex(pd.concat([sales["venta_id"], pd.Series(previous_sales)]))
+
+    # Un envío puede llegar al origen antes que su venta: queda pendiente en lugar de descartarse
+    waiting = waiting_for_sale(logistics_raw, max(last_sale_id, sales["venta_id"].max() if len(sales) else 0))
+    pending = logistics_raw[waiting].copy()
+    if len(pending):
+        print(f"⏳ {len(pending)} envíos quedan pendientes de una venta que todavía no se publicó")
+
+    logistics_allocator = IdAllocator(logistics_raw["envio_id"].dropna(), start_id=max_id("envios", "envio_id") + 1)
+    logistics = clean_logistics_frame(logistics_raw[~waiting], known_sales,
+                                      KeyIndex(tables["proveedores"]["proveedor_id"]), build_time_lookup(time_df),
+                                      logistics_allocator)
+    logistics = apply_schema(logistics, TABLE_SCHEMAS["envios"])
+
+    # Igual que check_dates.sql: se descartan los hechos con fecha futura y solo se publican los tiempos usados
+    time_df = time_df[~time_df["tiempo_id"].isin(existing_time["tiempo_id"].astype("int64"))]
+    future = time_df.loc[pd.to_datetime(time_df["fecha"]) > pd.Timestamp.today().normalize(), "tiempo_id"]
+    sales = sales[~sales["tiempo_id"].isin(future)]
+    logistics = logistics[~logistics["tiempo_id"].isin(future)]
+    tables["tiempo"] = time_df[time_df["tiempo_id"].isin(sales["tiempo_id"])
+                               | time_df["tiempo_id"].isin(logistics["tiempo_id"])]
+    tables["ventas"], tables["envios"] = sales, logistics
+    return tables, pending
+
+
+def run_incremental(report=None):
+    """
+    Carga incremental: descarga solo lo que se agregó a ventas.csv y logistica.csv desde la última carga
+    (ver extract/watermarks.py), lo limpia y lo integra en las tablas publicadas en una sola transacción;
+    después se actualizan los resúmenes de los meses que cambiaron.
+    Las dimensiones se vuelven a limpiar completas (son pequeñas) y solo se insertan sus filas nuevas.
+    Los envíos que la carga anterior dejó pendientes de su venta (ETL_PENDING_LOGISTICS_PATH) se procesan de
+    nuevo junto con los nuevos. Los watermarks se actualizan únicamente si la carga termina con éxito.
+
+    :param report: RunReport opcional en el que se mide cada paso
+    :return: False si hace falta una carga completa (sin watermarks, o algún archivo se reescribió)
+    """
+    step = report.run if report is not None else lambda name, func, *args, **kwargs: func(*args, **kwargs)
+
+    watermarks = load_watermarks()
+    if any(file not in watermarks for file in APPEND_ONLY_FILES):
+        print("⚠️ No hay watermarks de una carga anterior; se hace una carga completa.")
+        return False
+
+    print("🚀 Descargando filas nuevas...")
+    results = step("download", download_increment, watermarks)
+    rewritten = [file for file, (status, _, _) in results.items() if status == REWRITTEN]
+    if rewritten:
+        print(f"⚠️ {', '.join(rewritten)} no solo creció por el final; se hace una carga completa.")
+        return False
+
+    sales_raw = step("read_sales", load_data, delta_path("ventas.csv"), schema=SOURCE_SCHEMAS["ventas"])
+    logistics_raw = step("read_logistics", load_data, delta_path("logistica.csv"), schema=SOURCE_SCHEMAS["logistica"])
+    if os.path.exists(ETL_PENDING_LOGISTICS_PATH):
+        pending = load_data(ETL_PENDING_LOGISTICS_PATH, schema=SOURCE_SCHEMAS["logistica"])
+        # Si la carga anterior falló después de guardar sus pendientes, sus filas nuevas se descargan otra vez
+        logistics_raw = pd.concat([pending, logistics_raw], ignore_index=True).drop_duplicates(ignore_index=True)
+    tables = _clean_dimensions(step)
+
+    print(f"🧹 Limpiando {len(sales_raw)} ventas y {len(logistics_raw)} envíos nuevos...")
+    tables, pending = step("clean_increment", _clean_increment, sales_raw, logistics_raw, tables)
+
+    frames = {table: format_ids(tables[table], id_columns) for _, table, _, id_columns in TABLES}
+    step("merge", merge_dataframes_to_postgresql, frames)
+    step("refresh_rollups", refresh_rollups)
+
+    # Los pendientes se guardan antes que los watermarks: si la carga se interrumpe entre ambos, la siguiente
+    # vuelve a descargar las mismas filas y los duplicados se descartan al leerlos
+    save_pending_logistics(pending)
+    save_watermarks({file: watermark for file, (_, watermark, _) in results.items()})
+    return True
+
+
+if __name__ == "__main__":
+    os.makedirs("output/stages", exist_ok=True)
 
+    incremental = ETL_INCREMENTAL and not ETL_FULL_REBUILD
+    report = RunReport(ETL_REPORT_DIR, trace_memory=ETL_TRACEMALLOC, config={
+        "mode": "memory" if ETL_IN_MEMORY else "stages",
+        "incremental": incremental,
+        "load_mode": ETL_LOAD_MODE,
+        "chunksize": ETL_CHUNKSIZE,
+        "intermediate_format": ETL_INTERMEDIATE_FORMAT,
+        "csv_engine": ETL_CSV_ENGINE,
+        "cache": ETL_CACHE_ENABLED,
+        "max_workers": ETL_MAX_WORKERS,
+        "low_memory": ETL_LOW_MEMORY,
+        "memory_budget_mb": ETL_MEMORY_BUDGET_MB if ETL_LOW_MEMORY else None,
+    })
+    runner = None
+    error = None
+    if not ETL_INCREMENTAL:
+        clear_watermarks()
 
-print("💾 Cargando datos en PostgreSQL...")
+    try:
+        if incremental and run_incremental(report=report):
+            print("✅ Carga incremental completada")
+        elif ETL_IN_MEMORY:
+            run_in_memory(write_outputs=ETL_WRITE_OUTPUTS, report=report)
+        else:
+            cache = StageCache("output/.etl_cache.json", code_paths=SHARED_CODE_PATHS, enabled=ETL_CACHE_ENABLED)
+            runner = DagRunner(build_stages(), cache=cache, max_workers=ETL_MAX_WORKERS, run_report=report)
 
-load_csv_to_postgresql("output/clientes_cleaned.csv", "clientes", id_columns=["cliente_id"])
-load_csv_to_postgresql("output/productos_cleaned.csv", "productos", id_columns=["producto_id"])
-load_csv_to_postgresql("output/proveedores_cleaned.csv", "proveedores", id_columns=["proveedor_id"])
-load_csv_to_postgresql("output/dim_tiempo.csv", "tiempo", id_columns=["tiempo_id"])
-load_csv_to_postgresql("output/ventas_cleaned.csv", "ventas", id_columns=["venta_id", "producto_id", "cliente_id", "tiempo_id"])
-load_csv_to_postgresql("output/logistica_cleaned.csv", "envios", id_columns=["envio_id", "venta_id", "proveedor_id", "tiempo_id"])
-execute_sql_from_file("database/p_keys.sql")
-execute_sql_from_file("database/f_keys.sql")
-execute_sql_from_file("database/indexes.sql")
-execute_sql_from_file("database/check_dates.sql")
-print("✅ ¡Proceso de ETL completado!")
+            try:
+                runner.run()
+            finally:
+                cache.summary()
+                runner.report()
+    except Exception as e:
+        error = e
+        raise
+    finally:
+        report.write("error" if error else "ok", str(error) if error else None,
+                     runner.critical_path() if runner is not None else None)
 
+    print("✅ ¡Proceso de ETL completado!")
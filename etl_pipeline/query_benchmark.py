@@ -0,0 +1,201 @@
+import json
+import os
+import statistics
+import time
+from datetime import date, datetime, timedelta
+from psycopg2 import sql
+from config import ETL_BENCH_DIR, ETL_QUERY_BENCH_ROWS, ETL_QUERY_BENCH_YEARS, ETL_MAX_WORKERS, ETL_LOAD_MODE
+from extract.generate_data import generate_all_csv
+from load.load_to_postgresql import get_connection
+from benchmark import pipeline_stages
+from dag import DagRunner
+
+# Repeticiones de cada consulta (después de una ejecución de calentamiento); se guarda la mediana y la mínima
+QUERY_REPEAT = 5
+
+# Esquema con la copia de ventas y envíos en el diseño anterior: tablas sin particionar, sin la columna fecha
+# y con los mismos índices que antes
+HEAP_SCHEMA = "bench_heap"
+
+HEAP_TABLES = {
+    "ventas": ["venta_id", "producto_id", "cantidad", "precio_unitario", "cliente_id", "sucursal_id", "total",
+               "tiempo_id"],
+    "envios": ["envio_id", "venta_id", "proveedor_id", "estado_envio", "tiempo_id"],
+}
+HEAP_INDEXES = {
+    "ventas": [["tiempo_id"], ["producto_id", "cliente_id"]],
+    "envios": [["venta_id", "proveedor_id"], ["tiempo_id"], ["estado_envio"]],
+}
+
+# Consultas de la API antes (filtros sobre la dimensión de tiempo) y después (filtros sobre la clave de
+# partición); {ventas} y {envios} se reemplazan por las tablas de cada diseño
+QUERIES = {
+    "ventas_mes": (
+        "SELECT v.* FROM {ventas} v JOIN tiempo t ON v.tiempo_id = t.tiempo_id "
+        "WHERE t.fecha >= %(inicio)s AND t.fecha <= %(fin)s LIMIT 5000",
+        "SELECT v.* FROM {ventas} v WHERE v.fecha >= %(inicio)s AND v.fecha <= %(fin)s LIMIT 5000"),
+    "ventas_periodo_dia": (
+        "SELECT t.dia, sum(v.total) FROM {ventas} v JOIN tiempo t ON v.tiempo_id = t.tiempo_id "
+        "WHERE t.anio = %(anio)s AND t.mes = %(mes)s GROUP BY t.dia",
+        "SELECT t.dia, sum(v.total) FROM {ventas} v JOIN tiempo t ON v.tiempo_id = t.tiempo_id "
+        "WHERE t.anio = %(anio)s AND t.mes = %(mes)s AND v.fecha >= %(inicio)s AND v.fecha < %(siguiente)s "
+        "GROUP BY t.dia"),
+    "ventas_periodo_mes": (
+        "SELECT t.mes, sum(v.total) FROM {ventas} v JOIN tiempo t ON v.tiempo_id = t.tiempo_id "
+        "WHERE t.anio = %(anio)s GROUP BY t.mes",
+        "SELECT t.mes, sum(v.total) FROM {ventas} v JOIN tiempo t ON v.tiempo_id = t.tiempo_id "
+        "WHERE t.anio = %(anio)s AND v.fecha >= %(anio_inicio)s AND v.fecha < %(anio_siguiente)s GROUP BY t.mes"),
+    "envios_periodo_dia": (
+        "SELECT t.dia, count(e.envio_id) FROM {envios} e JOIN tiempo t ON e.tiempo_id = t.tiempo_id "
+        "WHERE t.anio = %(anio)s AND t.mes = %(mes)s GROUP BY t.dia",
+        "SELECT t.dia, count(e.envio_id) FROM {envios} e JOIN tiempo t ON e.tiempo_id = t.tiempo_id "
+        "WHERE t.anio = %(anio)s AND t.mes = %(mes)s AND e.fecha >= %(inicio)s AND e.fecha < %(siguiente)s "
+        "GROUP BY t.dia"),
+    "envios_semana": (
+        "SELECT e.* FROM {envios} e JOIN tiempo t ON e.tiempo_id = t.tiempo_id "
+        "WHERE t.fecha >= %(inicio)s AND t.fecha <= %(semana_fin)s LIMIT 5000",
+        "SELECT e.* FROM {envios} e WHERE e.fecha >= %(inicio)s AND e.fecha <= %(semana_fin)s LIMIT 5000"),
+}
+
+
+# Consultas de los endpoints /periodo sobre las tablas de hechos particionadas y sobre las tablas de resumen
+ROLLUP_QUERIES = {
+    "ventas_periodo_anio": (
+        "SELECT t.anio, sum(v.total) FROM ventas v JOIN tiempo t ON v.tiempo_id = t.tiempo_id GROUP BY t.anio",
+        "SELECT anio, sum(total_ventas) FROM ventas_por_anio WHERE desglose = 'total' AND valor = '' "
+        "GROUP BY anio"),
+    "ventas_periodo_dia": (
+        "SELECT t.dia, sum(v.total) FROM ventas v JOIN tiempo t ON v.tiempo_id = t.tiempo_id "
+        "WHERE t.anio = %(anio)s AND t.mes = %(mes)s AND v.fecha >= %(inicio)s AND v.fecha < %(siguiente)s "
+        "GROUP BY t.dia",
+        "SELECT dia, sum(total_ventas) FROM ventas_por_dia WHERE desglose = 'total' AND valor = '' "
+        "AND anio = %(anio)s AND mes = %(mes)s GROUP BY dia"),
+    "ventas_periodo_mes_sucursal": (
+        "SELECT t.mes, sum(v.total) FROM ventas v JOIN tiempo t ON v.tiempo_id = t.tiempo_id "
+        "WHERE t.anio = %(anio)s AND v.fecha >= %(anio_inicio)s AND v.fecha < %(anio_siguiente)s "
+        "AND v.sucursal_id = 3 GROUP BY t.mes",
+        "SELECT mes, sum(total_ventas) FROM ventas_por_mes WHERE desglose = 'sucursal' AND valor = '3' "
+        "AND anio = %(anio)s GROUP BY mes"),
+    "envios_periodo_mes": (
+        "SELECT t.mes, count(e.envio_id) FROM envios e JOIN tiempo t ON e.tiempo_id = t.tiempo_id GROUP BY t.mes",
+        "SELECT mes, sum(total_envios) FROM envios_por_mes WHERE desglose = 'total' AND valor = '' GROUP BY mes"),
+}
+
+
+def load_dataset(sales_rows, years):
+    """
+    Genera (o reutiliza) los datos sintéticos y los carga en la base con el pipeline completo.
+
+    :param sales_rows: Filas de ventas y de logística
+    :param years: Años que abarcan las fechas
+    """
+    scale_dir = os.path.join(ETL_BENCH_DIR, f"query_{sales_rows}_{years}y")
+    generate_all_csv(os.path.join(scale_dir, "data"), sales_rows, years=years)
+
+    cwd = os.getcwd()
+    os.chdir(scale_dir)
+    try:
+        os.makedirs("output/stages", exist_ok=True)
+        DagRunner(pipeline_stages(load=True), max_workers=ETL_MAX_WORKERS).run()
+    finally:
+        os.chdir(cwd)
+
+
+def build_heap_copy(cursor):
+    """Copia ventas y envíos publicados en HEAP_SCHEMA con el diseño anterior (sin particiones)."""
+    cursor.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(HEAP_SCHEMA)))
+    cursor.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(HEAP_SCHEMA)))
+    for table, columns in HEAP_TABLES.items():
+        target = sql.Identifier(HEAP_SCHEMA, table)
+        cursor.execute(sql.SQL("CREATE TABLE {} AS SELECT {} FROM {}").format(
+            target, sql.SQL(", ").join(map(sql.Identifier, columns)), sql.Identifier("public", table)))
+        cursor.execute(sql.SQL("ALTER TABLE {} ADD PRIMARY KEY ({})").format(target, sql.Identifier(columns[0])))
+        for index in HEAP_INDEXES[table]:
+            cursor.execute(sql.SQL("CREATE INDEX ON {} ({})").format(
+                target, sql.SQL(", ").join(map(sql.Identifier, index))))
+        cursor.execute(sql.SQL("ANALYZE {}").format(target))
+    cursor.execute("ANALYZE")
+
+
+def query_params(cursor):
+    """Parámetros de las consultas: un mes y un año completos dentro de los datos cargados."""
+    cursor.execute("SELECT max(fecha) FROM tiempo")
+    last = cursor.fetchone()[0]
+    year = last.year - 1
+    start = date(year, 6, 1)
+    return {"anio": year, "mes": 6, "inicio": start, "fin": date(year, 6, 30), "siguiente": date(year, 7, 1),
+            "semana_fin": start + timedelta(days=6), "anio_inicio": date(year, 1, 1),
+            "anio_siguiente": date(year + 1, 1, 1)}
+
+
+def time_query(cursor, query, params, repeat=QUERY_REPEAT):
+    """
+    Mide la latencia de una consulta, incluida la lectura de todas sus filas.
+
+    :return: Diccionario con filas, latencia mediana y mínima en milisegundos
+    """
+    cursor.execute(query, params)
+    rows = len(cursor.fetchall())
+    latencies = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        cursor.execute(query, params)
+        cursor.fetchall()
+        latencies.append((time.perf_counter() - start) * 1000)
+    return {"rows": rows, "median_ms": statistics.median(latencies), "min_ms": min(latencies)}
+
+
+def run_query_benchmark(sales_rows=ETL_QUERY_BENCH_ROWS, years=ETL_QUERY_BENCH_YEARS, load=True):
+    """
+    Compara la latencia de las consultas de la API con ventas y envíos sin particionar (filtrando por la
+    dimensión de tiempo) y particionados por mes (filtrando por fecha), y la de los endpoints /periodo sobre
+    las tablas de hechos y sobre las tablas de resumen. Carga los datos sintéticos con la ETL, por lo que
+    reemplaza las tablas publicadas de la base de DATABASE_URL: usar una base de pruebas.
+
+    :param sales_rows: Filas de ventas y de logística de los datos sintéticos
+    :param years: Años que abarcan las fechas
+    :param load: Si es False se miden las tablas ya cargadas
+    :return: Diccionario consulta -> métricas antes y después
+    """
+    if load:
+        print(f"⏱️ Cargando {sales_rows:,} ventas de {years} años...")
+        load_dataset(sales_rows, years)
+
+    results = {}
+    with get_connection() as connection, connection.cursor() as cursor:
+        build_heap_copy(cursor)
+        connection.commit()
+        params = query_params(cursor)
+        for name, (before, after) in QUERIES.items():
+            heap = sql.SQL(before).format(ventas=sql.Identifier(HEAP_SCHEMA, "ventas"),
+                                          envios=sql.Identifier(HEAP_SCHEMA, "envios"))
+            partitioned = sql.SQL(after).format(ventas=sql.Identifier("public", "ventas"),
+                                                envios=sql.Identifier("public", "envios"))
+            result = {"before": time_query(cursor, heap, params), "after": time_query(cursor, partitioned, params)}
+            result["speedup"] = result["before"]["median_ms"] / result["after"]["median_ms"]
+            results[name] = result
+            print(f"   {name}: {result['before']['median_ms']:.1f} ms → {result['after']['median_ms']:.1f} ms "
+                  f"(x{result['speedup']:.1f})")
+        cursor.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(HEAP_SCHEMA)))
+
+        for name, (raw, rollup) in ROLLUP_QUERIES.items():
+            result = {"raw": time_query(cursor, raw, params), "rollup": time_query(cursor, rollup, params)}
+            result["speedup"] = result["raw"]["median_ms"] / result["rollup"]["median_ms"]
+            results[f"rollup_{name}"] = result
+            print(f"   rollup_{name}: {result['raw']['median_ms']:.1f} ms → {result['rollup']['median_ms']:.1f} ms "
+                  f"(x{result['speedup']:.1f})")
+
+    os.makedirs(ETL_BENCH_DIR, exist_ok=True)
+    report = {"started_at": datetime.now().isoformat(timespec="seconds"),
+              "config": {"sales_rows": sales_rows, "years": years, "repeat": QUERY_REPEAT,
+                         "load_mode": ETL_LOAD_MODE},
+              "params": {key: str(value) for key, value in params.items()}, "results": results}
+    path = os.path.join(ETL_BENCH_DIR, f"query_bench_{datetime.now():%Y%m%d_%H%M%S}.json")
+    with open(path, "w") as file:
+        json.dump(report, file, indent=2)
+    print(f"📊 Resultados guardados en {path}")
+    return results
+
+
+if __name__ == "__main__":
+    run_query_benchmark()
@@ -0,0 +1,218 @@
+import functools
+import json
+import os
+import time
+import tracemalloc
+from datetime import datetime
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Diferencia mínima para considerar una regresión, para no marcar el ruido de las etapas cortas
+MIN_DELTA = {"wall_seconds": 0.5, "peak_rss_mb": 10}
+
+# Contadores de la etapa en curso en este proceso (filas de entrada/salida, filas rechazadas por regla)
+_counters = {}
+
+
+def count(metric, value):
+    """
+    Suma un valor a un contador de la etapa en curso.
+
+    :param metric: Nombre del contador (por ejemplo 'rows_in' o 'rejected.clean_dates')
+    :param value: Valor a sumar
+    """
+    _counters[metric] = _counters.get(metric, 0) + int(value)
+
+
+def track_rows(func):
+    """
+    Decorador para las reglas de limpieza que reciben un DataFrame y devuelven el DataFrame filtrado
+    (o una tupla cuyo primer elemento es el DataFrame): cuenta las filas descartadas por la regla en
+    el contador 'rejected.<nombre de la función>'.
+    """
+    @functools.wraps(func)
+    def wrapper(df, *args, **kwargs):
+        rows = len(df)
+        result = func(df, *args, **kwargs)
+        frame = result[0] if isinstance(result, tuple) else result
+        count(f"rejected.{func.__name__}", rows - len(frame))
+        return result
+    return wrapper
+
+
+def _reset_peak_rss():
+    # En Linux, escribir 5 en clear_refs reinicia el pico de memoria (VmHWM) del proceso. Los procesos del
+    # pool se reutilizan entre etapas, así que sin esto el pico sería el de todas las etapas anteriores.
+    try:
+        with open("/proc/self/clear_refs", "w") as file:
+            file.write("5")
+    except OSError:
+        pass
+
+
+def _peak_rss_mb():
+    try:
+        with open("/proc/self/status") as file:
+            for line in file:
+                if line.startswith("VmHWM:"):
+                    return int(line.split()[1]) / 1024
+    except OSError:
+        pass
+    if resource is not None:
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024
+    return None
+
+
+def measure(func, args=(), kwargs=None, trace_memory=False):
+    """
+    Ejecuta una función de la ETL y mide su tiempo, CPU, memoria y contadores. Se ejecuta en el mismo
+    proceso que la función (dentro del pool, en el modo por etapas).
+
+    :param func: Función a ejecutar
+    :param args: Argumentos posicionales
+    :param kwargs: Argumentos con nombre
+    :param trace_memory: Si es True también mide el pico de tracemalloc (más preciso, pero más lento)
+    :return: Diccionario con wall_seconds, cpu_seconds, peak_rss_mb, tracemalloc_peak_mb y counters
+    """
+    _counters.clear()
+    _reset_peak_rss()
+    if trace_memory:
+        tracemalloc.start()
+
+    wall_start, cpu_start = time.perf_counter(), time.process_time()
+    try:
+        func(*args, **(kwargs or {}))
+    finally:
+        traced_peak = tracemalloc.get_traced_memory()[1] / 2 ** 20 if trace_memory else None
+        if trace_memory:
+            tracemalloc.stop()
+
+    return {
+        "wall_seconds": time.perf_counter() - wall_start,
+        "cpu_seconds": time.process_time() - cpu_start,
+        "peak_rss_mb": _peak_rss_mb(),
+        "tracemalloc_peak_mb": traced_peak,
+        "counters": dict(_counters),
+    }
+
+
+class RunReport:
+    """
+    Reporte de una ejecución de la ETL en JSON: tiempos, CPU, memoria y filas por etapa. Cada ejecución
+    se guarda con su fecha en report_dir (y en latest.json) y se compara con la última ejecución correcta
+    con la misma configuración, de modo que las regresiones se ven al terminar.
+    """
+
+    def __init__(self, report_dir="output/reports", config=None, trace_memory=False, tolerance=0.2):
+        """
+        :param report_dir: Carpeta donde se guardan los reportes
+        :param config: Configuración de la ejecución a incluir en el reporte (chunksize, formato, etc.)
+        :param trace_memory: Si es True las etapas miden también el pico de tracemalloc
+        :param tolerance: Aumento relativo de tiempo o memoria a partir del cual una etapa se marca como regresión
+        """
+        self.report_dir = report_dir
+        self.trace_memory = trace_memory
+        self.tolerance = tolerance
+        self.started = datetime.now()
+        self.start = time.perf_counter()
+        self.report = {"started_at": self.started.isoformat(timespec="seconds"), "config": config or {},
+                       "status": "running", "stages": {}}
+
+    def run(self, name, func, *args, **kwargs):
+        """
+        Ejecuta y mide una etapa en este mismo proceso (modo en memoria).
+
+        :return: Valor devuelto por func
+        """
+        result = {}
+
+        def call():
+            result["value"] = func(*args, **kwargs)
+
+        try:
+            self.add_stage(name, measure(call, trace_memory=self.trace_memory))
+        except Exception as e:
+            self.add_stage(name, {"error": str(e)})
+            raise
+        return result.get("value")
+
+    def add_stage(self, name, metrics, **extra):
+        """
+        Registra las métricas de una etapa. Los contadores 'rejected.<regla>' se agrupan en 'rejected'.
+
+        :param name: Nombre de la etapa
+        :param metrics: Diccionario devuelto por measure (o con 'error' si la etapa falló)
+        :param extra: Datos adicionales de la etapa (por ejemplo cached=True o el inicio relativo)
+        """
+        counters = metrics.pop("counters", {})
+        stage = {**metrics, **extra}
+        stage["rows"] = {key: value for key, value in counters.items() if not key.startswith("rejected.")}
+        stage["rejected"] = {key.split(".", 1)[1]: value for key, value in counters.items()
+                             if key.startswith("rejected.") and value}
+        self.report["stages"][name] = stage
+
+    def _previous_run(self):
+        # Última ejecución correcta con la misma configuración: comparar el modo en memoria con el modo por
+        # etapas (o un chunksize con otro) marcaría regresiones que no lo son
+        names = sorted((name for name in os.listdir(self.report_dir) if name.startswith("etl_run_")), reverse=True)
+        for name in names:
+            with open(os.path.join(self.report_dir, name), "r") as file:
+                previous = json.load(file)
+            if previous.get("status") == "ok" and previous.get("config") == self.report["config"]:
+                return previous
+        return None
+
+    def _compare(self, previous):
+        regressions = []
+        for name, stage in self.report["stages"].items():
+            before = previous.get("stages", {}).get(name)
+            if not before or stage.get("cached") or before.get("cached"):
+                continue
+            for metric in ("wall_seconds", "peak_rss_mb"):
+                new, old = stage.get(metric), before.get(metric)
+                if new is not None and old and new > old * (1 + self.tolerance) and new - old > MIN_DELTA[metric]:
+                    regressions.append({"stage": name, "metric": metric, "previous": old, "current": new})
+        return regressions
+
+    def write(self, status="ok", error=None, critical_path=None):
+        """
+        Cierra el reporte, lo compara con la última ejecución correcta con la misma configuración y lo guarda.
+
+        :param status: 'ok' o 'error'
+        :param error: Mensaje del error que detuvo la ejecución (opcional)
+        :param critical_path: Tupla (etapas, segundos) del camino crítico (opcional)
+        :return: Ruta del reporte guardado
+        """
+        stages = self.report["stages"].values()
+        self.report.update({
+            "finished_at": datetime.now().isoformat(timespec="seconds"),
+            "status": status,
+            "error": error,
+            "wall_seconds": time.perf_counter() - self.start,
+            "cpu_seconds": sum(stage.get("cpu_seconds") or 0 for stage in stages),
+            "peak_rss_mb": max((stage.get("peak_rss_mb") or 0 for stage in stages), default=0),
+        })
+        if critical_path:
+            self.report["critical_path"] = {"stages": critical_path[0], "seconds": critical_path[1]}
+
+        os.makedirs(self.report_dir, exist_ok=True)
+        latest_path = os.path.join(self.report_dir, "latest.json")
+        previous = self._previous_run()
+        if previous is not None:
+            self.report["previous_run"] = previous.get("started_at")
+            self.report["regressions"] = self._compare(previous)
+
+        path = os.path.join(self.report_dir, f"etl_run_{self.started:%Y%m%d_%H%M%S}.json")
+        for target in (path, latest_path):
+            with open(target, "w") as file:
+                json.dump(self.report, file, indent=2)
+
+        print(f"📊 Reporte de ejecución guardado en {path} ({self.report['wall_seconds']:.2f}s, "
+              f"pico {self.report['peak_rss_mb']:.0f} MB)")
+        for regression in self.report.get("regressions", []):
+            print(f"   ⚠️ Regresión en {regression['stage']}: {regression['metric']} "
+                  f"{regression['previous']:.2f} → {regression['current']:.2f}")
+        return path
@@ -0,0 +1,136 @@
+import hashlib
+import inspect
+import json
+import os
+
+
+def hash_file(path, block_size=1024 * 1024):
+    """
+    Calcula el hash SHA-256 del contenido de un archivo, leyéndolo por bloques.
+
+    :param path: Ruta del archivo
+    :param block_size: Tamaño de cada bloque leído
+    :return: Hash hexadecimal del archivo, o None si el archivo no existe
+    """
+    if not os.path.exists(path):
+        return None
+
+    digest = hashlib.sha256()
+    with open(path, "rb") as file:
+        for block in iter(lambda: file.read(block_size), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+class StageCache:
+    """
+    Caché por etapa de la ETL, direccionada por contenido.
+
+    La clave de una etapa es el hash de sus archivos de entrada, del código fuente de la función, de sus
+    argumentos y de las claves de las etapas de las que depende. Si la clave coincide con la de la última
+    ejecución exitosa y sus salidas existen, la etapa se omite. El manifiesto se guarda después de cada
+    etapa, de modo que una ejecución fallida se reanuda en la primera etapa que no terminó.
+    """
+
+    def __init__(self, manifest_path="output/.etl_cache.json", code_paths=(), enabled=True):
+        """
+        :param manifest_path: Ruta del archivo JSON donde se guardan las claves de las etapas terminadas
+        :param code_paths: Archivos de código compartidos por todas las etapas (por ejemplo transform/utils.py)
+        :param enabled: Si es False todas las etapas se ejecutan, aunque las claves se siguen registrando
+        """
+        self.manifest_path = manifest_path
+        self.enabled = enabled
+        self.shared_code = {path: hash_file(path) for path in code_paths}
+        self.keys = {}
+        self.log = []
+        self.manifest = self._load_manifest()
+
+    def _load_manifest(self):
+        if not os.path.exists(self.manifest_path):
+            return {}
+        with open(self.manifest_path, "r") as file:
+            return json.load(file)
+
+    def _save_manifest(self):
+        os.makedirs(os.path.dirname(self.manifest_path) or ".", exist_ok=True)
+        tmp_path = f"{self.manifest_path}.tmp"
+        with open(tmp_path, "w") as file:
+            json.dump(self.manifest, file, indent=2)
+        os.replace(tmp_path, self.manifest_path)
+
+    def stage_key(self, name, func, args, kwargs, inputs, depends_on):
+        """
+        Calcula la clave de una etapa.
+
+        :return: Hash hexadecimal que identifica la combinación de entradas, código y dependencias
+        """
+        payload = {
+            "stage": name,
+            "code": hash_file(inspect.getsourcefile(func)),
+            "shared_code": self.shared_code,
+            "args": repr(args),
+            "kwargs": repr(sorted(kwargs.items())),
+            "inputs": {path: hash_file(path) for path in inputs},
+            # Las etapas no cacheables (descarga, cargas) no tienen clave: lo que producen entra por inputs
+            "depends_on": {dep: self.keys.get(dep) for dep in depends_on},
+        }
+        return hashlib.sha256(json.dumps(payload, sort_keys=True).encode()).hexdigest()
+
+    def lookup(self, name, func, args=(), kwargs=None, inputs=(), outputs=(), depends_on=()):
+        """
+        Calcula la clave de una etapa y comprueba si puede tomarse de la caché.
+        Si no puede, borra su registro anterior para que una interrupción no deje una entrada obsoleta.
+
+        :param name: Nombre de la etapa
+        :param func: Función que implementa la etapa
+        :param args: Argumentos posicionales de la función
+        :param kwargs: Argumentos con nombre de la función
+        :param inputs: Archivos de entrada externos (no producidos por otra etapa) cuyo contenido forma parte de la clave
+        :param outputs: Archivos que la etapa debe dejar en disco
+        :param depends_on: Nombres de las etapas previas cuyas salidas usa esta etapa
+        :return: Tupla (clave, hit), donde hit indica si la etapa puede omitirse
+        """
+        key = self.stage_key(name, func, args, kwargs or {}, inputs, depends_on)
+        self.keys[name] = key
+
+        cached = self.manifest.get(name)
+        if self.enabled and cached and cached["key"] == key and all(os.path.exists(path) for path in outputs):
+            print(f"⏭️ Caché HIT: {name}")
+            self.log.append((name, "hit"))
+            return key, True
+
+        print(f"▶️ Caché MISS: {name}")
+        self.log.append((name, "miss"))
+
+        self.manifest.pop(name, None)
+        self._save_manifest()
+        return key, False
+
+    def record(self, name, key, outputs=()):
+        """
+        Registra una etapa terminada con éxito.
+
+        :param name: Nombre de la etapa
+        :param key: Clave devuelta por lookup
+        :param outputs: Archivos que produjo la etapa
+        """
+        self.manifest[name] = {"key": key, "outputs": list(outputs)}
+        self._save_manifest()
+
+    def mark_error(self, name):
+        """
+        Marca en el registro de la ejecución actual que una etapa falló.
+
+        :param name: Nombre de la etapa
+        """
+        self.log = [(stage, "error" if stage == name else status) for stage, status in self.log]
+
+    def summary(self):
+        """
+        Imprime el resumen de aciertos y fallos de la caché en la ejecución actual.
+        """
+        hits = sum(1 for _, status in self.log if status == "hit")
+        misses = sum(1 for _, status in self.log if status == "miss")
+        print(f"💾 Caché: {hits} etapas reutilizadas, {misses} ejecutadas")
+        for name, status in self.log:
+            print(f"   {name}: {status.upper()}")
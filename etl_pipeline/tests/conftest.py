@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Los módulos de la ETL se importan como en main.py, desde la carpeta etl_pipeline
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
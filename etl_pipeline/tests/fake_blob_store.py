@@ -0,0 +1,82 @@
+import hashlib
+import threading
+import time
+
+
+class FakeBlobStore:
+    """
+    Contenedor de Azure Blob Storage en memoria, con la parte de la API de BlobServiceClient que usa
+    extract/download_data.py. Entrega cada blob por bloques con una pausa entre ellos para simular
+    archivos grandes y lentos, y registra cuántas descargas hay en curso y cuántos bytes se sirvieron.
+    """
+
+    def __init__(self, blobs, chunk_size=64 * 1024, delay=0.0, fail_after=None):
+        """
+        :param blobs: Diccionario nombre -> contenido (bytes)
+        :param chunk_size: Bytes que se escriben en cada bloque
+        :param delay: Segundos de espera antes de cada bloque
+        :param fail_after: Si se indica, cada descarga falla después de escribir este número de bytes
+        """
+        self.blobs = dict(blobs)
+        self.chunk_size = chunk_size
+        self.delay = delay
+        self.fail_after = fail_after
+        self.bytes_served = 0
+        self.active = 0
+        self.max_active = 0
+        self._lock = threading.Lock()
+
+    def get_blob_client(self, container, blob):
+        return FakeBlobClient(self, blob)
+
+    def _enter(self):
+        with self._lock:
+            self.active += 1
+            self.max_active = max(self.max_active, self.active)
+
+    def _exit(self, served):
+        with self._lock:
+            self.active -= 1
+            self.bytes_served += served
+
+
+class FakeBlobProperties:
+    def __init__(self, data):
+        self.etag = hashlib.md5(data).hexdigest()
+        self.size = len(data)
+
+
+class FakeBlobClient:
+    def __init__(self, store, name):
+        self.store = store
+        self.name = name
+
+    def get_blob_properties(self):
+        return FakeBlobProperties(self.store.blobs[self.name])
+
+    def download_blob(self, offset=None, length=None, max_concurrency=1):
+        data = self.store.blobs[self.name]
+        start = offset or 0
+        end = len(data) if length is None else start + length
+        return FakeDownloader(self.store, data[start:end])
+
+
+class FakeDownloader:
+    def __init__(self, store, data):
+        self.store = store
+        self.data = data
+
+    def readinto(self, stream):
+        self.store._enter()
+        served = 0
+        try:
+            for start in range(0, len(self.data), self.store.chunk_size):
+                if self.store.fail_after is not None and served >= self.store.fail_after:
+                    raise ConnectionError("Conexión interrumpida durante la descarga")
+                time.sleep(self.store.delay)
+                chunk = self.data[start:start + self.store.chunk_size]
+                stream.write(chunk)
+                served += len(chunk)
+        finally:
+            self.store._exit(served)
+        return served
@@ -0,0 +1,52 @@
+import pandas as pd
+import pytest
+from extract.generate_data import generate_all_csv
+from transform.clean_customers import clean_customers_data
+from transform.clean_products import clean_products_data
+from transform.clean_suppliers import clean_suppliers_data
+from transform.clean_time import generate_time_dimension
+from transform.clean_sales import clean_sales_data
+from transform.clean_logistic import clean_logistics_data
+
+CHUNKSIZE = 700
+
+
+@pytest.fixture(scope="module")
+def sources(tmp_path_factory):
+    root = tmp_path_factory.mktemp("etl")
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        # La caché de normalización de textos se escribe en rutas relativas
+        monkeypatch.chdir(root)
+        generate_all_csv("data", sales_rows=5_000, seed=7, dirty_ratio=0.1)
+        clean_customers_data("data/clientes.csv", "clientes.parquet")
+        clean_products_data("data/productos.csv", "productos.parquet")
+        clean_suppliers_data("data/proveedores.csv", "proveedores.parquet")
+        generate_time_dimension("data/ventas.csv", "data/logistica.csv", "tiempo.parquet")
+        yield root
+
+
+def _clean_sales(output_path, chunksize):
+    clean_sales_data("data/ventas.csv", "productos.parquet", "clientes.parquet", "tiempo.parquet", output_path,
+                     chunksize)
+    return pd.read_parquet(output_path)
+
+
+def test_chunked_sales_match_single_pass(sources, monkeypatch):
+    monkeypatch.chdir(sources)
+
+    pd.testing.assert_frame_equal(_clean_sales("ventas_chunked.parquet", CHUNKSIZE),
+                                  _clean_sales("ventas.parquet", None))
+
+
+def test_chunked_logistics_match_single_pass(sources, monkeypatch):
+    monkeypatch.chdir(sources)
+    _clean_sales("ventas.parquet", None)
+
+    results = []
+    for output_path, chunksize in [("envios_chunked.parquet", CHUNKSIZE), ("envios.parquet", None)]:
+        clean_logistics_data("data/logistica.csv", "ventas.parquet", "proveedores.parquet", "tiempo.parquet",
+                             output_path, chunksize)
+        results.append(pd.read_parquet(output_path))
+
+    pd.testing.assert_frame_equal(*results)
+    assert len(results[0]) > 0
@@ -0,0 +1,17 @@
+import pandas as pd
+from transform.clean_sales import build_price_index, validate_product_id
+
+
+def test_build_price_index_keeps_first_product_on_ties():
+    price_index = build_price_index({7: 10.9, 3: 10.2, 5: 20.0, 1: 20.5, 9: None})
+
+    assert price_index.to_dict() == {10: 7, 20: 5}
+
+
+def test_validate_product_id_falls_back_to_first_product_with_same_price():
+    products = {7: 10.9, 3: 10.2, 5: 20.0}
+    sales = pd.DataFrame({"producto_id": [3, 99, "x", 98], "precio_unitario": [10.2, 10.5, 20.99, 31.0]})
+
+    result = validate_product_id(sales, products)
+
+    assert result["producto_id"].tolist() == [3, 7, 5]
@@ -0,0 +1,88 @@
+import os
+import time
+import pytest
+from extract import download_data
+from extract.download_data import download_csv, download_range, download_all_csv
+from fake_blob_store import FakeBlobStore
+
+FILES = ["clientes.csv", "productos.csv", "proveedores.csv", "ventas.csv", "logistica.csv"]
+
+
+def _csv_bytes(rows, seed=0):
+    lines = ["venta_id,producto_id,cantidad"] + [f"{i},{(i * 7 + seed) % 500},{i % 5 + 1}" for i in range(rows)]
+    return ("\n".join(lines) + "\n").encode()
+
+
+def test_download_csv_streams_large_blob(tmp_path):
+    data = _csv_bytes(300_000)  # ~5 MB, varios bloques
+    store = FakeBlobStore({"ventas.csv": data}, chunk_size=256 * 1024)
+    local_path = tmp_path / "data" / "ventas.csv"
+
+    download_csv("ventas.csv", str(local_path), store)
+
+    assert local_path.read_bytes() == data
+    assert not os.path.exists(f"{local_path}.part")
+    assert store.bytes_served == len(data)
+
+
+def test_download_csv_failure_keeps_previous_file(tmp_path):
+    local_path = tmp_path / "ventas.csv"
+    local_path.write_bytes(b"venta_id\n1\n")
+    store = FakeBlobStore({"ventas.csv": _csv_bytes(100_000)}, chunk_size=64 * 1024, fail_after=256 * 1024)
+
+    with pytest.raises(ConnectionError):
+        download_csv("ventas.csv", str(local_path), store)
+
+    # La descarga a medias queda en .part y nunca reemplaza al archivo anterior
+    assert local_path.read_bytes() == b"venta_id\n1\n"
+    assert os.path.getsize(f"{local_path}.part") == 256 * 1024
+
+
+def test_download_csv_failure_leaves_no_truncated_csv(tmp_path):
+    local_path = tmp_path / "ventas.csv"
+    store = FakeBlobStore({"ventas.csv": _csv_bytes(100_000)}, chunk_size=64 * 1024, fail_after=64 * 1024)
+
+    with pytest.raises(ConnectionError):
+        download_csv("ventas.csv", str(local_path), store)
+
+    assert not local_path.exists()
+
+
+def test_download_range_reads_only_requested_bytes(tmp_path):
+    data = _csv_bytes(200_000)
+    store = FakeBlobStore({"logistica.csv": data}, chunk_size=32 * 1024)
+    offset, length = 1_000_003, 150_001
+
+    with open(tmp_path / "tail", "wb") as file:
+        download_range("logistica.csv", file, offset, length, store)
+
+    assert (tmp_path / "tail").read_bytes() == data[offset:offset + length]
+    assert store.bytes_served == length
+
+
+def test_download_all_csv_downloads_files_concurrently(tmp_path, monkeypatch):
+    blobs = {name: _csv_bytes(20_000, seed) for seed, name in enumerate(FILES)}
+    # Cada archivo tarda ~0.2 s (10 bloques de 0.02 s): en serie serían ~1 s
+    store = FakeBlobStore(blobs, chunk_size=len(blobs["ventas.csv"]) // 10 + 1, delay=0.02)
+    monkeypatch.setattr(download_data, "get_blob_service_client", lambda: store)
+    monkeypatch.chdir(tmp_path)
+
+    start = time.perf_counter()
+    download_all_csv(max_workers=5)
+    elapsed = time.perf_counter() - start
+
+    for name, data in blobs.items():
+        assert (tmp_path / "data" / name).read_bytes() == data
+    assert store.max_active == len(FILES)
+    assert elapsed < 0.2 * len(FILES) * 0.6
+
+
+def test_download_all_csv_propagates_errors(tmp_path, monkeypatch):
+    store = FakeBlobStore({name: _csv_bytes(10_000) for name in FILES}, chunk_size=16 * 1024, fail_after=16 * 1024)
+    monkeypatch.setattr(download_data, "get_blob_service_client", lambda: store)
+    monkeypatch.chdir(tmp_path)
+
+    with pytest.raises(ConnectionError):
+        download_all_csv()
+
+    assert not any((tmp_path / "data" / name).exists() for name in FILES)
@@ -0,0 +1,58 @@
+import numpy as np
+import pandas as pd
+import pytest
+from transform.utils import IdAllocator, allocate_new_ids, KeyIndex, validate_foreign_keys
+
+
+def test_allocate_fills_gaps_between_existing_ids():
+    allocator = IdAllocator([1, 2, 4, 7, "abc", 5.5, None])
+
+    assert allocator.allocate(4).tolist() == [3, 5, 6, 8]
+    assert allocator.allocate(2).tolist() == [9, 10]
+
+
+def test_allocate_starts_at_start_id():
+    assert allocate_new_ids({5, 6, "x"}, 3, start_id=5).tolist() == [7, 8, 9]
+
+
+def test_allocate_in_chunks_matches_single_call():
+    existing = [3, 4, 10, 11, 12, 20, 35]
+    allocator = IdAllocator(existing)
+
+    chunks = [allocator.allocate(count) for count in (0, 7, 1, 12, 10)]
+
+    np.testing.assert_array_equal(np.concatenate(chunks), allocate_new_ids(existing, 30))
+
+
+@pytest.mark.parametrize("keys, kind", [
+    (range(1, 1_000), "bitmap"),
+    ([2, 900_000, 5_000_000], "sorted"),
+    ([], "sorted"),
+    ([-7, -1, 0, 3], "sorted"),
+])
+def test_key_index_contains(keys, kind):
+    index = KeyIndex(keys)
+    values = np.array([-7, -2, -1, 0, 1, 2, 3, 500, 999, 1_000, 900_000, 5_000_000, 5_000_001], dtype=np.int64)
+
+    assert index.kind == kind
+    np.testing.assert_array_equal(index.contains(values), np.isin(values, list(keys)))
+
+
+@pytest.mark.parametrize("kind", ["bitmap", "sorted"])
+def test_key_index_kinds_agree_on_negative_values(kind):
+    index = KeyIndex([0, 1, 2, 3], kind=kind)
+
+    assert index.contains(np.array([-4, -1, 0, 3, 4])).tolist() == [False, False, True, True, False]
+
+
+def test_validate_foreign_keys_drops_rows_and_counts_rejects_per_key():
+    df = pd.DataFrame({
+        "venta_id": [1, 2, "x", 4.0, 5.5, 6],
+        "proveedor_id": [10, 99, 10, 11, 10, None],
+    })
+
+    result, rejects = validate_foreign_keys(df, {"venta_id": KeyIndex([1, 2, 3, 4, 6]), "proveedor_id": {10, 11}})
+
+    assert result.to_dict("list") == {"venta_id": [1, 4], "proveedor_id": [10, 11]}
+    assert result["venta_id"].dtype == np.int64
+    assert rejects == {"venta_id": 2, "proveedor_id": 2}
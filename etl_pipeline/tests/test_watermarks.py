@@ -0,0 +1,111 @@
+import pandas as pd
+from extract.watermarks import (file_watermark, download_appended, waiting_for_sale, save_pending_logistics,
+                                TAIL_CHECK_BYTES, UNCHANGED, APPENDED, REWRITTEN)
+from fake_blob_store import FakeBlobStore
+
+HEADER = "envio_id,venta_id,proveedor_id,estado_envio,fecha_envio\n"
+
+
+def _rows(start, stop):
+    return "".join(f"{i},{i * 3},{i % 20},Entregado,2024-01-{i % 28 + 1:02d} 10:00:00\n" for i in range(start, stop))
+
+
+def _watermark(tmp_path, content):
+    path = tmp_path / "logistica.csv"
+    path.write_bytes(content.encode())
+    return file_watermark(str(path))
+
+
+def test_file_watermark_stops_at_last_complete_line(tmp_path):
+    content = HEADER + _rows(0, 10)
+    watermark = _watermark(tmp_path, content + "10,30,1,Entr")
+
+    assert watermark["offset"] == len(content)
+    assert watermark["header"] == HEADER
+    assert watermark["tail_start"] == max(0, len(content) - TAIL_CHECK_BYTES)
+
+
+def test_download_appended_reads_only_new_rows(tmp_path):
+    old = HEADER + _rows(0, 2_000)
+    watermark = _watermark(tmp_path, old)
+    new = old + _rows(2_000, 2_100)
+    store = FakeBlobStore({"logistica.csv": new.encode()})
+    output = tmp_path / "logistica_delta.csv"
+
+    status, new_watermark, rows = download_appended("logistica.csv", watermark, str(output), store)
+
+    assert (status, rows) == (APPENDED, 100)
+    assert output.read_text() == HEADER + _rows(2_000, 2_100)
+    # Solo se piden los bytes nuevos y los del hash de comprobación
+    assert store.bytes_served == len(new) - watermark["tail_start"]
+    assert new_watermark["offset"] == len(new)
+    assert new_watermark["tail_sha256"] == _watermark(tmp_path, new)["tail_sha256"]
+
+
+def test_download_appended_waits_for_incomplete_line(tmp_path):
+    old = HEADER + _rows(0, 100)
+    watermark = _watermark(tmp_path, old)
+    store = FakeBlobStore({"logistica.csv": (old + "100,300,1,Entr").encode()})
+    output = tmp_path / "logistica_delta.csv"
+
+    status, new_watermark, rows = download_appended("logistica.csv", watermark, str(output), store)
+
+    assert (status, rows) == (UNCHANGED, 0)
+    assert output.read_text() == HEADER
+    assert new_watermark["offset"] == watermark["offset"]
+
+
+def test_download_appended_unchanged_blob(tmp_path):
+    content = HEADER + _rows(0, 100)
+    store = FakeBlobStore({"logistica.csv": content.encode()})
+    watermark = _watermark(tmp_path, content)
+
+    status, _, rows = download_appended("logistica.csv", watermark, str(tmp_path / "delta.csv"), store)
+
+    assert (status, rows) == (UNCHANGED, 0)
+    assert store.bytes_served == 0
+
+
+def test_download_appended_detects_shrink(tmp_path):
+    content = HEADER + _rows(0, 100)
+    watermark = _watermark(tmp_path, content)
+    store = FakeBlobStore({"logistica.csv": (HEADER + _rows(0, 50)).encode()})
+
+    status, new_watermark, _ = download_appended("logistica.csv", watermark, str(tmp_path / "delta.csv"), store)
+
+    assert (status, new_watermark) == (REWRITTEN, None)
+
+
+def test_download_appended_detects_rewrite_through_tail_hash(tmp_path):
+    content = HEADER + _rows(0, 100)
+    watermark = _watermark(tmp_path, content)
+    # Mismo largo en los bytes ya procesados, pero una fila cambió, y además se agregaron filas
+    rewritten = content.replace("99,297,19,Entregado", "99,297,19,Cancelado") + _rows(100, 110)
+    assert len(rewritten) == len(content) + len(_rows(100, 110))
+    store = FakeBlobStore({"logistica.csv": rewritten.encode()})
+    output = tmp_path / "delta.csv"
+
+    status, new_watermark, rows = download_appended("logistica.csv", watermark, str(output), store)
+
+    assert (status, new_watermark, rows) == (REWRITTEN, None, 0)
+    assert not (tmp_path / "delta.csv.part").exists()
+
+
+def test_waiting_for_sale_keeps_only_sales_not_arrived_yet():
+    # 2 es una venta publicada, 4 no existe (se descartó en la limpieza) y 7 y 9 todavía no llegan
+    df = pd.DataFrame({"venta_id": pd.array([2, 4, None, 7, 9], dtype="Int64")})
+
+    waiting = waiting_for_sale(df, last_sale_id=5)
+
+    assert waiting.tolist() == [False, False, False, True, True]
+
+
+def test_save_pending_logistics_removes_file_when_empty(tmp_path):
+    path = tmp_path / "output" / "pendientes.csv"
+    df = pd.DataFrame({"envio_id": [1], "venta_id": [99]})
+
+    save_pending_logistics(df, str(path))
+    assert pd.read_csv(path).equals(df)
+
+    save_pending_logistics(df.iloc[:0], str(path))
+    assert not path.exists()
@@ -1,6 +1,9 @@
 import pandas as pd
-from .utils import load_data, save_data
+from .utils import load_data, save_data, integer_id_mask, allocate_new_ids, normalize_unique, capitalize_words
+from .schemas import TABLE_SCHEMAS, SOURCE_SCHEMAS, apply_schema
+from run_report import track_rows, count
 
+@track_rows
 def clean_nulls(df):
     """
     Elimina las filas que solo contienen valores nulos en todas las columnas.
@@ -12,20 +15,6 @@ def clean_nulls(df):
     return df
 
 
-def get_new_customer_id(existing_ids, start_id):
-    """
-    Genera un nuevo ID de cliente que no esté presente en el conjunto de IDs existentes.
-
-    :param existing_ids: Conjunto de IDs de cliente ya existentes
-    :param start_id: El valor inicial para el nuevo ID de cliente
-    :return: Un nuevo ID de cliente único
-    """
-    new_id = start_id
-    while new_id in existing_ids:
-        new_id += 1
-    return new_id
-
-
 def clean_customer_ids(df, existing_ids):
     """
     Limpia los valores de la columna 'cliente_id' en el DataFrame, asegurando que sean enteros únicos.
@@ -34,20 +23,12 @@ def clean_customer_ids(df, existing_ids):
     :param existing_ids: Conjunto de IDs de cliente ya existentes, para evitar duplicados
     :return: Tupla con el DataFrame limpio y el conjunto de IDs actualizado
     """
-    new_ids = []
-
-    for index, row in df.iterrows():
-        customer_id = row['cliente_id']
-
-        if not isinstance(customer_id, (int, float)) or customer_id != int(customer_id):
-            new_id = get_new_customer_id(existing_ids, 1)
-            existing_ids.add(new_id)
-            new_ids.append(new_id)
-        else:
-            new_ids.append(int(customer_id))
-            existing_ids.add(int(customer_id))
+    valid, ids = integer_id_mask(df['cliente_id'])
+    ids = ids.where(valid)
+    ids.loc[~valid] = allocate_new_ids(existing_ids, int((~valid).sum()))
 
-    df['cliente_id'] = new_ids
+    df['cliente_id'] = ids.astype(int)
+    existing_ids.update(df['cliente_id'].tolist())
     return df, existing_ids
 
 
@@ -67,6 +48,17 @@ def clean_ages(df):
     return df
 
 
+def gender_label(value):
+    """
+    Traduce un código de género ('M', 'F', sin distinguir mayúsculas) a su etiqueta.
+
+    :param value: Valor original de la columna 'genero'
+    :return: 'Masculino', 'Femenino' u 'Otro'
+    """
+    code = value.upper() if isinstance(value, str) else None
+    return 'Masculino' if code == 'M' else ('Femenino' if code == 'F' else 'Otro')
+
+
 def clean_genders(df):
     """
     Limpia y normaliza los valores de la columna 'genero', convirtiéndolos a mayúsculas
@@ -75,8 +67,7 @@ def clean_genders(df):
     :param df: DataFrame que contiene los datos de género
     :return: DataFrame con la columna 'genero' normalizada
     """
-    df['genero'] = df['genero'].str.upper()
-    df['genero'] = df['genero'].apply(lambda x: 'Masculino' if x == 'M' else ('Femenino' if x == 'F' else 'Otro'))
+    df['genero'] = normalize_unique(df['genero'], gender_label, 'genero')
     return df
 
 
@@ -87,7 +78,7 @@ def clean_locations(df):
     :param df: DataFrame que contiene los datos de ubicación
     :return: DataFrame con la columna 'ubicacion' capitalizada correctamente
     """
-    df['ubicacion'] = df['ubicacion'].apply(lambda x: ' '.join([word.capitalize() for word in str(x).split()]))
+    df['ubicacion'] = normalize_unique(df['ubicacion'], capitalize_words, 'ubicacion')
     return df
 
 
@@ -103,6 +94,7 @@ def clean_names(df):
     return df
 
 
+@track_rows
 def clean_duplicates(df):
     """
     Elimina las filas duplicadas basadas en la columna 'cliente_id'.
@@ -113,16 +105,14 @@ def clean_duplicates(df):
     return df.drop_duplicates(subset=['cliente_id'])
 
 
-def clean_customers_data(input_path, output_path):
+def clean_customers(df):
     """
-    Procesa el archivo de datos de clientes, limpiando los valores nulos, ajustando IDs, edades, géneros, ubicaciones,
-    nombres y eliminando duplicados, luego guarda el DataFrame limpio en un archivo de salida.
+    Aplica la cadena de limpieza de clientes a un DataFrame en memoria.
 
-    :param input_path: Ruta del archivo de entrada (CSV) con los datos de clientes
-    :param output_path: Ruta del archivo de salida (CSV) donde se guardarán los datos limpios
+    :param df: DataFrame con los datos de clientes sin limpiar
+    :return: DataFrame de clientes limpio, con los tipos de TABLE_SCHEMAS['clientes']
     """
-    df = load_data(input_path)
-
+    count('rows_in', len(df))
     existing_ids = set(df['cliente_id'])
 
     df = clean_nulls(df)
@@ -133,7 +123,19 @@ def clean_customers_data(input_path, output_path):
     df = clean_names(df)
     df = clean_duplicates(df)
 
-    save_data(df, output_path)
+    count('rows_out', len(df))
+    return apply_schema(df, TABLE_SCHEMAS['clientes'])
+
+
+def clean_customers_data(input_path, output_path):
+    """
+    Procesa el archivo de datos de clientes, limpiando los valores nulos, ajustando IDs, edades, géneros, ubicaciones,
+    nombres y eliminando duplicados, luego guarda el DataFrame limpio en un archivo de salida.
+
+    :param input_path: Ruta del archivo de entrada (CSV) con los datos de clientes
+    :param output_path: Ruta del archivo de salida (CSV) donde se guardarán los datos limpios
+    """
+    save_data(clean_customers(load_data(input_path, schema=SOURCE_SCHEMAS['clientes'])), output_path, TABLE_SCHEMAS['clientes'])
 
 if __name__ == "__main__":
     clean_customers_data("data/clientes.csv", "output/clientes_limpios.csv")
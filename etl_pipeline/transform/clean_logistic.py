@@ -1,7 +1,11 @@
 import pandas as pd
-from .utils import load_data, save_data, replace_dates_with_time_id
+from .utils import (load_data, save_data, replace_dates_with_time_id, build_time_lookup, IdAllocator,
+                    collect_column_ids, DataWriter, KeyIndex, validate_foreign_keys, memory_chunksize)
+from .schemas import TABLE_SCHEMAS, SOURCE_SCHEMAS, apply_schema
+from run_report import track_rows, count
 
 
+@track_rows
 def clean_nulls(df):
     """
     Elimina las filas que están completamente vacías (sin ningún valor).
@@ -12,6 +16,7 @@ def clean_nulls(df):
     return df.dropna(how='all')
 
 
+@track_rows
 def clean_dates(df):
     """
     Convierte la columna 'fecha_envio' a formato datetime y elimina las filas con fechas inválidas.
@@ -19,10 +24,11 @@ def clean_dates(df):
     :param df: DataFrame que contiene los datos a limpiar
     :return: DataFrame con fechas válidas y filas con fechas inválidas eliminadas
     """
-    df['fecha_envio'] = pd.to_datetime(df['fecha_envio'], errors='coerce')
+    df['fecha_envio'] = pd.to_datetime(df['fecha_envio'], errors='coerce', format='%Y-%m-%d %H:%M:%S')
     return df.dropna(subset=['fecha_envio'])
 
 
+@track_rows
 def clean_state(df):
     """
     Filtra las filas para mantener solo aquellos estados de envío válidos.
@@ -34,107 +40,116 @@ def clean_state(df):
     return df[df['estado_envio'].isin(valid_status)]
 
 
-def convert_to_int(value):
+def validate_logistic_ids(df, allocator=None):
     """
-    Convierte un valor a entero si es posible. Si el valor no puede convertirse, devuelve None.
+    Valida y corrige los IDs de logística, generando un nuevo ID cuando sea necesario.
 
-    :param value: Valor que se va a convertir a entero
-    :return: Entero si es posible, de lo contrario None
+    :param df: DataFrame que contiene los datos de logística
+    :param allocator: IdAllocator compartido entre bloques; si no se indica, se crea a partir de los IDs de df
+    :return: DataFrame con los IDs de logística validados
     """
-    try:
-        value = float(value)
-        if value.is_integer():
-            return int(value)
-        else:
-            return None
-    except (ValueError, TypeError):
-        return None
+    if allocator is None:
+        allocator = IdAllocator(df['envio_id'].dropna().astype(int))
 
+    ids = pd.to_numeric(df['envio_id'], errors='coerce')
+    valid = ids.notna() & (ids % 1 == 0) & (ids != 0)
+    ids = ids.where(valid).astype('float64')
+    ids.loc[~valid] = allocator.allocate(int((~valid).sum()))
 
-def get_new_logistic_id(existing_ids, start_id=1):
-    """
-    Genera un nuevo ID único para la logística que no esté presente en los IDs existentes.
-
-    :param existing_ids: Conjunto de IDs existentes
-    :param start_id: ID de inicio para la generación
-    :return: Un nuevo ID único
-    """
-    while start_id in existing_ids:
-        start_id += 1
-    existing_ids.add(start_id)
-    return start_id
+    df['envio_id'] = ids.astype(int)
+    return df
 
 
-def validate_logistic_ids(df):
+@track_rows
+def validate_references(df, existing_sales_ids, existing_supplier_ids):
     """
-    Valida y corrige los IDs de logística, generando un nuevo ID cuando sea necesario.
+    Valida en una sola pasada los IDs de ventas y de proveedores, eliminando las filas que no existen
+    en las tablas correspondientes y reseteando el índice.
 
     :param df: DataFrame que contiene los datos de logística
-    :return: DataFrame con los IDs de logística validados
+    :param existing_sales_ids: IDs de ventas válidos (conjunto o KeyIndex)
+    :param existing_supplier_ids: IDs de proveedores válidos (conjunto o KeyIndex)
+    :return: DataFrame con los IDs de ventas y proveedores validados
     """
-    existing_ids = set(df['envio_id'].dropna().astype(int))
-    df['envio_id'] = df['envio_id'].apply(lambda x: convert_to_int(x) or get_new_logistic_id(existing_ids))
+    df, rejects = validate_foreign_keys(df, {'venta_id': existing_sales_ids, 'proveedor_id': existing_supplier_ids})
+    if any(rejects.values()):
+        print(f"⚠️ Envíos descartados por llave inexistente: {rejects}")
     return df
 
 
-def validate_sales_id(df, existing_sales_ids):
+def clean_logistics_frame(df, valid_sales_ids, valid_suppliers_ids, time_lookup, allocator=None):
     """
-    Valida los IDs de ventas, eliminando los inválidos y reseteando el índice.
+    Aplica la cadena de limpieza de logística a un DataFrame (el archivo completo o un bloque del mismo).
 
-    :param df: DataFrame que contiene los datos de ventas
-    :param existing_sales_ids: Conjunto de IDs de ventas válidos
-    :return: DataFrame con los IDs de ventas validados y con el índice reseteado
+    :param df: DataFrame con los datos logísticos sin limpiar
+    :param valid_sales_ids: IDs de ventas válidos (conjunto o KeyIndex)
+    :param valid_suppliers_ids: IDs de proveedores válidos (conjunto o KeyIndex)
+    :param time_lookup: Índice fecha -> tiempo_id construido con load_time_lookup
+    :param allocator: IdAllocator compartido para generar IDs de envío nuevos (opcional)
+    :return: DataFrame de logística limpio
     """
-    df['venta_id'] = df['venta_id'].fillna(0).astype(int)
-    df = df[df['venta_id'].isin(existing_sales_ids)].copy()
-    df['venta_id'] = df['venta_id'].astype(str)
-    df.reset_index(drop=True, inplace=True)
+    count('rows_in', len(df))
+    df = validate_logistic_ids(df, allocator)
+    df = validate_references(df, valid_sales_ids, valid_suppliers_ids)
+
+    df = clean_nulls(df)
+    df = clean_dates(df)
+    df = clean_state(df)
+
+    df = replace_dates_with_time_id(df, None, 'fecha_envio', time_lookup, day_column='fecha')
+    count('rows_out', len(df))
     return df
 
 
-def validate_suppliers_ids(df, existing_supplier_ids):
+def clean_logistics(df, sales, suppliers, time_df):
     """
-    Valida los IDs de proveedores, eliminando los inválidos y reseteando el índice.
+    Limpia en memoria los datos logísticos a partir de las tablas de ventas, proveedores y tiempo ya limpias.
 
-    :param df: DataFrame que contiene los datos de proveedores
-    :param existing_supplier_ids: Conjunto de IDs de proveedores válidos
-    :return: DataFrame con los IDs de proveedores validados y con el índice reseteado
+    :param df: DataFrame con los datos logísticos sin limpiar
+    :param sales: DataFrame de ventas limpio (basta con la columna 'venta_id')
+    :param suppliers: DataFrame de proveedores limpio
+    :param time_df: DataFrame de la dimensión de tiempo
+    :return: DataFrame de logística limpio, con los tipos de TABLE_SCHEMAS['envios']
     """
-    df['proveedor_id'] = df['proveedor_id'].fillna(0).astype(int)
-    df = df[df['proveedor_id'].isin(existing_supplier_ids)].copy()
-    df['proveedor_id'] = df['proveedor_id'].astype(str)
-    df.reset_index(drop=True, inplace=True)
-    return df
+    valid_sales_ids = KeyIndex(sales['venta_id'])
+    valid_suppliers_ids = KeyIndex(suppliers['proveedor_id'])
+
+    df = clean_logistics_frame(df, valid_sales_ids, valid_suppliers_ids, build_time_lookup(time_df))
+    return apply_schema(df, TABLE_SCHEMAS['envios'])
 
 
-def clean_logistics_data(input_path, sales_path, providers_path, time_path, output_path):
+def clean_logistics_data(input_path, sales_path, providers_path, time_path, output_path, chunksize=None):
     """
     Carga los datos logísticos, realiza el proceso de limpieza y guarda los datos limpios en un archivo de salida.
+    Con chunksize, la logística se lee y se escribe por bloques: las ventas, proveedores y la dimensión de
+    tiempo se cargan una sola vez y los IDs de envío nuevos se asignan igual que en el modo completo.
+    De las tablas de apoyo solo se leen las columnas necesarias y se liberan al construir sus índices.
 
     :param input_path: Ruta del archivo CSV con los datos logísticos
     :param sales_path: Ruta del archivo CSV con los datos de ventas
     :param providers_path: Ruta del archivo CSV con los datos de proveedores
     :param time_path: Ruta del archivo CSV con los datos de tiempo
     :param output_path: Ruta del archivo CSV donde se guardarán los datos limpios
-    """
-    df = load_data(input_path)
-    sales_df = load_data(sales_path)
-    suppliers_df = load_data(providers_path)
-
-    valid_sales_ids = set(sales_df['venta_id'].dropna().astype(int))
-    valid_suppliers_ids = set(suppliers_df['proveedor_id'].dropna().astype(int))
-
-    df = validate_logistic_ids(df)
-    df = validate_sales_id(df, valid_sales_ids)
-    df = validate_suppliers_ids(df, valid_suppliers_ids)
-
-    df = clean_nulls(df)
-    df = clean_dates(df)
-    df = clean_state(df)
-
-    df = replace_dates_with_time_id(df, time_path, 'fecha_envio')
-
-    save_data(df, output_path)
+    :param chunksize: Número de filas por bloque; si es None se procesa el archivo completo en memoria (salvo
+                      que con ETL_LOW_MEMORY no quepa en el presupuesto, ver memory_chunksize)
+    """
+    valid_sales_ids = KeyIndex(load_data(sales_path, usecols=['venta_id'])['venta_id'])
+    valid_suppliers_ids = KeyIndex(load_data(providers_path, usecols=['proveedor_id'])['proveedor_id'])
+    time_lookup = build_time_lookup(load_data(time_path, usecols=['tiempo_id', 'fecha', 'hora']))
+
+    chunksize = memory_chunksize(input_path, chunksize, SOURCE_SCHEMAS['logistica'])
+    if chunksize is None:
+        df = clean_logistics_frame(load_data(input_path, schema=SOURCE_SCHEMAS['logistica']), valid_sales_ids,
+                                   valid_suppliers_ids, time_lookup)
+        save_data(df, output_path, TABLE_SCHEMAS['envios'])
+        return
+
+    allocator = IdAllocator(collect_column_ids(input_path, 'envio_id', chunksize, valid_only=False,
+                                                schema=SOURCE_SCHEMAS['logistica']))
+
+    with DataWriter(output_path, TABLE_SCHEMAS['envios']) as writer:
+        for chunk in load_data(input_path, chunksize=chunksize, schema=SOURCE_SCHEMAS['logistica']):
+            writer.write(clean_logistics_frame(chunk, valid_sales_ids, valid_suppliers_ids, time_lookup, allocator))
 
 
 if __name__ == "__main__":
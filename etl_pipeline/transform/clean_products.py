@@ -1,6 +1,9 @@
 import pandas as pd
-from .utils import load_data, save_data
+from .utils import load_data, save_data, integer_id_mask, allocate_new_ids, normalize_unique, capitalize_words
+from .schemas import TABLE_SCHEMAS, SOURCE_SCHEMAS, apply_schema
+from run_report import track_rows, count
 
+@track_rows
 def clean_nulls(df):
     """
     Elimina las filas que solo contienen valores nulos en todas las columnas.
@@ -12,20 +15,6 @@ def clean_nulls(df):
     return df
 
 
-def get_new_product_id(existing_ids, start_id):
-    """
-    Genera un nuevo ID de producto que no esté presente en el conjunto de IDs existentes.
-
-    :param existing_ids: Conjunto de IDs de producto ya existentes
-    :param start_id: El valor inicial para el nuevo ID de producto
-    :return: Un nuevo ID de producto único
-    """
-    new_id = start_id
-    while new_id in existing_ids:
-        new_id += 1
-    return new_id
-
-
 def clean_products_ids(df, existing_ids):
     """
     Limpia los valores de la columna 'producto_id' en el DataFrame, asegurando que sean enteros únicos.
@@ -34,20 +23,12 @@ def clean_products_ids(df, existing_ids):
     :param existing_ids: Conjunto de IDs de producto ya existentes, para evitar duplicados
     :return: Tupla con el DataFrame limpio y el conjunto de IDs actualizado
     """
-    new_ids = []
-
-    for index, row in df.iterrows():
-        product_id = row['producto_id']
+    valid, ids = integer_id_mask(df['producto_id'])
+    ids = ids.where(valid)
+    ids.loc[~valid] = allocate_new_ids(existing_ids, int((~valid).sum()))
 
-        if not isinstance(product_id, (int, float)) or product_id != int(product_id):
-            new_id = get_new_product_id(existing_ids, 1)
-            existing_ids.add(int(new_id))
-            new_ids.append(int(new_id))
-        else:
-            new_ids.append(int(product_id))
-            existing_ids.add(int(product_id))
-
-    df['producto_id'] = new_ids
+    df['producto_id'] = ids.astype(int)
+    existing_ids.update(df['producto_id'].tolist())
     return df, existing_ids
 
 
@@ -70,7 +51,7 @@ def clean_categories(df):
     :param df: DataFrame que contiene los datos de categoría
     :return: DataFrame con la columna 'categoria' capitalizada correctamente
     """
-    df['categoria'] = df['categoria'].apply(lambda x: ' '.join([word.capitalize() for word in str(x).split()]))
+    df['categoria'] = normalize_unique(df['categoria'], capitalize_words, 'categoria')
     return df
 
 
@@ -82,12 +63,12 @@ def clean_prices(df):
     :param df: DataFrame que contiene los datos de precios
     :return: DataFrame con la columna 'precio_base' limpia y redondeada
     """
-    df['precio_base'] = pd.to_numeric(df['precio_base'], errors='coerce')
-    df['precio_base'].fillna(0, inplace=True)
+    df['precio_base'] = pd.to_numeric(df['precio_base'], errors='coerce').fillna(0)
     df['precio_base'] = df['precio_base'].apply(lambda x: round(x, 2) if isinstance(x, (int, float)) else 0)
     return df
 
 
+@track_rows
 def clean_duplicates(df):
     """
     Elimina las filas duplicadas basadas en la columna 'producto_id'.
@@ -98,16 +79,14 @@ def clean_duplicates(df):
     return df.drop_duplicates(subset=['producto_id'])
 
 
-def clean_products_data(ruta_entrada, ruta_salida):
+def clean_products(df):
     """
-    Procesa el archivo de datos de productos, limpiando los valores nulos, ajustando IDs, nombres, categorías,
-    precios y eliminando duplicados, luego guarda el DataFrame limpio en un archivo de salida.
+    Aplica la cadena de limpieza de productos a un DataFrame en memoria.
 
-    :param ruta_entrada: Ruta del archivo de entrada (CSV) con los datos de productos
-    :param ruta_salida: Ruta del archivo de salida (CSV) donde se guardarán los datos limpios
+    :param df: DataFrame con los datos de productos sin limpiar
+    :return: DataFrame de productos limpio, con los tipos de TABLE_SCHEMAS['productos']
     """
-    df = load_data(ruta_entrada)
-
+    count('rows_in', len(df))
     existing_ids = set(df['producto_id'])
 
     df = clean_nulls(df)
@@ -117,7 +96,19 @@ def clean_products_data(ruta_entrada, ruta_salida):
     df = clean_prices(df)
     df = clean_duplicates(df)
 
-    save_data(df, ruta_salida)
+    count('rows_out', len(df))
+    return apply_schema(df, TABLE_SCHEMAS['productos'])
+
+
+def clean_products_data(ruta_entrada, ruta_salida):
+    """
+    Procesa el archivo de datos de productos, limpiando los valores nulos, ajustando IDs, nombres, categorías,
+    precios y eliminando duplicados, luego guarda el DataFrame limpio en un archivo de salida.
+
+    :param ruta_entrada: Ruta del archivo de entrada (CSV) con los datos de productos
+    :param ruta_salida: Ruta del archivo de salida (CSV) donde se guardarán los datos limpios
+    """
+    save_data(clean_products(load_data(ruta_entrada, schema=SOURCE_SCHEMAS['productos'])), ruta_salida, TABLE_SCHEMAS['productos'])
 
 
 if __name__ == "__main__":
@@ -1,6 +1,11 @@
+import numpy as np
 import pandas as pd
-from .utils import load_data, save_data, replace_dates_with_time_id
+from .utils import (load_data, save_data, replace_dates_with_time_id, build_time_lookup, integer_id_mask,
+                    IdAllocator, collect_column_ids, DataWriter, KeyIndex, validate_foreign_keys, memory_chunksize)
+from .schemas import TABLE_SCHEMAS, SOURCE_SCHEMAS, apply_schema
+from run_report import track_rows, count
 
+@track_rows
 def clean_nulls(df):
     """
     Elimina las filas que solo contienen valores nulos en todas las columnas.
@@ -12,41 +17,56 @@ def clean_nulls(df):
     return df
 
 
+@track_rows
 def clean_dates(df):
     """
     Convierte la columna 'fecha' al formato de fecha y hora y elimina los valores nulos.
+    La fecha queda como datetime, que es lo que usa replace_dates_with_time_id.
 
     :param df: DataFrame que contiene los datos de ventas
     :return: DataFrame con la columna 'fecha' limpia y convertida al formato adecuado
     """
     df['fecha'] = pd.to_datetime(df['fecha'], errors='coerce', format='%Y-%m-%d %H:%M:%S')
     df.dropna(subset=['fecha'], inplace=True)
-    df['fecha'] = df['fecha'].dt.strftime('%Y-%m-%d %H:%M:%S')
     return df
 
 
-def validate_product_id(df, products_dict):
+def build_price_index(products_dict):
+    """
+    Construye un índice precio entero -> primer producto con ese precio.
+    Conserva el orden del diccionario, de modo que ante precios repetidos gana el primer producto.
+
+    :param products_dict: Diccionario con los IDs de productos como claves y los precios como valores
+    :return: Serie indexada por el precio entero con el ID de producto correspondiente
+    """
+    prices = pd.Series(products_dict, dtype='float64').dropna()
+    price_index = pd.Series(prices.index, index=prices.astype(int).values)
+    return price_index[~price_index.index.duplicated(keep='first')]
+
+
+@track_rows
+def validate_product_id(df, products_dict, price_index=None):
     """
     Valida los IDs de productos en el DataFrame comparándolos con un diccionario de productos.
     Si el ID no es válido, se intenta encontrar un producto con el mismo precio unitario.
 
     :param df: DataFrame que contiene los datos de ventas
     :param products_dict: Diccionario con los IDs de productos como claves y los precios como valores
+    :param price_index: Índice precio -> producto precalculado con build_price_index (opcional)
     :return: DataFrame con la columna 'producto_id' validada
     """
-    def correct_product(row):
-        product_id = row['producto_id']
-        unit_price = row['precio_unitario']
+    if price_index is None:
+        price_index = build_price_index(products_dict)
 
-        if product_id in products_dict:
-            return int(product_id)
+    valid = df['producto_id'].isin(list(products_dict.keys()))
 
-        unit_price_int = int(unit_price)
-        possible = [p_id for p_id, p_price in products_dict.items() if int(p_price) == unit_price_int]
+    unit_price_int = np.trunc(pd.to_numeric(df.loc[~valid, 'precio_unitario'], errors='coerce'))
+    corrected = unit_price_int.map(price_index)
 
-        return possible[0] if possible else None
+    product_ids = pd.to_numeric(df['producto_id'].where(valid), errors='coerce').astype('float64')
+    product_ids.loc[~valid] = corrected
 
-    df['producto_id'] = df.apply(correct_product, axis=1)
+    df['producto_id'] = product_ids
     df.dropna(subset=['producto_id'], inplace=True)
 
     df['producto_id'] = df['producto_id'].astype(int)
@@ -54,28 +74,18 @@ def validate_product_id(df, products_dict):
     return df
 
 
+@track_rows
 def validate_customers_ids(df, existing_customers_ids):
     """
     Valida los IDs de los clientes asegurando que existan en el conjunto de clientes válidos.
 
     :param df: DataFrame que contiene los datos de ventas
-    :param existing_customers_ids: Conjunto de IDs de clientes válidos
+    :param existing_customers_ids: IDs de clientes válidos (conjunto o KeyIndex)
     :return: DataFrame con los IDs de clientes validados
     """
-    valid_customer_ids = []
-
-    for index, row in df.iterrows():
-        customer_id = row['cliente_id']
-
-        customer_id = int(customer_id) if isinstance(customer_id, (int, float)) and customer_id == int(
-            customer_id) else None
-
-        if customer_id is not None and customer_id in existing_customers_ids:
-            valid_customer_ids.append(int(customer_id))
-
-    df = df[df['cliente_id'].isin(valid_customer_ids)].copy()
-
-    df['cliente_id'] = df['cliente_id'].astype(int)
+    df, rejects = validate_foreign_keys(df, {'cliente_id': existing_customers_ids})
+    if rejects['cliente_id']:
+        print(f"⚠️ Ventas descartadas por cliente inexistente: {rejects['cliente_id']}")
     return df
 
 
@@ -90,6 +100,7 @@ def convert_branch_id(df):
     return df
 
 
+@track_rows
 def clean_totals(df):
     """
     Limpia y calcula los totales en la venta. Asegura que 'cantidad' y 'precio_unitario' sean números y calcula 'total'.
@@ -110,71 +121,112 @@ def clean_totals(df):
     return df
 
 
-def get_new_sale_id(existing_ids, start_id=1):
+def validate_sales_ids(df, allocator=None):
     """
-    Genera un nuevo ID de venta que no esté presente en el conjunto de IDs existentes.
+    Valida los IDs de venta en el DataFrame. Si el ID no es válido, genera un nuevo ID único.
 
-    :param existing_ids: Conjunto de IDs de ventas ya existentes
-    :param start_id: El valor inicial para el nuevo ID de venta
-    :return: Un nuevo ID de venta único
+    :param df: DataFrame que contiene los datos de ventas
+    :param allocator: IdAllocator compartido entre bloques; si no se indica, se crea a partir de los IDs de df
+    :return: DataFrame con los IDs de venta validados o generados
     """
-    new_id = start_id
-    while new_id in existing_ids:
-        new_id += 1
-    return new_id
+    valid, ids = integer_id_mask(df['venta_id'])
+    ids = ids.where(valid)
+
+    if allocator is None:
+        allocator = IdAllocator(ids)
+    ids.loc[~valid] = allocator.allocate(int((~valid).sum()))
+
+    df['venta_id'] = ids.astype(int)
+    return df
 
 
-def validate_sales_ids(df):
+def clean_sales_frame(sales, products_dict, valid_customers, time_lookup, price_index=None, allocator=None):
     """
-    Valida los IDs de venta en el DataFrame. Si el ID no es válido, genera un nuevo ID único.
+    Aplica la cadena de limpieza de ventas a un DataFrame (el archivo completo o un bloque del mismo).
 
-    :param df: DataFrame que contiene los datos de ventas
-    :return: DataFrame con los IDs de venta validados o generados
+    :param sales: DataFrame con los datos de ventas sin limpiar
+    :param products_dict: Diccionario con los IDs de productos como claves y los precios como valores
+    :param valid_customers: IDs de clientes válidos (conjunto o KeyIndex)
+    :param time_lookup: Índice fecha -> tiempo_id construido con load_time_lookup
+    :param price_index: Índice precio -> producto precalculado con build_price_index (opcional)
+    :param allocator: IdAllocator compartido para generar IDs de venta nuevos (opcional)
+    :return: DataFrame de ventas limpio
     """
-    existing_ids = set(df['venta_id'])
-    new_ids = []
+    count('rows_in', len(sales))
+    sales = clean_nulls(sales)
+    sales = validate_sales_ids(sales, allocator)
+    sales = clean_dates(sales)
+    sales = validate_product_id(sales, products_dict, price_index)
+    sales = validate_customers_ids(sales, valid_customers)
+    sales = convert_branch_id(sales)
+    sales = clean_totals(sales)
+    sales = replace_dates_with_time_id(sales, None, 'fecha', time_lookup, day_column='fecha')
+    count('rows_out', len(sales))
+    return sales
 
-    for index, row in df.iterrows():
-        sale_id = row['venta_id']
 
-        if not isinstance(sale_id, (int, float)) or sale_id != int(sale_id):
-            new_id = get_new_sale_id(existing_ids)
-            existing_ids.add(new_id)
-            new_ids.append(new_id)
-        else:
-            new_ids.append(int(sale_id))
+def build_sales_lookups(products, customers, time_df):
+    """
+    Prepara, a partir de las tablas ya limpias, las estructuras de búsqueda que usa la limpieza de ventas.
 
-    df['venta_id'] = new_ids
-    return df
+    :param products: DataFrame de productos limpio
+    :param customers: DataFrame de clientes limpio
+    :param time_df: DataFrame de la dimensión de tiempo
+    :return: Tupla (products_dict, valid_customers, time_lookup, price_index)
+    """
+    products_dict = products.set_index('producto_id')['precio_base'].to_dict()
+    price_index = build_price_index(products_dict)
+    valid_customers = KeyIndex(customers['cliente_id'])
+    time_lookup = build_time_lookup(time_df)
+    return products_dict, valid_customers, time_lookup, price_index
+
+
+def clean_sales(sales, products, customers, time_df):
+    """
+    Limpia en memoria las ventas a partir de las tablas de productos, clientes y tiempo ya limpias.
+
+    :param sales: DataFrame con los datos de ventas sin limpiar
+    :param products: DataFrame de productos limpio
+    :param customers: DataFrame de clientes limpio
+    :param time_df: DataFrame de la dimensión de tiempo
+    :return: DataFrame de ventas limpio, con los tipos de TABLE_SCHEMAS['ventas']
+    """
+    sales = clean_sales_frame(sales, *build_sales_lookups(products, customers, time_df))
+    return apply_schema(sales, TABLE_SCHEMAS['ventas'])
 
 
-def clean_sales_data(sales_path, products_path, customers_path, time_path, output_path):
+def clean_sales_data(sales_path, products_path, customers_path, time_path, output_path, chunksize=None):
     """
     Limpia los datos de ventas, productos y clientes, y guarda el DataFrame limpio en un archivo de salida.
+    Con chunksize, las ventas se leen y se escriben por bloques: los productos, clientes y la dimensión de
+    tiempo se cargan una sola vez y los IDs de venta nuevos se asignan igual que en el modo completo.
+    Las tablas de apoyo se liberan en cuanto se construyen sus índices, antes de leer las ventas.
 
     :param sales_path: Ruta del archivo CSV con los datos de ventas
     :param products_path: Ruta del archivo CSV con los datos de productos
     :param customers_path: Ruta del archivo CSV con los datos de clientes
     :param time_path: Ruta del archivo CSV con los datos de tiempo
     :param output_path: Ruta del archivo CSV donde se guardarán los datos limpios
-    """
-    sales = load_data(sales_path)
-    products = load_data(products_path)
-    customers = load_data(customers_path)
-
-    products_dict = products.set_index('producto_id')['precio_base'].to_dict()
-    valid_customers = set(customers['cliente_id'])
-
-    sales = clean_nulls(sales)
-    sales = validate_sales_ids(sales)
-    sales = clean_dates(sales)
-    sales = validate_product_id(sales, products_dict)
-    sales = validate_customers_ids(sales, valid_customers)
-    sales = convert_branch_id(sales)
-    sales = clean_totals(sales)
-    sales = replace_dates_with_time_id(sales, time_path, 'fecha')
-
-    save_data(sales, output_path)
+    :param chunksize: Número de filas por bloque; si es None se procesa el archivo completo en memoria (salvo
+                      que con ETL_LOW_MEMORY no quepa en el presupuesto, ver memory_chunksize)
+    """
+    products_dict, valid_customers, time_lookup, price_index = build_sales_lookups(
+        load_data(products_path, usecols=['producto_id', 'precio_base']),
+        load_data(customers_path, usecols=['cliente_id']),
+        load_data(time_path, usecols=['tiempo_id', 'fecha', 'hora']))
+
+    chunksize = memory_chunksize(sales_path, chunksize, SOURCE_SCHEMAS['ventas'])
+    if chunksize is None:
+        sales = clean_sales_frame(load_data(sales_path, schema=SOURCE_SCHEMAS['ventas']), products_dict,
+                                  valid_customers, time_lookup, price_index)
+        save_data(sales, output_path, TABLE_SCHEMAS['ventas'])
+        return
+
+    allocator = IdAllocator(collect_column_ids(sales_path, 'venta_id', chunksize, schema=SOURCE_SCHEMAS['ventas']))
+
+    with DataWriter(output_path, TABLE_SCHEMAS['ventas']) as writer:
+        for chunk in load_data(sales_path, chunksize=chunksize, schema=SOURCE_SCHEMAS['ventas']):
+            writer.write(clean_sales_frame(chunk, products_dict, valid_customers, time_lookup, price_index, allocator))
 
 
 if __name__ == "__main__":
@@ -1,6 +1,13 @@
-from .utils import load_data, save_data
+from .utils import load_data, save_data, integer_id_mask, allocate_new_ids, normalize_unique, capitalize_words
+from .schemas import TABLE_SCHEMAS, SOURCE_SCHEMAS, apply_schema
+from run_report import track_rows, count
 import re
+import pandas as pd
 
+EMAIL_PATTERN = re.compile(r'[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+')
+DEFAULT_CONTACT = 'contacto@desconocido.com'
+
+@track_rows
 def clean_nulls(df):
     """
     Elimina las filas que solo contienen valores nulos en todas las columnas.
@@ -12,20 +19,6 @@ def clean_nulls(df):
     return df
 
 
-def get_new_supplier_id(existing_ids, start_id):
-    """
-    Genera un nuevo ID de proveedor que no esté presente en el conjunto de IDs existentes.
-
-    :param existing_ids: Conjunto de IDs de proveedor ya existentes
-    :param start_id: El valor inicial para el nuevo ID de proveedor
-    :return: Un nuevo ID de proveedor único
-    """
-    new_id = start_id
-    while new_id in existing_ids:
-        new_id += 1
-    return new_id
-
-
 def clean_suppliers_ids(df, existing_ids):
     """
     Limpia los valores de la columna 'proveedor_id' en el DataFrame, asegurando que sean enteros únicos.
@@ -34,20 +27,12 @@ def clean_suppliers_ids(df, existing_ids):
     :param existing_ids: Conjunto de IDs de proveedor ya existentes, para evitar duplicados
     :return: Tupla con el DataFrame limpio y el conjunto de IDs actualizado
     """
-    new_ids = []
+    valid, ids = integer_id_mask(df['proveedor_id'])
+    ids = ids.where(valid)
+    ids.loc[~valid] = allocate_new_ids(existing_ids, int((~valid).sum()))
 
-    for index, row in df.iterrows():
-        supplier_id = row['proveedor_id']
-
-        if not isinstance(supplier_id, (int, float)) or supplier_id != int(supplier_id):
-            new_id = get_new_supplier_id(existing_ids, 1)
-            existing_ids.add(new_id)
-            new_ids.append(new_id)
-        else:
-            new_ids.append(int(supplier_id))
-            existing_ids.add(int(supplier_id))
-
-    df['proveedor_id'] = new_ids
+    df['proveedor_id'] = ids.astype(int)
+    existing_ids.update(df['proveedor_id'].tolist())
     return df, existing_ids
 
 
@@ -66,22 +51,20 @@ def clean_names(df):
 def clean_emails(df):
     """
     Limpia la columna 'contacto' asegurando que contenga un correo electrónico válido.
-    Si no es válido, reemplaza el valor por 'contacto@desconocido.com'.
+    Si no es válido (o está vacío), reemplaza el valor por 'contacto@desconocido.com'.
+    Cada contacto distinto se valida una sola vez, con str.fullmatch sobre EMAIL_PATTERN.
 
     :param df: DataFrame que contiene los datos de proveedores
     :return: DataFrame con la columna 'contacto' validada
     """
-    def is_valid_email(email):
-        """
-        Verifica si un correo electrónico es válido utilizando una expresión regular.
+    codes, contacts = pd.factorize(df['contacto'], use_na_sentinel=False)
+    contacts = pd.Series(contacts, dtype=object)
 
-        :param email: Cadena de texto con el correo electrónico
-        :return: True si el correo es válido, False en caso contrario
-        """
-        email_regex = r'^[a-zA-Z0-9_.+-]+@[a-zA-Z0-9-]+\.[a-zA-Z0-9-.]+$'
-        return re.match(email_regex, email) is not None
+    is_text = contacts.map(lambda value: isinstance(value, str))
+    valid = contacts.where(is_text).astype('string').str.fullmatch(EMAIL_PATTERN).fillna(False).astype(bool)
 
-    df['contacto'] = df['contacto'].apply(lambda x: x if is_valid_email(x) else 'contacto@desconocido.com')
+    result_codes, categories = pd.factorize(contacts.where(valid, DEFAULT_CONTACT))
+    df['contacto'] = pd.Categorical.from_codes(result_codes[codes], categories)
     return df
 
 
@@ -92,10 +75,11 @@ def clean_locations(df):
     :param df: DataFrame que contiene los datos de ubicación
     :return: DataFrame con la columna 'ubicacion' capitalizada correctamente
     """
-    df['ubicacion'] = df['ubicacion'].apply(lambda x: ' '.join([word.capitalize() for word in str(x).split()]))
+    df['ubicacion'] = normalize_unique(df['ubicacion'], capitalize_words, 'ubicacion')
     return df
 
 
+@track_rows
 def clean_duplicates(df):
     """
     Elimina las filas duplicadas basadas en la columna 'proveedor_id'.
@@ -106,16 +90,14 @@ def clean_duplicates(df):
     return df.drop_duplicates(subset=['proveedor_id'])
 
 
-def clean_suppliers_data(ruta_entrada, ruta_salida):
+def clean_suppliers(df):
     """
-    Procesa el archivo de datos de proveedores, limpiando los valores nulos, ajustando IDs, nombres,
-    correos electrónicos, ubicaciones y eliminando duplicados, luego guarda el DataFrame limpio en un archivo de salida.
+    Aplica la cadena de limpieza de proveedores a un DataFrame en memoria.
 
-    :param ruta_entrada: Ruta del archivo de entrada (CSV) con los datos de proveedores
-    :param ruta_salida: Ruta del archivo de salida (CSV) donde se guardarán los datos limpios
+    :param df: DataFrame con los datos de proveedores sin limpiar
+    :return: DataFrame de proveedores limpio, con los tipos de TABLE_SCHEMAS['proveedores']
     """
-    df = load_data(ruta_entrada)
-
+    count('rows_in', len(df))
     existing_ids = set(df['proveedor_id'])
 
     df = clean_nulls(df)
@@ -125,7 +107,19 @@ def clean_suppliers_data(ruta_entrada, ruta_salida):
     df = clean_emails(df)
     df = clean_duplicates(df)
 
-    save_data(df, ruta_salida)
+    count('rows_out', len(df))
+    return apply_schema(df, TABLE_SCHEMAS['proveedores'])
+
+
+def clean_suppliers_data(ruta_entrada, ruta_salida):
+    """
+    Procesa el archivo de datos de proveedores, limpiando los valores nulos, ajustando IDs, nombres,
+    correos electrónicos, ubicaciones y eliminando duplicados, luego guarda el DataFrame limpio en un archivo de salida.
+
+    :param ruta_entrada: Ruta del archivo de entrada (CSV) con los datos de proveedores
+    :param ruta_salida: Ruta del archivo de salida (CSV) donde se guardarán los datos limpios
+    """
+    save_data(clean_suppliers(load_data(ruta_entrada, schema=SOURCE_SCHEMAS['proveedores'])), ruta_salida, TABLE_SCHEMAS['proveedores'])
 
 
 if __name__ == "__main__":
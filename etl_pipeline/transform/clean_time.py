@@ -1,28 +1,85 @@
+import os
+import numpy as np
 import pandas as pd
+from .utils import load_data, save_data, build_time_lookup, collect_unique_values, memory_chunksize
+from .schemas import TABLE_SCHEMAS, SOURCE_SCHEMAS, apply_schema
 
+# tiempo_id son los segundos desde 1970-01-01 del timestamp: caben en los 10 dígitos de VARCHAR(10) hasta 2286
+TIME_ID_MIN = pd.Timestamp("1970-01-01")
+TIME_ID_MAX = pd.Timestamp("2286-11-20")
 
-def generate_time_dimension(sales_path, logistics_path, output_path):
-    """Genera un CSV con la dimensión de tiempo basada en fechas únicas de ventas y logística,
-    incluyendo la hora en una columna aparte."""
 
-    sales_df = pd.read_csv(sales_path, usecols=["fecha"])
-    logistics_df = pd.read_csv(logistics_path, usecols=["fecha_envio"])
+def _names(timestamps, attribute, fmt, reference):
+    """Nombres de día o de mes: strftime solo sobre las fechas de referencia (respeta el locale) y luego un mapeo."""
+    reference = pd.Series(reference)
+    return getattr(timestamps.dt, attribute).map(dict(zip(getattr(reference.dt, attribute), reference.dt.strftime(fmt))))
+
+
+def _text_by_code(values, format_unique):
+    """Texto categórico de una columna con pocos valores distintos: se formatea una sola vez cada valor distinto."""
+    codes, uniques = pd.factorize(values)
+    return pd.Categorical.from_codes(codes, [format_unique(value) for value in uniques])
 
-    all_dates = pd.concat([sales_df["fecha"], logistics_df["fecha_envio"]]).dropna()
-    all_dates = pd.to_datetime(all_dates, errors='coerce').dropna()
 
-    unique_timestamps = sorted(all_dates.unique())
-    time_df = pd.DataFrame({
-        "tiempo_id": range(1, len(unique_timestamps) + 1),
-        "fecha": [pd.Timestamp(ts).date() for ts in unique_timestamps],
-        "hora": [pd.Timestamp(ts).time() for ts in unique_timestamps],
-        "anio": [pd.Timestamp(ts).year for ts in unique_timestamps],
-        "mes": [pd.Timestamp(ts).month for ts in unique_timestamps],
-        "dia": [pd.Timestamp(ts).day for ts in unique_timestamps],
-        "dia_nombre": [pd.Timestamp(ts).strftime('%A') for ts in unique_timestamps],
-        "mes_nombre": [pd.Timestamp(ts).strftime('%B') for ts in unique_timestamps]
+def _time_rows(timestamps):
+    """Construye las filas de la dimensión para una serie de timestamps ordenados; el tiempo_id de cada uno
+    son sus segundos desde 1970-01-01."""
+    # Hay pocos días y minutos del día distintos: 'fecha' y 'hora' se formatean por valor distinto y no por fila
+    values = timestamps.values.astype('datetime64[s]')
+    days = values.astype('datetime64[D]')
+    seconds = (values - days).astype('int64')
+    return pd.DataFrame({
+        "tiempo_id": values.astype('int64'),
+        "fecha": _text_by_code(days, lambda day: str(np.datetime64(day, 'D'))),
+        "hora": _text_by_code(seconds, lambda second: f"{second // 3600:02d}:{second // 60 % 60:02d}:{second % 60:02d}"),
+        "anio": timestamps.dt.year,
+        "mes": timestamps.dt.month,
+        "dia": timestamps.dt.day,
+        "dia_nombre": _names(timestamps, 'dayofweek', '%A', pd.date_range('2024-01-01', periods=7)),
+        "mes_nombre": _names(timestamps, 'month', '%B', pd.date_range('2024-01-01', periods=12, freq='MS'))
     })
 
 
-    time_df.to_csv(output_path, index=False)
+def build_time_dimension(sales_df, logistics_df, existing_time_df=None):
+    """Construye en memoria la dimensión de tiempo a partir de las columnas 'fecha' de ventas y
+    'fecha_envio' de logística, incluyendo la hora en una columna aparte.
+    El tiempo_id se deriva del propio timestamp (segundos desde 1970-01-01), de modo que es el mismo en
+    todas las cargas y sigue el orden cronológico: un rango de fechas es un rango contiguo de IDs.
+    Si se pasa la dimensión de una carga anterior, sus timestamps se conservan."""
+
+    # Cada texto distinto se convierte una sola vez; el orden (y con él el formato que infiere to_datetime) no cambia
+    all_dates = pd.concat([sales_df["fecha"], logistics_df["fecha_envio"]]).dropna().drop_duplicates()
+    all_dates = pd.to_datetime(all_dates, errors='coerce').dropna()
+
+    if existing_time_df is not None and len(existing_time_df):
+        existing_time_df = apply_schema(existing_time_df, TABLE_SCHEMAS['tiempo'])
+        all_dates = pd.concat([all_dates, build_time_lookup(existing_time_df).index.to_series()])
+
+    timestamps = all_dates.drop_duplicates().sort_values(ignore_index=True)
+
+    out_of_range = (timestamps < TIME_ID_MIN) | (timestamps >= TIME_ID_MAX)
+    if out_of_range.any():
+        print(f"⚠️ Se descartan {int(out_of_range.sum())} timestamps fuera del rango de tiempo_id "
+              f"({TIME_ID_MIN.date()} a {TIME_ID_MAX.date()}).")
+        timestamps = timestamps[~out_of_range].reset_index(drop=True)
+
+    return apply_schema(_time_rows(timestamps), TABLE_SCHEMAS['tiempo'])
+
+
+def generate_time_dimension(sales_path, logistics_path, output_path, existing_path=None):
+    """Genera un CSV con la dimensión de tiempo basada en fechas únicas de ventas y logística,
+    incluyendo la hora en una columna aparte. Se guarda como Parquet si output_path termina en .parquet.
+    Si existing_path apunta a la dimensión de la carga anterior, se conservan sus timestamps."""
+
+    # Solo hacen falta las fechas distintas; con ETL_LOW_MEMORY y archivos grandes se reúnen por bloques
+    sales_df = collect_unique_values(sales_path, "fecha",
+                                     memory_chunksize(sales_path, schema=SOURCE_SCHEMAS["ventas"]),
+                                     SOURCE_SCHEMAS["ventas"])
+    logistics_df = collect_unique_values(logistics_path, "fecha_envio",
+                                         memory_chunksize(logistics_path, schema=SOURCE_SCHEMAS["logistica"]),
+                                         SOURCE_SCHEMAS["logistica"])
+    existing_time_df = load_data(existing_path) if existing_path and os.path.exists(existing_path) else None
+
+    time_df = build_time_dimension(sales_df, logistics_df, existing_time_df)
+    save_data(time_df, output_path, TABLE_SCHEMAS['tiempo'])
     print(f"📆 Dimensión de tiempo guardada en {output_path}")
\ No newline at end of file
@@ -0,0 +1,105 @@
+# Esquemas explícitos (columna -> dtype de pandas) de las tablas limpias que intercambian las etapas.
+# Se aplican al guardar, de modo que las etapas siguientes reciben datos tipados sin volver a inferirlos.
+TABLE_SCHEMAS = {
+    "clientes": {
+        "cliente_id": "int64",
+        "nombre": "string",
+        "edad": "int64",
+        "genero": "string",
+        "ubicacion": "string",
+    },
+    "productos": {
+        "producto_id": "int64",
+        "nombre_producto": "string",
+        "categoria": "string",
+        "precio_base": "float64",
+    },
+    "proveedores": {
+        "proveedor_id": "int64",
+        "nombre_proveedor": "string",
+        "contacto": "string",
+        "ubicacion": "string",
+    },
+    "tiempo": {
+        "tiempo_id": "int64",
+        "fecha": "string",
+        "hora": "string",
+        "anio": "int64",
+        "mes": "int64",
+        "dia": "int64",
+        "dia_nombre": "string",
+        "mes_nombre": "string",
+    },
+    "ventas": {
+        "venta_id": "int64",
+        "producto_id": "int64",
+        "cantidad": "int64",
+        "precio_unitario": "float64",
+        "cliente_id": "int64",
+        "sucursal_id": "int64",
+        "total": "float64",
+        "tiempo_id": "int64",
+        "fecha": "datetime64[s]",
+    },
+    "envios": {
+        "envio_id": "int64",
+        "venta_id": "int64",
+        "proveedor_id": "int64",
+        "estado_envio": "string",
+        "tiempo_id": "int64",
+        "fecha": "datetime64[s]",
+    },
+}
+
+# Esquemas de lectura de los CSV de origen (ver utils.load_data). Los IDs se leen como enteros nulables: los
+# valores no numéricos o con decimales quedan nulos y la limpieza les asigna un ID nuevo. El texto con pocos
+# valores distintos se lee como categoría y los enteros pequeños con el tipo más chico que los contiene.
+SOURCE_SCHEMAS = {
+    "clientes": {
+        "cliente_id": "Int64",
+        "nombre": "string",
+        "edad": "float64",
+        "genero": "category",
+        "ubicacion": "category",
+    },
+    "productos": {
+        "producto_id": "Int64",
+        "nombre_producto": "string",
+        "categoria": "category",
+        "precio_base": "float64",
+    },
+    "proveedores": {
+        "proveedor_id": "Int64",
+        "nombre_proveedor": "string",
+        "contacto": "string",
+        "ubicacion": "category",
+    },
+    "ventas": {
+        "venta_id": "Int64",
+        "producto_id": "Int64",
+        "cantidad": "Int32",
+        "precio_unitario": "float64",
+        "cliente_id": "Int64",
+        "sucursal_id": "Int32",
+        "fecha": "string",
+    },
+    "logistica": {
+        "envio_id": "Int64",
+        "venta_id": "Int64",
+        "proveedor_id": "Int64",
+        "estado_envio": "category",
+        "fecha_envio": "string",
+    },
+}
+
+
+def apply_schema(df, schema):
+    """
+    Convierte las columnas del DataFrame a los tipos indicados en el esquema.
+    Las columnas que no aparecen en el esquema se dejan sin cambios.
+
+    :param df: DataFrame a convertir
+    :param schema: Diccionario columna -> dtype de pandas (por ejemplo TABLE_SCHEMAS['ventas'])
+    :return: DataFrame con las columnas convertidas
+    """
+    return df.astype({col: dtype for col, dtype in schema.items() if col in df.columns})
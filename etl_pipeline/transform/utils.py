@@ -1,78 +1,546 @@
+import hashlib
+import inspect
+import io
+import itertools
+import json
+import os
+import numpy as np
 import pandas as pd
+from config import ETL_CSV_ENGINE, ETL_TEXT_CACHE_DIR, ETL_LOW_MEMORY, ETL_MEMORY_BUDGET_MB
+from run_report import track_rows
+from .schemas import apply_schema
 
-def load_data(ruta):
+def is_parquet(ruta):
     """
-    Carga un archivo CSV en un DataFrame de pandas.
+    Indica si una ruta corresponde a un archivo Parquet según su extensión.
 
-    :param ruta: Ruta del archivo CSV a cargar
-    :return: DataFrame con los datos cargados desde el archivo CSV
+    :param ruta: Ruta del archivo
+    :return: True si la extensión es .parquet
     """
-    return pd.read_csv(ruta)
+    return os.path.splitext(ruta)[1].lower() == '.parquet'
 
-def save_data(df, ruta_salida):
+def _iter_parquet(ruta, columns, chunksize):
+    import pyarrow.parquet as pq
+
+    for batch in pq.ParquetFile(ruta).iter_batches(batch_size=chunksize, columns=columns):
+        yield batch.to_pandas()
+
+# Memoria de trabajo de la lectura y limpieza de una tabla de hechos respecto al DataFrame de origen: el pico
+# es la lectura con el parser de pandas (unas 4 veces el DataFrame); la limpieza se queda por debajo
+CLEANING_MEMORY_FACTOR = 4
+
+# Filas de la muestra con la que se estima la memoria de un CSV y tamaño mínimo de bloque
+MEMORY_SAMPLE_ROWS = 10_000
+MIN_CHUNKSIZE = 10_000
+
+def _apply_source_schema(df, schema):
+    """
+    Convierte las columnas numéricas de un CSV recién leído al tipo del esquema de origen.
+    Los valores que no son números (o no son enteros, en columnas enteras) quedan como nulos.
+    Con ETL_LOW_MEMORY las columnas enteras se reducen al tipo más chico que contiene sus valores.
+    """
+    for col, dtype in schema.items():
+        if col not in df.columns or dtype in ('string', 'category'):
+            continue
+        if df[col].dtype != dtype:
+            numeric = pd.to_numeric(df[col], errors='coerce')
+            if pd.api.types.is_integer_dtype(dtype):
+                numeric = numeric.where(numeric % 1 == 0)
+            df[col] = numeric.astype(dtype)
+        if ETL_LOW_MEMORY and pd.api.types.is_integer_dtype(dtype):
+            df[col] = pd.to_numeric(df[col], downcast='integer')
+    return df
+
+def _read_csv(ruta, usecols, chunksize, dtype, schema):
+    if schema is None:
+        return pd.read_csv(ruta, usecols=usecols, chunksize=chunksize, dtype=dtype)
+
+    # El texto se tipa en el parser; los números se dejan inferir y se convierten después, porque un
+    # valor sucio en una columna numérica haría fallar la lectura completa
+    schema = {col: dtype for col, dtype in schema.items() if usecols is None or col in usecols}
+    text_dtypes = {col: dtype for col, dtype in schema.items() if dtype in ('string', 'category')}
+    engine = ETL_CSV_ENGINE if chunksize is None else None
+
+    reader = pd.read_csv(ruta, usecols=usecols, chunksize=chunksize, dtype={**text_dtypes, **(dtype or {})},
+                         engine=engine)
+    if chunksize is None:
+        return _apply_source_schema(reader, schema)
+    return (_apply_source_schema(chunk, schema) for chunk in reader)
+
+def load_data(ruta, usecols=None, chunksize=None, dtype=None, schema=None):
+    """
+    Carga un archivo CSV o Parquet (según la extensión) en un DataFrame de pandas.
+
+    :param ruta: Ruta del archivo a cargar
+    :param usecols: Lista de columnas a cargar (por defecto todas)
+    :param chunksize: Si se indica, devuelve un iterador de DataFrames con ese número de filas
+    :param dtype: Tipos de columna a aplicar al cargar (opcional)
+    :param schema: Esquema de lectura de un CSV de origen (ver schemas.SOURCE_SCHEMAS); los valores que no
+                   encajan en su tipo quedan como nulos en lugar de hacer fallar la lectura
+    :return: DataFrame con los datos cargados, o un iterador de bloques si se indica chunksize
+    """
+    if is_parquet(ruta):
+        if chunksize is not None:
+            return _iter_parquet(ruta, usecols, chunksize)
+        df = pd.read_parquet(ruta, columns=usecols)
+        return df.astype(dtype) if dtype else df
+
+    return _read_csv(ruta, usecols, chunksize, dtype, schema)
+
+def memory_chunksize(ruta, chunksize=None, schema=None):
+    """
+    Decide si un CSV de origen se limpia completo o por bloques. Con ETL_LOW_MEMORY, estima la memoria que
+    ocuparía su limpieza a partir de una muestra (bytes por fila en disco y en memoria, por
+    CLEANING_MEMORY_FACTOR) y, si supera ETL_MEMORY_BUDGET_MB, devuelve un tamaño de bloque que cabe en él.
+
+    :param ruta: Ruta del archivo CSV
+    :param chunksize: Tamaño de bloque configurado; si se indica, se respeta
+    :param schema: Esquema de lectura del CSV (ver schemas.SOURCE_SCHEMAS)
+    :return: Número de filas por bloque, o None si el archivo se puede procesar completo
     """
-    Guarda un DataFrame en un archivo CSV.
+    if chunksize is not None or not ETL_LOW_MEMORY or is_parquet(ruta):
+        return chunksize
+
+    with open(ruta, 'rb') as file:
+        head = list(itertools.islice(file, MEMORY_SAMPLE_ROWS + 1))
+    if len(head) < 2:
+        return None
+
+    sample = _read_csv(io.BytesIO(b''.join(head)), None, None, None, schema)
+    disk_bytes_per_row = sum(len(line) for line in head[1:]) / (len(head) - 1)
+    memory_bytes_per_row = sample.memory_usage(deep=True).sum() / len(sample) * CLEANING_MEMORY_FACTOR
+
+    needed = os.path.getsize(ruta) / disk_bytes_per_row * memory_bytes_per_row
+    budget = ETL_MEMORY_BUDGET_MB * 2 ** 20
+    if needed <= budget:
+        return None
+
+    chunksize = max(MIN_CHUNKSIZE, int(budget / memory_bytes_per_row))
+    print(f"🧠 {ruta}: ~{needed / 2 ** 20:.0f} MB estimados para la limpieza, más que el presupuesto de "
+          f"{ETL_MEMORY_BUDGET_MB} MB; se procesa en bloques de {chunksize} filas")
+    return chunksize
+
+def save_data(df, ruta_salida, schema=None):
+    """
+    Guarda un DataFrame en un archivo CSV o Parquet (según la extensión).
 
     :param df: DataFrame que contiene los datos a guardar
-    :param ruta_salida: Ruta del archivo CSV donde se guardarán los datos
+    :param ruta_salida: Ruta del archivo donde se guardarán los datos
+    :param schema: Esquema columna -> dtype a aplicar antes de guardar (ver schemas.TABLE_SCHEMAS)
     """
-    df.to_csv(ruta_salida, index=False)
+    if schema:
+        df = apply_schema(df, schema)
 
-def format_ids_in_csv(file_path, output_path, id_columns, length=10):
+    if is_parquet(ruta_salida):
+        df.to_parquet(ruta_salida, index=False)
+    else:
+        df.to_csv(ruta_salida, index=False)
+
+class DataWriter:
+    """
+    Escribe un DataFrame por bloques en un archivo CSV o Parquet, sin mantener en memoria los bloques anteriores.
+    Se usa como gestor de contexto: with DataWriter(ruta, schema) as writer: writer.write(df)
+    """
+
+    def __init__(self, ruta_salida, schema=None):
+        """
+        :param ruta_salida: Ruta del archivo donde se guardarán los datos
+        :param schema: Esquema columna -> dtype aplicado a cada bloque, para que todos compartan los mismos tipos
+        """
+        self.ruta_salida = ruta_salida
+        self.schema = schema
+        self._parquet_writer = None
+        self._arrow_schema = None
+        self._started = False
+
+    def __enter__(self):
+        return self
+
+    def write(self, df):
+        """
+        Agrega un bloque al archivo de salida.
+
+        :param df: DataFrame con el bloque a guardar
+        """
+        if self.schema:
+            df = apply_schema(df, self.schema)
+
+        if is_parquet(self.ruta_salida):
+            import pyarrow as pa
+            import pyarrow.parquet as pq
+
+            if self._parquet_writer is None:
+                self._arrow_schema = pa.Schema.from_pandas(df, preserve_index=False)
+                self._parquet_writer = pq.ParquetWriter(self.ruta_salida, self._arrow_schema)
+            table = pa.Table.from_pandas(df, schema=self._arrow_schema, preserve_index=False)
+            self._parquet_writer.write_table(table)
+        else:
+            df.to_csv(self.ruta_salida, index=False, mode='a' if self._started else 'w', header=not self._started)
+
+        self._started = True
+
+    def __exit__(self, exc_type, exc, tb):
+        if self._parquet_writer is not None:
+            self._parquet_writer.close()
+
+def integer_id_mask(series):
+    """
+    Identifica los IDs válidos de una columna: valores numéricos (int o float) sin parte decimal.
+    Las cadenas, los nulos y los valores con decimales se consideran inválidos.
+
+    :param series: Serie con los IDs a validar
+    :return: Tupla con la máscara booleana de IDs válidos y la serie convertida a float
+    """
+    if pd.api.types.is_numeric_dtype(series):
+        numeric = series.astype('float64')
+    else:
+        is_number = series.map(lambda x: isinstance(x, (int, float)) and not isinstance(x, bool))
+        numeric = pd.to_numeric(series.where(is_number), errors='coerce').astype('float64')
+
+    return numeric.notna() & (numeric % 1 == 0), numeric
+
+
+class IdAllocator:
+    """
+    Asigna IDs enteros libres de forma incremental. Ordena los IDs existentes una única vez y recuerda
+    el último ID entregado, de modo que varias llamadas (por ejemplo, una por bloque de un CSV)
+    producen los mismos IDs que una sola llamada sobre todo el archivo.
+    """
+
+    def __init__(self, existing_ids, start_id=1):
+        """
+        :param existing_ids: Colección de IDs ya utilizados (los valores no numéricos se ignoran)
+        :param start_id: El valor inicial a partir del cual se buscan IDs libres
+        """
+        if isinstance(existing_ids, (set, frozenset)):
+            existing_ids = [x for x in existing_ids
+                            if isinstance(x, (int, float, np.integer, np.floating)) and not isinstance(x, bool)]
+
+        existing = pd.to_numeric(pd.Series(existing_ids), errors='coerce').to_numpy(dtype='float64')
+        existing = existing[~np.isnan(existing) & (existing % 1 == 0)]
+
+        self.existing = np.unique(existing.astype(np.int64))
+        self.next_id = start_id
+
+    def allocate(self, count):
+        """
+        Entrega los siguientes `count` IDs libres en una sola operación vectorizada.
+
+        :param count: Número de IDs nuevos a generar
+        :return: Arreglo de numpy con los IDs nuevos, en orden ascendente
+        """
+        existing = self.existing[np.searchsorted(self.existing, self.next_id):]
+
+        # free_before[i]: cantidad de IDs libres entre next_id y existing[i]
+        free_before = existing - self.next_id - np.arange(len(existing))
+        ranks = np.arange(count, dtype=np.int64)
+        new_ids = ranks + self.next_id + np.searchsorted(free_before, ranks, side='right')
+
+        if count:
+            self.next_id = int(new_ids[-1]) + 1
+        return new_ids
+
+
+def allocate_new_ids(existing_ids, count, start_id=1):
+    """
+    Asigna los primeros `count` IDs enteros libres a partir de `start_id`, en una sola operación vectorizada.
+    Equivale a buscar uno a uno el siguiente entero que no esté en `existing_ids`, pero calcula
+    los huecos de la secuencia ordenada una única vez.
+
+    :param existing_ids: Colección de IDs ya utilizados (los valores no numéricos se ignoran)
+    :param count: Número de IDs nuevos a generar
+    :param start_id: El valor inicial a partir del cual se buscan IDs libres
+    :return: Arreglo de numpy con los `count` IDs nuevos, en orden ascendente
+    """
+    return IdAllocator(existing_ids, start_id).allocate(count)
+
+
+def _as_int_ids(values):
+    """Convierte IDs a float64 (los no numéricos quedan NaN) y devuelve la máscara de enteros junto con los valores."""
+    numeric = pd.to_numeric(pd.Series(values), errors='coerce').to_numpy(dtype='float64', na_value=np.nan)
+    return ~np.isnan(numeric) & (numeric % 1 == 0), numeric
+
+
+class KeyIndex:
+    """
+    Índice de pertenencia para las llaves válidas de una dimensión. Usa un mapa de bits cuando las llaves
+    son densas (como los IDs secuenciales de la ETL) y un arreglo ordenado con búsqueda binaria en otro caso.
+    """
+
+    # Tamaño máximo del mapa de bits, como múltiplo del número de llaves
+    BITMAP_DENSITY = 8
+
+    def __init__(self, keys, kind='auto'):
+        """
+        :param keys: Colección de llaves válidas (los valores no enteros se ignoran)
+        :param kind: 'bitmap', 'sorted' o 'auto' para elegir según la densidad de las llaves
+        """
+        if isinstance(keys, (set, frozenset)):
+            keys = list(keys)
+        valid, numeric = _as_int_ids(keys)
+        self.keys = np.unique(numeric[valid].astype(np.int64))
+
+        if kind == 'auto':
+            dense = len(self.keys) > 0 and self.keys[0] >= 0 and self.keys[-1] < self.BITMAP_DENSITY * len(self.keys)
+            kind = 'bitmap' if dense else 'sorted'
+        self.kind = kind
+
+        if kind == 'bitmap':
+            self.bitmap = np.zeros(int(self.keys[-1]) + 1 if len(self.keys) else 0, dtype=bool)
+            self.bitmap[self.keys] = True
+
+    def contains(self, values):
+        """
+        :param values: Arreglo de numpy de enteros
+        :return: Máscara booleana con True para los valores que son llaves válidas
+        """
+        if self.kind == 'bitmap':
+            inside = (values >= 0) & (values < len(self.bitmap))
+            result = np.zeros(len(values), dtype=bool)
+            result[inside] = self.bitmap[values[inside]]
+            return result
+
+        positions = np.searchsorted(self.keys, values).clip(max=max(len(self.keys) - 1, 0))
+        return self.keys[positions] == values if len(self.keys) else np.zeros(len(values), dtype=bool)
+
+
+def validate_foreign_keys(df, references):
     """
-    Formatea los IDs en un archivo CSV, agregando ceros a la izquierda hasta alcanzar el largo especificado.
+    Valida en una sola pasada todas las llaves foráneas de una tabla de hechos: convierte cada columna a
+    entero y descarta las filas cuyo valor no es un entero o no existe en la dimensión correspondiente.
 
-    :param file_path: Ruta del archivo CSV de entrada
-    :param output_path: Ruta del archivo CSV de salida con IDs formateados
+    :param df: DataFrame de la tabla de hechos
+    :param references: Diccionario columna -> llaves válidas (KeyIndex, o cualquier colección de IDs)
+    :return: Tupla con el DataFrame de filas válidas (columnas de llave como int64, índice reiniciado) y
+             un diccionario columna -> número de filas rechazadas por esa llave
+    """
+    keep = np.ones(len(df), dtype=bool)
+    converted = {}
+    rejects = {}
+
+    for column, keys in references.items():
+        index = keys if isinstance(keys, KeyIndex) else KeyIndex(keys)
+        valid, numeric = _as_int_ids(df[column])
+        valid[valid] = index.contains(numeric[valid].astype(np.int64))
+
+        rejects[column] = int((~valid).sum())
+        converted[column] = numeric
+        keep &= valid
+
+    result = df[keep].reset_index(drop=True)
+    for column, numeric in converted.items():
+        result[column] = numeric[keep].astype(np.int64)
+    return result, rejects
+
+
+def collect_column_ids(ruta, column, chunksize, valid_only=True, schema=None):
+    """
+    Recorre por bloques una sola columna de un CSV y devuelve sus IDs enteros únicos,
+    sin cargar el resto del archivo en memoria.
+
+    :param ruta: Ruta del archivo CSV
+    :param column: Nombre de la columna de IDs
+    :param chunksize: Número de filas por bloque
+    :param valid_only: Si es True solo se conservan los IDs válidos según integer_id_mask;
+                       si es False se truncan a entero todos los valores no nulos
+    :param schema: Esquema de lectura del CSV (el mismo con el que se leen los bloques a limpiar)
+    :return: Arreglo de numpy ordenado con los IDs únicos
+    """
+    ids = []
+    for chunk in load_data(ruta, usecols=[column], chunksize=chunksize, schema=schema):
+        if valid_only:
+            valid, numeric = integer_id_mask(chunk[column])
+            values = numeric[valid].astype(np.int64)
+        else:
+            values = chunk[column].dropna().astype(int)
+        ids.append(np.unique(values.to_numpy()))
+
+    return np.unique(np.concatenate(ids)) if ids else np.array([], dtype=np.int64)
+
+
+def collect_unique_values(ruta, column, chunksize=None, schema=None):
+    """
+    Lee una sola columna de un CSV y devuelve sus valores distintos (sin nulos) en el orden en que aparecen.
+    Con chunksize, el archivo se recorre por bloques y solo se acumulan los valores distintos de cada uno.
+
+    :param ruta: Ruta del archivo CSV
+    :param column: Nombre de la columna
+    :param chunksize: Número de filas por bloque; si es None se lee la columna completa
+    :param schema: Esquema de lectura del CSV
+    :return: DataFrame de una columna con los valores distintos
+    """
+    if chunksize is None:
+        values = load_data(ruta, usecols=[column], schema=schema)[column]
+        return values.dropna().drop_duplicates().reset_index(drop=True).to_frame()
+
+    uniques = [chunk[column].dropna().drop_duplicates()
+               for chunk in load_data(ruta, usecols=[column], chunksize=chunksize, schema=schema)]
+    return pd.concat(uniques).drop_duplicates().reset_index(drop=True).to_frame()
+
+
+def format_ids(df, id_columns, length=10):
+    """
+    Formatea los IDs de un DataFrame, agregando ceros a la izquierda hasta alcanzar el largo especificado.
+
+    :param df: DataFrame con los IDs a formatear
     :param id_columns: Lista de nombres de columnas que contienen IDs a formatear
     :param length: Longitud deseada para los IDs (por defecto 10 caracteres)
+    :return: DataFrame con los IDs formateados
     """
-    df = pd.read_csv(file_path)
-
     for col in id_columns:
         if col in df.columns:
             df[col] = df[col].astype(str).str.zfill(length)
+    return df
+
+
+def format_ids_in_csv(file_path, output_path, id_columns, length=10):
+    """
+    Formatea los IDs en un archivo CSV o Parquet, agregando ceros a la izquierda hasta alcanzar el largo especificado.
+
+    :param file_path: Ruta del archivo de entrada
+    :param output_path: Ruta del archivo de salida con IDs formateados
+    :param id_columns: Lista de nombres de columnas que contienen IDs a formatear
+    :param length: Longitud deseada para los IDs (por defecto 10 caracteres)
+    """
+    save_data(format_ids(load_data(file_path), id_columns, length), output_path)
+
+
+def export_csv(file_path, output_path):
+    """
+    Exporta una tabla intermedia (por ejemplo Parquet) a CSV.
+
+    :param file_path: Ruta del archivo de entrada
+    :param output_path: Ruta del archivo CSV de salida
+    """
+    load_data(file_path).to_csv(output_path, index=False)
 
-    df.to_csv(output_path, index=False)
 
+def capitalize_words(value):
+    """
+    Capitaliza cada palabra de un texto y normaliza los espacios (los nulos quedan como 'Nan').
+
+    :param value: Valor a normalizar
+    :return: Texto con cada palabra capitalizada
+    """
+    return ' '.join([word.capitalize() for word in str(value).split()])
+
+
+def _text_cache_path(name, func):
+    # El hash del código de func invalida la caché cuando cambia la regla de normalización
+    digest = hashlib.sha256(inspect.getsource(func).encode()).hexdigest()[:12]
+    return os.path.join(ETL_TEXT_CACHE_DIR, f"{name}-{digest}.json")
+
+
+def _load_text_cache(path):
+    if not os.path.exists(path):
+        return {}
+    with open(path, "r", encoding="utf-8") as file:
+        return json.load(file)
+
+
+def _save_text_cache(path, cache):
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    tmp_path = f"{path}.{os.getpid()}.tmp"
+    with open(tmp_path, "w", encoding="utf-8") as file:
+        json.dump(cache, file, ensure_ascii=False)
+    os.replace(tmp_path, path)
 
-def replace_dates_with_time_id(df, time_df_path, date_column):
+
+def normalize_unique(series, func, cache_name=None):
+    """
+    Aplica una normalización de texto una sola vez por valor distinto: factoriza la columna, normaliza
+    cada valor único y vuelve a expandir el resultado con los códigos. Con cache_name, los resultados se
+    guardan en un diccionario persistente entre ejecuciones (ver config.ETL_TEXT_CACHE_DIR), de modo que
+    los valores que se repiten de una carga a otra no se vuelven a normalizar.
+
+    :param series: Serie con los valores a normalizar
+    :param func: Función que normaliza un valor (recibe también los nulos)
+    :param cache_name: Nombre de la caché persistente (opcional)
+    :return: Serie categórica normalizada, con el mismo índice que series
+    """
+    codes, uniques = pd.factorize(series, use_na_sentinel=False)
+
+    cache_path = _text_cache_path(cache_name, func) if cache_name and ETL_TEXT_CACHE_DIR else None
+    cache = _load_text_cache(cache_path) if cache_path else {}
+
+    normalized = []
+    new_entries = 0
+    for value in uniques:
+        if isinstance(value, str) and value in cache:
+            normalized.append(cache[value])
+            continue
+        result = func(value)
+        normalized.append(result)
+        if isinstance(value, str):
+            cache[value] = result
+            new_entries += 1
+
+    if cache_path and new_entries:
+        _save_text_cache(cache_path, cache)
+
+    # Valores distintos pueden normalizarse igual ('puebla', ' Puebla'): se refactoriza el resultado
+    result_codes, categories = pd.factorize(pd.Index(normalized, dtype=object))
+    return pd.Series(pd.Categorical.from_codes(result_codes[codes], categories), index=series.index)
+
+
+def build_time_lookup(time_df):
+    """
+    Construye el índice fecha y hora -> tiempo_id a partir de la dimensión de tiempo.
+
+    :param time_df: DataFrame de la dimensión de tiempo (columnas 'tiempo_id', 'fecha' y 'hora').
+    :return: Serie con los tiempo_id indexada por fecha y hora (datetime64).
+    """
+    fechas = pd.to_datetime(time_df['fecha'].astype(str), errors='coerce', format='%Y-%m-%d')
+    horas = pd.to_timedelta(time_df['hora'].astype(str), errors='coerce')
+
+    time_lookup = pd.Series(time_df['tiempo_id'].values, index=fechas + horas)
+    return time_lookup[time_lookup.index.notna() & ~time_lookup.index.duplicated(keep='last')]
+
+
+def load_time_lookup(time_df_path):
+    """
+    Carga la dimensión de tiempo y construye el índice fecha y hora -> tiempo_id.
+
+    :param time_df_path: Ruta del DataFrame con la relación fecha -> tiempo_id.
+    :return: Serie con los tiempo_id indexada por fecha y hora (datetime64).
+    """
+    return build_time_lookup(load_data(time_df_path, usecols=['tiempo_id', 'fecha', 'hora']))
+
+
+@track_rows
+def replace_dates_with_time_id(df, time_df_path, date_column, time_lookup=None, day_column=None):
     """
     Reemplaza las fechas en el DataFrame con el ID de tiempo correspondiente.
 
     :param df: DataFrame de ventas o logística con una columna de fecha a transformar.
     :param time_df_path: Ruta del DataFrame con la relación fecha -> tiempo_id.
     :param date_column: Nombre de la columna que contiene la fecha en df ('fecha' o 'fecha_envio').
+    :param time_lookup: Índice fecha -> tiempo_id precalculado con load_time_lookup (opcional).
+    :param day_column: Si se indica, columna donde se conserva el día (sin hora) de cada fila; es la llave de
+                       partición de las tablas de hechos.
     :return: DataFrame con la columna de fecha reemplazada por 'tiempo_id'.
     """
-    time_df = load_data(time_df_path)
+    if time_lookup is None:
+        time_lookup = load_time_lookup(time_df_path)
 
     df[date_column] = pd.to_datetime(df[date_column], errors='coerce', format='%Y-%m-%d %H:%M:%S')
-    time_df['fecha'] = pd.to_datetime(time_df['fecha'], errors='coerce', format='%Y-%m-%d')
-
-    time_df['hora'] = pd.to_datetime(time_df['hora'], errors='coerce', format='%H:%M:%S').dt.time
-
-    time_dict = {
-        (row['fecha'].date(), row['hora']): row['tiempo_id']
-        for _, row in time_df.iterrows()
-    }
-
-    def get_time_id(row):
-        key = (row[date_column].date(), row[date_column].time().replace(second=0))
-        time_id = time_dict.get(key, None)
-
-        if time_id is None:
-            print(f"⚠️ No se encontró tiempo_id para {key}")
 
-        return time_id
+    # La fecha del hecho se busca con los segundos puestos a cero
+    keys = df[date_column] - pd.to_timedelta(df[date_column].dt.second, unit='s')
+    df['tiempo_id'] = keys.map(time_lookup)
 
-    df['tiempo_id'] = df.apply(get_time_id, axis=1)
+    missing = df['tiempo_id'].isna()
+    if missing.any():
+        sample = keys[missing].drop_duplicates().head(5).astype(str).tolist()
+        print(f"⚠️ No se encontró tiempo_id para {missing.sum()} registros. Ejemplos: {sample}")
 
     df.dropna(subset=['tiempo_id'], inplace=True)
 
     df['tiempo_id'] = df['tiempo_id'].astype(int)
 
     df.drop(columns=[date_column], inplace=True)
+    if day_column:
+        df[day_column] = keys.dt.normalize()
 
     return df
 